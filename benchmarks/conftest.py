@@ -0,0 +1,290 @@
+# benchmarks/conftest.py
+#
+# Synthetic inputs for the benchmarks, nothing here needs root or real
+# hardware. Sizes are chosen so scaling curves can be read off the
+# benchmark groups: pytest benchmarks/ --benchmark-group-by=group,param
+from __future__ import annotations
+
+import os
+
+import pytest
+
+# Item counts every scaling benchmark is run with
+SIZES = (10, 100, 1000)
+
+TCP_LISTEN = '0A'
+TCP_ESTABLISHED = '01'
+
+SOCKET_HEADER = (
+  '  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt'
+  '   uid  timeout inode\n'
+)
+
+
+def _socket_line(index, kind, inode):
+  # Every tenth socket listens, the rest are established connections
+  listening = index % 10 == 0
+  port = 1024 + index % 60000
+  if kind.endswith('6'):
+    local = f'{"0" * 24}01000000:{port:04X}'
+    remote = f'{"0" * 24}01000000:{0 if listening else 40000 + index % 20000:04X}'
+  else:
+    local = f'0100007F:{port:04X}'
+    remote = f'0100007F:{0 if listening else 40000 + index % 20000:04X}'
+  state = TCP_LISTEN if listening and kind.startswith('tcp') else TCP_ESTABLISHED
+  return (
+    f'{index:4}: {local} {remote} {state} 00000000:00000000 00:00000000 00000000'
+    f'  1000        0 {inode} 1 0000000000000000 20 4 30 10 -1\n'
+  )
+
+def make_proc(path, processes, sockets, fds_per_process=4):
+  # /proc with 'processes' pid directories and 'sockets' sockets spread over
+  # /proc/net/{tcp,tcp6,udp,udp6}, each socket owned by one of the pids
+  os.makedirs(os.path.join(path, 'net'), exist_ok=True)
+
+  lines = {'tcp': [], 'tcp6': [], 'udp': [], 'udp6': []}
+  kinds = list(lines)
+  owned = {}
+  for index in range(sockets):
+    inode = 100000 + index
+    kind = kinds[index % len(kinds)]
+    lines[kind].append(_socket_line(index, kind, inode))
+    owned.setdefault(1 + index % max(processes, 1), []).append(inode)
+
+  for kind, entries in lines.items():
+    with open(os.path.join(path, 'net', kind), 'w') as f:
+      f.write(SOCKET_HEADER)
+      f.writelines(entries)
+
+  for pid in range(1, processes + 1):
+    fd_dir = os.path.join(path, str(pid), 'fd')
+    os.makedirs(fd_dir)
+    sockets = [f'socket:[{inode}]' for inode in owned.get(pid, [])]
+    targets = ['/dev/null'] * fds_per_process + sockets
+    for fd, target in enumerate(targets):
+      os.symlink(target, os.path.join(fd_dir, str(fd)))
+    with open(os.path.join(path, str(pid), 'comm'), 'w') as f:
+      f.write(f'process{pid}\n')
+    # Every process is a child of pid 1, utime/stime/starttime/rss vary
+    ppid = 0 if pid == 1 else 1
+    with open(os.path.join(path, str(pid), 'stat'), 'w') as f:
+      f.write(
+        f'{pid} (process{pid}) S {ppid} {pid} {pid} 0 -1 4194560 100 0 0 0 {pid} {pid} 0 0 20 0 1 0'
+        f' {1000 + pid} 10000000 {100 + pid} ' + '0 ' * 30 + '\n'
+      )
+    with open(os.path.join(path, str(pid), 'cmdline'), 'wb') as f:
+      f.write(f'/usr/bin/process{pid}\0--flag\0'.encode())
+    with open(os.path.join(path, str(pid), 'cgroup'), 'w') as f:
+      f.write(f'0::/system.slice/unit{pid % 20}.service\n')
+
+  return path
+
+def make_sysfs(path, pci=0, usb=0):
+  # /sys/bus/{pci,usb}/devices with the attributes sysmind.core.sysfs reads
+  pci_base = os.path.join(path, 'bus', 'pci', 'devices')
+  os.makedirs(pci_base, exist_ok=True)
+  for index in range(pci):
+    device = os.path.join(pci_base, f'0000:{index // 32:02x}:{index % 32:02x}.0')
+    os.makedirs(device)
+    attributes = {
+      'vendor': f'0x{0x8000 + index % 16:04x}',
+      'device': f'0x{index:04x}',
+      'class': '0x030000',
+      'subsystem_vendor': '0x0000',
+      'subsystem_device': '0x0000',
+    }
+    for name, value in attributes.items():
+      with open(os.path.join(device, name), 'w') as f:
+        f.write(f'{value}\n')
+
+  usb_base = os.path.join(path, 'bus', 'usb', 'devices')
+  os.makedirs(usb_base, exist_ok=True)
+  for index in range(usb):
+    device = os.path.join(usb_base, f'1-{index + 1}')
+    os.makedirs(device)
+    attributes = {
+      'idVendor': f'{0x1000 + index % 16:04x}',
+      'idProduct': f'{index:04x}',
+      'manufacturer': f'Vendor {index % 16}',
+      'product': f'Device {index}',
+      'serial': f'SN{index:08d}',
+      'busnum': '1',
+      'devnum': str(index + 2),
+    }
+    for name, value in attributes.items():
+      with open(os.path.join(device, name), 'w') as f:
+        f.write(f'{value}\n')
+    # Interface entries live next to the devices and are skipped
+    os.makedirs(os.path.join(usb_base, f'1-{index + 1}:1.0'))
+
+  os.makedirs(os.path.join(path, 'class', 'net'), exist_ok=True)
+  return path
+
+def make_ids(path, vendors, devices_per_vendor, first_vendor=0x8000):
+  # pci.ids/usb.ids layout: vendor lines, tab indented device lines
+  with open(path, 'w') as f:
+    f.write('# Synthetic ids database\n')
+    for vendor in range(first_vendor, first_vendor + vendors):
+      f.write(f'{vendor:04x}  Vendor {vendor:04x}\n')
+      for device in range(devices_per_vendor):
+        f.write(f'\t{device:04x}  Device {device:04x}\n')
+    f.write('C 00  Unclassified device\n')
+  return path
+
+def lspci_output(devices):
+  # Canned 'lspci -vmmnn' output
+  records = []
+  for index in range(devices):
+    records.append(
+      f'Slot:\t00:{index % 32:02x}.{index // 32 % 8}\n'
+      f'Class:\tVGA compatible controller [0300]\n'
+      f'Vendor:\tVendor {index % 16} [{0x8000 + index % 16:04x}]\n'
+      f'Device:\tDevice {index} [{index:04x}]\n'
+      f'SVendor:\tVendor 0 [8000]\n'
+      f'SDevice:\tDevice 0 [0000]\n'
+      f'Rev:\t01\n'
+    )
+  return '\n'.join(records)
+
+def systemctl_output(units):
+  # Canned 'systemctl list-units --type=service --state=running' output
+  lines = ['  UNIT                    LOAD   ACTIVE SUB     DESCRIPTION']
+  for index in range(units):
+    lines.append(f'  unit{index}.service          loaded active running Synthetic service {index}')
+  lines += [
+    '',
+    'LOAD   = Reflects whether the unit definition was properly loaded.',
+    '',
+    f'{units} loaded units listed.',
+  ]
+  return '\n'.join(lines)
+
+def make_proc_sys(path, keys):
+  # /proc/sys with 'keys' entries spread over a few subsystems, returns the
+  # key names
+  names = []
+  subsystems = ('net.ipv4', 'net.core', 'kernel', 'vm', 'fs')
+  for index in range(keys):
+    name = f'{subsystems[index % len(subsystems)]}.key{index}'
+    file_path = os.path.join(path, *name.split('.'))
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w') as f:
+      f.write(f'{index}\n')
+    names.append(name)
+  return names
+
+def make_sysctl_conf(path, keys):
+  with open(path, 'w') as f:
+    f.write('# Synthetic sysctl.conf\n\n')
+    for name in keys:
+      f.write(f'# {name}\n{name} = 0\n')
+  return path
+
+def make_hosts(path, entries):
+  # Blocklist-style hosts file, most names pointing at 0.0.0.0
+  with open(path, 'w') as f:
+    f.write('# Synthetic hosts file\n127.0.0.1 localhost\n::1 localhost ip6-localhost\n\n')
+    for index in range(entries):
+      address = '0.0.0.0' if index % 10 else f'10.0.{index // 256 % 256}.{index % 256}'
+      f.write(f'{address} host{index}.example.com # entry {index}\n')
+  return path
+
+def make_mountinfo(path, mounts):
+  # Container-node style mountinfo: overlays, tmpfs secrets and bind mounts
+  lines = [
+    '22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw,errors=remount-ro\n',
+    '23 22 0:21 / /proc rw,nosuid,nodev,noexec,relatime shared:2 - proc proc rw\n',
+  ]
+  for index in range(mounts):
+    kind = index % 3
+    pod = f'/var/lib/kubelet/pods/pod{index // 3}'
+    if kind == 0:
+      lines.append(
+        f'{100 + index} 22 0:{50 + index} / /run/containerd/rootfs/c{index} rw,relatime'
+        f' - overlay overlay rw,lowerdir=/l{index},upperdir=/u{index},workdir=/w{index}\n'
+      )
+    elif kind == 1:
+      lines.append(
+        f'{100 + index} 22 0:{50 + index} / {pod}/volumes/secret\\040{index} rw,relatime'
+        ' - tmpfs tmpfs rw,size=4096k\n'
+      )
+    else:
+      lines.append(
+        f'{100 + index} 22 8:1 /var/log {pod}/logs rw,nosuid,nodev,relatime - ext4 /dev/sda1 rw\n'
+      )
+  with open(path, 'w') as f:
+    f.writelines(lines)
+  return path
+
+
+def pytest_generate_tests(metafunc):
+  # Every benchmark taking 'size' runs once per SIZES entry
+  if 'size' in metafunc.fixturenames:
+    metafunc.parametrize('size', SIZES)
+
+
+@pytest.fixture(scope='session')
+def proc_factory(tmp_path_factory):
+  # Fake /proc trees are cached per size, building the large ones is slower
+  # than the benchmarks themselves
+  built = {}
+
+  def factory(processes, sockets):
+    key = (processes, sockets)
+    if key not in built:
+      root = str(tmp_path_factory.mktemp(f'proc-{processes}-{sockets}'))
+      built[key] = make_proc(root, processes, sockets)
+    return built[key]
+
+  return factory
+
+@pytest.fixture(scope='session')
+def sysfs_factory(tmp_path_factory):
+  built = {}
+
+  def factory(pci=0, usb=0):
+    key = (pci, usb)
+    if key not in built:
+      built[key] = make_sysfs(str(tmp_path_factory.mktemp(f'sys-{pci}-{usb}')), pci, usb)
+    return built[key]
+
+  return factory
+
+@pytest.fixture(scope='session')
+def pci_ids(tmp_path_factory):
+  return make_ids(str(tmp_path_factory.mktemp('ids') / 'pci.ids'), 2000, 20)
+
+@pytest.fixture
+def sysctl_tree(tmp_path):
+  # Returns a function building (proc_sys, config, config_dir) for N keys
+  def factory(keys):
+    proc_sys = str(tmp_path / 'proc' / 'sys')
+    names = make_proc_sys(proc_sys, keys)
+    config = make_sysctl_conf(str(tmp_path / 'sysctl.conf'), names)
+    config_dir = str(tmp_path / 'sysctl.d')
+    os.makedirs(config_dir, exist_ok=True)
+    return proc_sys, config, config_dir, names
+
+  return factory
+
+@pytest.fixture
+def hosts_file(tmp_path):
+  def factory(entries):
+    return make_hosts(str(tmp_path / 'hosts'), entries)
+
+  return factory
+
+@pytest.fixture
+def mountinfo(tmp_path):
+  def factory(mounts):
+    return make_mountinfo(str(tmp_path / 'mountinfo'), mounts)
+
+  return factory
+
+@pytest.fixture(scope='session')
+def lspci():
+  return lspci_output
+
+@pytest.fixture(scope='session')
+def systemctl():
+  return systemctl_output
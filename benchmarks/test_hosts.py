@@ -0,0 +1,49 @@
+# benchmarks/test_hosts.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core.hosts import HostsFile
+
+
+@pytest.mark.benchmark(group='hosts.parse')
+def test_parse(benchmark, hosts_file, size):
+  # Full parse and index build of a fresh file
+  path = hosts_file(size)
+
+  def parse():
+    hosts = HostsFile(path)
+    hosts.refresh()
+    return hosts
+
+  benchmark(parse)
+
+@pytest.mark.benchmark(group='hosts.refresh-unchanged')
+def test_refresh_unchanged(benchmark, hosts_file, size):
+  # One stat call, the file is not read again
+  hosts = HostsFile(hosts_file(size))
+  hosts.refresh()
+  benchmark(hosts.refresh)
+
+@pytest.mark.benchmark(group='hosts.refresh-append')
+def test_refresh_append(benchmark, hosts_file, size):
+  # Only the appended line is parsed
+  path = hosts_file(size)
+  hosts = HostsFile(path)
+  hosts.refresh()
+  counter = iter(range(1_000_000))
+
+  def append():
+    with open(path, 'a') as f:
+      f.write(f'0.0.0.0 appended{next(counter)}.example.com\n')
+    hosts.refresh()
+
+  benchmark(append)
+
+@pytest.mark.benchmark(group='hosts.lookup')
+def test_lookup(benchmark, hosts_file, size):
+  hosts = HostsFile(hosts_file(size))
+  hosts.refresh()
+  names = [f'host{index}.example.com' for index in range(size)]
+
+  benchmark(lambda: [hosts.addresses(name) for name in names])
@@ -0,0 +1,31 @@
+# benchmarks/test_linux.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core.linux import Linux, get_distro_id, get_distro_like, get_distro_name
+from sysmind.core.os import SECTIONS
+
+
+@pytest.mark.benchmark(group='linux.construct')
+def test_construct(benchmark):
+  benchmark(Linux, cache=False)
+
+@pytest.mark.benchmark(group='linux.collect')
+def test_collect(benchmark):
+  benchmark.pedantic(lambda: Linux(cache=False).collect(), rounds=5)
+
+@pytest.mark.benchmark(group='linux.collect-cached')
+def test_collect_cached(benchmark):
+  # Static sections served from the shared cache after the first round
+  Linux().collect(SECTIONS)
+  benchmark.pedantic(lambda: Linux().collect(), rounds=5)
+
+@pytest.mark.benchmark(group='linux.distro')
+@pytest.mark.parametrize(
+  'probe',
+  [get_distro_id, get_distro_name, get_distro_like],
+  ids=lambda probe: probe.__name__,
+)
+def test_distro(benchmark, probe):
+  benchmark(probe)
@@ -0,0 +1,81 @@
+# benchmarks/test_memory.py
+#
+# Retained memory of section records against the dicts they replaced. The
+# byte counts are attached to each benchmark as extra_info ('records_bytes',
+# 'dicts_bytes', 'saved'), visible with --benchmark-json or
+# --benchmark-columns. Timing is the cost of building the records.
+from __future__ import annotations
+
+import gc
+import tracemalloc
+
+import pytest
+
+from sysmind.core import procfs
+from sysmind.core.os import Connection
+from sysmind.core.proctable import ProcessRecord, ProcessTable
+from sysmind.core.sysctl.table import SysctlTable
+
+
+def _retained(build):
+  # Bytes still allocated once build() returned, its result kept alive
+  gc.collect()
+  tracemalloc.start()
+  try:
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+  finally:
+    tracemalloc.stop()
+  del result
+  return size
+
+def _compare(benchmark, records, dicts):
+  records_bytes = _retained(records)
+  dicts_bytes = _retained(dicts)
+  benchmark.extra_info['records_bytes'] = records_bytes
+  benchmark.extra_info['dicts_bytes'] = dicts_bytes
+  benchmark.extra_info['saved'] = round(1 - records_bytes / dicts_bytes, 3)
+  assert records_bytes < dicts_bytes
+  benchmark(records)
+
+@pytest.mark.benchmark(group='memory.ports')
+def test_ports(benchmark, proc_factory, size):
+  sockets = list(procfs.iter_sockets(root=proc_factory(size, size * 10)))
+
+  def records():
+    return [
+      Connection(s.local_ip, s.local_port, s.remote_ip, s.remote_port, s.status)
+      for s in sockets
+    ]
+
+  def dicts():
+    return [
+      {
+        'local_ip': s.local_ip,
+        'local_port': s.local_port,
+        'remote_ip': s.remote_ip,
+        'remote_port': s.remote_port,
+        'status': s.status,
+      }
+      for s in sockets
+    ]
+
+  _compare(benchmark, records, dicts)
+
+@pytest.mark.benchmark(group='memory.processes')
+def test_processes(benchmark, proc_factory, size):
+  table = ProcessTable.scan(proc_factory(size, size * 10))
+  _compare(benchmark, table.to_records, lambda: table.to_records(fields=ProcessRecord._fields))
+
+@pytest.mark.benchmark(group='memory.sysctl')
+def test_sysctl(benchmark, sysctl_tree, size):
+  # The synthetic tree has a distinct value per key, a live /proc/sys has
+  # about one distinct value per ten keys. Values are built fresh on each
+  # read, like the strings read from /proc/sys.
+  _, _, _, names = sysctl_tree(size * 10)
+
+  def read():
+    return [(name, str(index % 16 * 10)) for index, name in enumerate(names)]
+
+  _compare(benchmark, lambda: SysctlTable(read()), lambda: dict(read()))
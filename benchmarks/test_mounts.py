@@ -0,0 +1,29 @@
+# benchmarks/test_mounts.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core.mounts import MountTable, usage
+
+
+@pytest.mark.benchmark(group='mounts.scan')
+def test_scan(benchmark, mountinfo, size):
+  path = mountinfo(size)
+  benchmark(MountTable.scan, path)
+
+@pytest.mark.benchmark(group='mounts.missing')
+def test_missing(benchmark, mountinfo, size):
+  # CIS-style query: every mount lacking nodev or noexec
+  table = MountTable.scan(mountinfo(size))
+  benchmark(table.missing, ['nodev', 'noexec'])
+
+@pytest.mark.benchmark(group='mounts.usage')
+def test_usage(benchmark, tmp_path, size):
+  # statvfs fan-out over 'size' distinct paths on the same filesystem
+  paths = []
+  for index in range(size):
+    path = tmp_path / f'm{index}'
+    path.mkdir()
+    paths.append(str(path))
+
+  benchmark(usage, paths)
@@ -0,0 +1,51 @@
+# benchmarks/test_os.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core.collector import Command
+from sysmind.core.os import (
+  SECTIONS,
+  OperatingSystem,
+  parse_pci_devices_linux,
+  parse_services_linux,
+)
+
+
+@pytest.mark.benchmark(group='os.collector')
+@pytest.mark.parametrize('section', SECTIONS)
+def test_collector(benchmark, section):
+  # One uncached probe of the live system per section
+  system = OperatingSystem(cache=False)
+  benchmark(system._collector(section))
+
+@pytest.mark.benchmark(group='os.construct')
+def test_construct(benchmark):
+  benchmark(OperatingSystem, cache=False)
+
+@pytest.mark.benchmark(group='os.prefetch')
+def test_prefetch(benchmark):
+  # Every section probed sequentially, the pre-collect() baseline
+  benchmark.pedantic(OperatingSystem, kwargs={'sections': SECTIONS, 'cache': False}, rounds=5)
+
+@pytest.mark.benchmark(group='os.collect')
+def test_collect(benchmark):
+  benchmark.pedantic(lambda: OperatingSystem(cache=False).collect(), rounds=5)
+
+@pytest.mark.benchmark(group='os.parse_services_linux')
+def test_parse_services_linux(benchmark, systemctl, size):
+  output = systemctl(size)
+  benchmark(parse_services_linux, output)
+
+@pytest.mark.benchmark(group='os.parse_pci_devices_linux')
+def test_parse_pci_devices_linux(benchmark, lspci, size):
+  output = lspci(size)
+  benchmark(parse_pci_devices_linux, output)
+
+@pytest.mark.benchmark(group='os.command')
+def test_command(benchmark, systemctl, tmp_path):
+  # Fork/exec plus parse of canned output, the fixed cost every Command pays
+  path = tmp_path / 'systemctl.txt'
+  path.write_text(systemctl(100))
+  command = Command(['cat', str(path)], parse_services_linux)
+  benchmark(command)
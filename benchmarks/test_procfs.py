@@ -0,0 +1,32 @@
+# benchmarks/test_procfs.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core import procfs
+
+
+@pytest.mark.benchmark(group='procfs.iter_sockets')
+def test_iter_sockets(benchmark, proc_factory, size):
+  root = proc_factory(size, size * 10)
+  benchmark(lambda: list(procfs.iter_sockets(root=root)))
+
+@pytest.mark.benchmark(group='procfs.iter_sockets-listening')
+def test_iter_sockets_listening(benchmark, proc_factory, size):
+  root = proc_factory(size, size * 10)
+  benchmark(lambda: list(procfs.iter_sockets(states={'LISTEN'}, root=root)))
+
+@pytest.mark.benchmark(group='procfs.iter_sockets-pids')
+def test_iter_sockets_pids(benchmark, proc_factory, size):
+  root = proc_factory(size, size * 10)
+  benchmark(lambda: list(procfs.iter_sockets(pids=True, root=root)))
+
+@pytest.mark.benchmark(group='procfs.count_sockets')
+def test_count_sockets(benchmark, proc_factory, size):
+  root = proc_factory(size, size * 10)
+  benchmark(procfs.count_sockets, root=root)
+
+@pytest.mark.benchmark(group='procfs.socket_owners')
+def test_socket_owners(benchmark, proc_factory, size):
+  root = proc_factory(size, size * 10)
+  benchmark(procfs.socket_owners, root)
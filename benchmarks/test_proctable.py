@@ -0,0 +1,29 @@
+# benchmarks/test_proctable.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core.proctable import ProcessTable
+
+
+@pytest.mark.benchmark(group='proctable.scan')
+def test_scan(benchmark, proc_factory, size):
+  root = proc_factory(size, size * 10)
+  benchmark(ProcessTable.scan, root)
+
+@pytest.mark.benchmark(group='proctable.refresh')
+def test_refresh(benchmark, proc_factory, size):
+  # Nothing changed: one stat read per pid and no fd walks
+  root = proc_factory(size, size * 10)
+  table = ProcessTable.scan(root)
+  benchmark(table.refresh)
+
+@pytest.mark.benchmark(group='proctable.subtree')
+def test_subtree(benchmark, proc_factory, size):
+  table = ProcessTable.scan(proc_factory(size, size * 10))
+  benchmark(table.subtree, 1)
+
+@pytest.mark.benchmark(group='proctable.aggregate')
+def test_aggregate(benchmark, proc_factory, size):
+  table = ProcessTable.scan(proc_factory(size, size * 10))
+  benchmark(table.aggregate, 'rss', 'service')
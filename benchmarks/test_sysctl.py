@@ -0,0 +1,58 @@
+# benchmarks/test_sysctl.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core.sysctl import Sysctl, render_config
+
+
+def _sysctl(proc_sys, config, config_dir, sync=True):
+  return Sysctl(
+    sync=sync,
+    log_errors=False,
+    backup_config=False,
+    proc_sys=proc_sys,
+    config=config,
+    config_dir=config_dir,
+  )
+
+@pytest.mark.benchmark(group='sysctl.load')
+def test_load(benchmark, sysctl_tree, size):
+  # Construction plus a bulk read of every key
+  proc_sys, config, config_dir, _ = sysctl_tree(size)
+  benchmark(lambda: _sysctl(proc_sys, config, config_dir).read())
+
+@pytest.mark.benchmark(group='sysctl.get')
+def test_get(benchmark, sysctl_tree, size):
+  proc_sys, config, config_dir, names = sysctl_tree(size)
+
+  def get():
+    sysctl = _sysctl(proc_sys, config, config_dir)
+    return [sysctl[name] for name in names]
+
+  benchmark(get)
+
+@pytest.mark.benchmark(group='sysctl.bulk-set')
+def test_bulk_set(benchmark, sysctl_tree, size):
+  # One transaction: a config rewrite and a procfs write per key. Values
+  # alternate between rounds so every round changes every key.
+  proc_sys, config, config_dir, names = sysctl_tree(size)
+  sysctl = _sysctl(proc_sys, config, config_dir)
+  rounds = iter(range(1_000_000))
+
+  def bulk_set():
+    value = str(next(rounds) % 2)
+    with sysctl.transaction():
+      for name in names:
+        sysctl[name] = value
+
+  benchmark(bulk_set)
+
+@pytest.mark.benchmark(group='sysctl.render_config')
+def test_render_config(benchmark, sysctl_tree, size):
+  _, config, _, names = sysctl_tree(size)
+  with open(config) as f:
+    text = f.read()
+  changes = dict.fromkeys(names[::2], '1')
+
+  benchmark(render_config, text, changes)
@@ -0,0 +1,37 @@
+# benchmarks/test_sysfs.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core import sysfs
+from sysmind.core.ids import IdsDatabase
+
+
+@pytest.mark.benchmark(group='sysfs.pci_devices')
+def test_pci_devices(benchmark, sysfs_factory, size):
+  root = sysfs_factory(pci=size)
+  benchmark(lambda: list(sysfs.pci_devices(root)))
+
+@pytest.mark.benchmark(group='sysfs.usb_devices')
+def test_usb_devices(benchmark, sysfs_factory, size):
+  root = sysfs_factory(usb=size)
+  benchmark(lambda: list(sysfs.usb_devices(root)))
+
+@pytest.mark.benchmark(group='ids.index')
+def test_ids_index(benchmark, pci_ids):
+  # Cold vendor index over a 2000 vendor database
+  def index():
+    database = IdsDatabase(pci_ids)
+    database.vendor('8000')
+    database.close()
+
+  benchmark(index)
+
+@pytest.mark.benchmark(group='ids.lookup')
+def test_ids_lookup(benchmark, pci_ids, size):
+  database = IdsDatabase(pci_ids)
+  database.vendor('8000')
+  lookups = [(f'{0x8000 + i % 2000:04x}', f'{i % 20:04x}') for i in range(size)]
+
+  benchmark(lambda: [database.device(vendor, device) for vendor, device in lookups])
+  database.close()
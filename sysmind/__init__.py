@@ -1,8 +1,15 @@
 # sysmind/__init__.py
 
-# TODO: Include imports for sysmind
-
-from .core import Audit
 from .logging import logger
 
-__all__ = ['Audit', 'logger']
\ No newline at end of file
+__version__ = '0.1.0'
+
+# Keep 'import sysmind' cheap, Audit pulls in the collectors
+def __getattr__(name):
+  if name == 'Audit':
+    from sysmind.core.audit import Audit
+    return Audit
+
+  raise AttributeError(f"module 'sysmind' has no attribute '{name}'")
+
+__all__ = ['Audit', 'logger']
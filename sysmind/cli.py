@@ -0,0 +1,329 @@
+# sysmind/cli.py
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+# Only the standard library is imported up front, each subcommand imports
+# the collectors it needs when it runs so '--help', 'sysctl' and 'bench'
+# start fast
+
+# Must stay unloaded by 'import sysmind.cli', checked by 'sysmind bench'
+HEAVY_MODULES = ('psutil', 'netifaces', 'dns', 'distro', 'usb', 'numpy', 'pyarrow', 'yaml')
+
+# Optional dependencies -> the extra that installs them
+EXTRAS = {
+  'yaml': 'yaml',
+  'jeepney': 'dbus',
+  'numpy': 'sampler',
+  'pyarrow': 'arrow',
+}
+
+# Subcommands that must start within the 'bench' budget
+CHEAP_COMMANDS = (
+  ('--version',),
+  ('collect', '--help'),
+  ('sysctl', 'get', 'kernel.ostype'),
+)
+
+
+def _sections(value):
+  return [section.strip() for section in value.split(',') if section.strip()]
+
+def _text(data, prefix=''):
+  # Flatten nested dicts/lists into 'key = value' lines
+  if isinstance(data, dict):
+    for key, value in data.items():
+      yield from _text(value, f'{prefix}.{key}' if prefix else str(key))
+  elif isinstance(data, list) and any(isinstance(item, (dict, list)) for item in data):
+    for index, item in enumerate(data):
+      yield from _text(item, f'{prefix}[{index}]')
+  else:
+    yield f'{prefix} = {data}'
+
+def _output(data, format):
+  from sysmind.core.records import to_dicts
+
+  data = to_dicts(data)
+  if format == 'json':
+    json.dump(data, sys.stdout, indent=2, sort_keys=True, default=str)
+    sys.stdout.write('\n')
+  elif format == 'yaml':
+    import yaml
+    yaml.safe_dump(data, sys.stdout, sort_keys=True)
+  else:
+    for line in _text(data):
+      print(line)
+
+
+def cmd_collect(args):
+  from sysmind.core.os import OperatingSystem
+  from sysmind.core.snapshot import DEFAULT_SNAPSHOT_SECTIONS, SNAPSHOT_SECTIONS, Snapshot
+  from sysmind.core.stats import Stats, span
+
+  sections = args.sections or list(DEFAULT_SNAPSHOT_SECTIONS)
+  unknown = [section for section in sections if section not in SNAPSHOT_SECTIONS]
+  if unknown:
+    print(f'sysmind: unknown sections: {", ".join(unknown)}', file=sys.stderr)
+    return 2
+
+  columnar = args.format in ('arrow', 'parquet', 'packed')
+  if columnar and not args.output:
+    print(f'sysmind: --format {args.format} needs --output', file=sys.stderr)
+    return 2
+
+  # Collected concurrently within --timeout, sections that don't make it
+  # are reported and left out rather than collected again
+  with Stats() as recorded:
+    with span('collect', sections=len(sections)):
+      snapshot = Snapshot.capture(
+        sections=sections,
+        system=OperatingSystem(),
+        stats=False,
+        timeout=args.timeout,
+      )
+
+  for section, reason in snapshot.missing.items():
+    print(f'sysmind: {section} {reason}, left out', file=sys.stderr)
+  status = 1 if snapshot.missing else 0
+
+  if args.trace:
+    with open(args.trace, 'w') as f:
+      json.dump(recorded.to_otel(), f)
+  if args.prometheus:
+    recorded.write_prometheus(args.prometheus)
+
+  if args.output:
+    snapshot.dump(args.output, format=args.format if columnar else None)
+    return status
+
+  _output(snapshot.to_dict()['sections'], args.format)
+  return status
+
+def cmd_audit(args):
+  from sysmind.core.audit import Audit
+
+  try:
+    audit = Audit.load(args.rules)
+  except (OSError, ValueError) as e:
+    print(f'sysmind: failed to load rules from {args.rules}: {e}', file=sys.stderr)
+    return 2
+
+  report = audit.run(allow_unknown=args.allow_unknown)
+
+  if args.format == 'text':
+    for result in report.results:
+      status = {True: 'PASS', False: 'FAIL', None: 'UNKNOWN'}[result.passed]
+      print(f'{status}  {result.id}  {result.description or ""}'.rstrip())
+    summary = f'{len(report.passed)} passed, {len(report.failed)} failed'
+    if report.unknown:
+      summary += f', {len(report.unknown)} unknown'
+    print(summary)
+  else:
+    _output(report.to_dict(), args.format)
+
+  return 0 if report.ok else 1
+
+def cmd_sysctl_get(args):
+  from sysmind.core.sysctl import Sysctl
+
+  sysctl = Sysctl(sync=False, log_errors=False)
+  values = {}
+  status = 0
+
+  for name in args.names or ['']:
+    if not name or name.endswith('*'):
+      values.update(sysctl.read(name))
+    elif name in sysctl:
+      values[name] = sysctl[name]
+    else:
+      print(f'sysmind: unknown key {name}', file=sys.stderr)
+      status = 1
+
+  if args.format == 'text':
+    for name, value in values.items():
+      print(f'{name} = {value}')
+  else:
+    _output(values, args.format)
+
+  return status
+
+def cmd_sysctl_set(args):
+  from sysmind.core.sysctl import Sysctl, SysctlError
+
+  changes = {}
+  for assignment in args.assignments:
+    name, sep, value = assignment.partition('=')
+    if not sep:
+      print(f'sysmind: expected key=value, got {assignment}', file=sys.stderr)
+      return 2
+    changes[name.strip()] = value.strip()
+
+  sysctl = Sysctl(log_errors=False)
+  try:
+    # All keys are applied and persisted together or not at all
+    with sysctl.transaction():
+      for name, value in changes.items():
+        sysctl[name] = value
+  except SysctlError as e:
+    print(f'sysmind: {e}', file=sys.stderr)
+    return 1
+
+  for name, value in changes.items():
+    print(f'{name} = {value}')
+  return 0
+
+def _median(values):
+  values = sorted(values)
+  middle = len(values) // 2
+  return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+def cmd_bench(args):
+  # Cold start of the cheap subcommands, each in a fresh interpreter
+  import subprocess
+  import time
+
+  status = 0
+
+  for command in CHEAP_COMMANDS:
+    timings = []
+    for _ in range(args.runs):
+      start = time.perf_counter()
+      subprocess.run(
+        [sys.executable, '-m', 'sysmind.cli', *command],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+      )
+      timings.append((time.perf_counter() - start) * 1000)
+
+    median = _median(timings)
+    if median > args.max_ms:
+      status = 1
+    verdict = 'ok' if median <= args.max_ms else 'SLOW'
+    print(f'{verdict:4}  {median:7.1f} ms  sysmind {" ".join(command)}')
+
+  check = (
+    'import sys, sysmind.cli; '
+    f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+  )
+  result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True)
+  loaded = [module for module in result.stdout.strip().split(',') if module]
+  if loaded:
+    status = 1
+    print(f'FAIL  import sysmind.cli loads {", ".join(loaded)}')
+  else:
+    print('ok    import sysmind.cli loads no heavy modules')
+
+  if args.imports:
+    # Slowest imports by cumulative time, from python -X importtime
+    result = subprocess.run(
+      [sys.executable, '-X', 'importtime', '-c', 'import sysmind.cli'],
+      capture_output=True,
+      text=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+      if not line.startswith('import time:') or 'cumulative' in line:
+        continue
+      _, cumulative, name = [field.strip() for field in line[len('import time:'):].split('|')]
+      imports.append((int(cumulative), name))
+    for cumulative, name in sorted(imports, reverse=True)[:args.imports]:
+      print(f'{cumulative / 1000:9.1f} ms  {name}')
+
+  return status
+
+
+def parser():
+  from sysmind import __version__
+
+  formats = ('json', 'yaml', 'text')
+
+  root = argparse.ArgumentParser(
+    prog='sysmind',
+    description='System information and compliance checks.',
+  )
+  root.add_argument('--version', action='version', version=f'sysmind {__version__}')
+  root.add_argument(
+    '-v', '--verbose', action='count', default=0, help='-v for info, -vv for debug logging'
+  )
+  commands = root.add_subparsers(dest='command', metavar='command')
+  commands.required = True
+
+  collect = commands.add_parser('collect', help='collect system information')
+  collect.add_argument(
+    '--sections', type=_sections, help='comma separated sections, default all but listeners'
+  )
+  collect.add_argument('--format', choices=formats + ('arrow', 'parquet', 'packed'), default='json')
+  collect.add_argument(
+    '--output', '-o', help='write a columnar snapshot to this path instead of stdout'
+  )
+  collect.add_argument('--timeout', type=float, help='overall collection timeout in seconds')
+  collect.add_argument('--trace', metavar='PATH', help='write collector spans as OTLP JSON')
+  collect.add_argument(
+    '--prometheus', metavar='PATH', help='write collector metrics in Prometheus text format'
+  )
+  collect.set_defaults(func=cmd_collect)
+
+  audit = commands.add_parser('audit', help='check the system against a rules file')
+  audit.add_argument('rules', help='YAML or JSON rules file')
+  audit.add_argument('--format', choices=formats, default='text')
+  audit.add_argument(
+    '--allow-unknown', action='store_true', help='exit 0 when rules could not be checked'
+  )
+  audit.set_defaults(func=cmd_audit)
+
+  sysctl = commands.add_parser('sysctl', help='read or change kernel parameters')
+  actions = sysctl.add_subparsers(dest='action', metavar='action')
+  actions.required = True
+
+  get = actions.add_parser('get', help='print keys, a trailing * reads a whole prefix')
+  get.add_argument('names', nargs='*')
+  get.add_argument('--format', choices=formats, default='text')
+  get.set_defaults(func=cmd_sysctl_get)
+
+  set_ = actions.add_parser('set', help='apply and persist key=value pairs')
+  set_.add_argument('assignments', nargs='+', metavar='key=value')
+  set_.set_defaults(func=cmd_sysctl_set)
+
+  bench = commands.add_parser('bench', help='measure CLI startup time')
+  bench.add_argument('--runs', type=int, default=10)
+  bench.add_argument('--max-ms', type=float, default=100.0, help='fail when a median exceeds this')
+  bench.add_argument(
+    '--imports', type=int, default=0, metavar='N', help='also list the N slowest imports'
+  )
+  bench.set_defaults(func=cmd_bench)
+
+  return root
+
+def main(argv=None):
+  args = parser().parse_args(argv)
+
+  import logging
+
+  from sysmind.logging import configure
+  configure([logging.WARNING, logging.INFO, logging.DEBUG][min(args.verbose, 2)])
+
+  try:
+    return args.func(args)
+  except KeyboardInterrupt:
+    return 130
+  except ImportError as e:
+    module = (e.name or '').partition('.')[0]
+    if module not in EXTRAS:
+      raise
+    print(
+      f'sysmind: {module} is not installed, install it with: pip install sysmind[{EXTRAS[module]}]',
+      file=sys.stderr,
+    )
+    return 2
+  except BrokenPipeError:
+    # Output piped into head and friends
+    return 0
+
+
+__all__ = ['main', 'parser']
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -1,9 +1,21 @@
 # sysmind/os/__init__.py
 from __future__ import annotations
 
-from sysmind.core.windows import Windows
-from sysmind.core.macos import MacOS
-from sysmind.core.linux import Linux
+from importlib import import_module
 
-__all__ = ['Windows', 'MacOS', 'Linux']
+# Imported on first access so 'import sysmind.core' doesn't load psutil,
+# netifaces and friends
+_EXPORTS = {
+  'Windows': 'sysmind.core.windows',
+  'MacOS': 'sysmind.core.macos',
+  'Linux': 'sysmind.core.linux',
+  'Audit': 'sysmind.core.audit',
+}
 
+def __getattr__(name):
+  if name not in _EXPORTS:
+    raise AttributeError(f"module 'sysmind.core' has no attribute '{name}'")
+
+  return getattr(import_module(_EXPORTS[name]), name)
+
+__all__ = ['Windows', 'MacOS', 'Linux', 'Audit']
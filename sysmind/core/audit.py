@@ -0,0 +1,429 @@
+# sysmind/core/audit.py
+from __future__ import annotations
+
+import json
+import operator
+import os
+from collections import namedtuple
+
+from sysmind.core.records import to_dicts
+from sysmind.logging import logger
+
+# Compiled form of a rule: 'check' takes the index built for 'section' and
+# returns (passed, actual)
+Rule = namedtuple('Rule', ['id', 'section', 'check', 'description', 'source'])
+
+Result = namedtuple('Result', ['id', 'passed', 'actual', 'description'])
+
+OPERATORS = {
+  '==': operator.eq,
+  '!=': operator.ne,
+  '<': operator.lt,
+  '<=': operator.le,
+  '>': operator.gt,
+  '>=': operator.ge,
+  'in': lambda actual, expected: actual in expected,
+  'not in': lambda actual, expected: actual not in expected,
+}
+
+# Rule compilers keyed by the field that identifies the rule type, and the
+# builders turning a collected section into the index rules are checked
+# against. Each section is indexed once per run however many rules use it.
+RULE_TYPES = {}
+INDEXERS = {}
+
+
+def rule_type(field, section):
+  def register(compiler):
+    RULE_TYPES[field] = (section, compiler)
+    return compiler
+  return register
+
+def indexer(section):
+  def register(builder):
+    INDEXERS[section] = builder
+    return builder
+  return register
+
+def _coerce(actual, expected):
+  # sysctl and command output are strings, compare them as the rule's type
+  if actual is None or isinstance(expected, (list, tuple, set)):
+    return actual
+  if isinstance(expected, bool):
+    return str(actual).lower() in ('1', 'true', 'yes', 'on')
+  if isinstance(expected, int):
+    try:
+      return int(actual)
+    except (TypeError, ValueError):
+      return actual
+  if isinstance(expected, str):
+    # Multi-value sysctl keys are tab separated
+    return ' '.join(str(actual).split())
+
+  return actual
+
+def _compare(op, expected):
+  if op not in OPERATORS:
+    raise ValueError(f'Unknown operator: {op}')
+  compare = OPERATORS[op]
+
+  # An absent value (unit not installed, key not set) is in nothing and
+  # equal to nothing: '!=' and 'not in' pass, every other operator fails
+  absent = op in ('!=', 'not in')
+
+  if op in ('in', 'not in'):
+    expected = [' '.join(str(v).split()) if isinstance(v, str) else v for v in expected]
+    sample = expected[0] if expected else None
+    return lambda actual: absent if actual is None else compare(_coerce(actual, sample), expected)
+
+  if isinstance(expected, str):
+    expected = ' '.join(expected.split())
+
+  return lambda actual: absent if actual is None else compare(_coerce(actual, expected), expected)
+
+
+@rule_type('sysctl', section='sysctl')
+def _sysctl_rule(rule):
+  key = rule['sysctl']
+  compare = _compare(rule.get('op', '=='), rule.get('value'))
+
+  def check(values):
+    actual = values.get(key)
+    return compare(actual), actual
+
+  return key, check
+
+@rule_type('port', section='ports')
+def _port_rule(rule):
+  port = int(rule['port'])
+  listening = rule.get('listening', True)
+
+  def check(ports):
+    actual = port in ports
+    return actual == listening, actual
+
+  return port, check
+
+@rule_type('service', section='services')
+def _service_rule(rule):
+  name = rule['service']
+  # 'status' is the sub state ('running', 'exited'), 'active' the active
+  # state and 'enabled' the unit file state ('enabled', 'masked', ...)
+  field = next((key for key in ('enabled', 'active') if key in rule), 'status')
+  compare = _compare(rule.get('op', '=='), rule.get(field, 'running'))
+
+  def check(services):
+    service = services.get(name)
+    if service is None and not name.endswith('.service'):
+      service = services.get(f'{name}.service')
+    actual = service.get(field) if service is not None else None
+    if service is not None and actual is None:
+      # Known unit but no state to compare, systemd isn't running or can't
+      # be asked: unknown rather than failed
+      return None, None
+    return compare(actual), actual
+
+  return name, check
+
+@rule_type('process', section='processes')
+def _process_rule(rule):
+  # {'process': 'sshd'} requires a running sshd, 'running': false forbids
+  # one and 'user' requires every instance to run as that user
+  name = rule['process']
+  running = rule.get('running', True)
+  user = rule.get('user')
+
+  def check(table):
+    processes = table.by_name(name)
+    if not running or not processes:
+      return bool(processes) == running, len(processes)
+    users = sorted({process.user for process in processes})
+    if user is not None:
+      return users == [user], users
+    return True, len(processes)
+
+  return name, check
+
+@rule_type('listener', section='listeners')
+def _listener_rule(rule):
+  # {'listener': 22, 'allow': ['sshd']}: everything listening on the port
+  # must be one of the allowed processes
+  port = int(rule['listener'])
+  allowed = rule.get('allow', [])
+  allowed = {allowed} if isinstance(allowed, str) else set(allowed)
+
+  def check(listeners):
+    names = listeners.get(port, [])
+    return all(name in allowed for name in names), names
+
+  return port, check
+
+
+@rule_type('host', section='hosts')
+def _host_rule(rule):
+  # {'host': 'ads.example.com', 'address': '0.0.0.0'} requires the hosts
+  # file to map the name to that address, without 'address' any entry will
+  # do. 'present': false forbids the mapping (or any entry for the name).
+  name = rule['host']
+  address = rule.get('address')
+  present = rule.get('present', True)
+
+  def check(hosts):
+    addresses = hosts.addresses(name)
+    if address is None:
+      return bool(addresses) == present, addresses
+    return hosts.resolves(name, address) == present, addresses
+
+  return name, check
+
+@rule_type('nameserver', section='resolver')
+def _nameserver_rule(rule):
+  nameserver = str(rule['nameserver'])
+  present = rule.get('present', True)
+
+  def check(nameservers):
+    return (nameserver in nameservers) == present, sorted(nameservers)
+
+  return nameserver, check
+
+@rule_type('mount', section='mounts')
+def _mount_rule(rule):
+  # {'mount': '/tmp', 'options': ['nodev', 'nosuid']} requires /tmp to be
+  # mounted with those options. A glob ('/media/*', '*') and 'fstype'
+  # select several mounts, each must carry the options; nothing selected
+  # passes. 'mounted': false forbids the mount.
+  pattern = rule['mount']
+  options = rule.get('options', [])
+  options = [options] if isinstance(options, str) else list(options)
+  fstypes = rule.get('fstype')
+  mounted = rule.get('mounted', True)
+  glob = any(char in pattern for char in '*?[')
+
+  def check(table):
+    if not mounted:
+      found = [mount.mountpoint for mount in table.select(pattern, fstypes)]
+      return not found, found
+    if not glob and not table.select(pattern, fstypes):
+      return False, None
+    missing = table.missing(options, pattern, fstypes)
+    return not missing, missing
+
+  return pattern, check
+
+
+@indexer('hosts')
+def _index_hosts(hosts):
+  from sysmind.core.hosts import HostsFile
+  return HostsFile.from_entries(hosts)
+
+@indexer('mounts')
+def _index_mounts(mounts):
+  from sysmind.core.mounts import MountTable
+  return MountTable.from_records(mounts)
+
+@indexer('listeners')
+def _index_listeners(listeners):
+  # {port: sorted process names}
+  index = {}
+  for listener in listeners or []:
+    index.setdefault(listener['port'], set()).add(listener['name'])
+  return {port: sorted(names, key=str) for port, names in index.items()}
+
+@indexer('ports')
+def _index_ports(ports):
+  return {port['local_port'] for port in (ports or {}).get('listening_ports', [])}
+
+@indexer('processes')
+def _index_processes(processes):
+  from sysmind.core.proctable import ProcessTable
+  return ProcessTable.from_records(processes)
+
+@indexer('resolver')
+def _index_resolver(resolver):
+  return {str(nameserver) for nameserver in (resolver or {}).get('nameservers') or []}
+
+@indexer('services')
+def _index_services(services):
+  return {service['name']: service for service in services or []}
+
+
+def compile_rule(rule, position=0):
+  fields = [field for field in RULE_TYPES if field in rule]
+  if len(fields) != 1:
+    message = f'Rule {rule.get("id", position)} must have exactly one of: {", ".join(RULE_TYPES)}'
+    logger.error(message)
+    raise ValueError(message)
+
+  section, compiler = RULE_TYPES[fields[0]]
+  key, check = compiler(rule)
+
+  return Rule(
+    str(rule.get('id', f'{fields[0]}:{key}')),
+    section,
+    check,
+    rule.get('description'),
+    rule,
+  )
+
+def load_rules(path):
+  with open(path, 'r') as f:
+    if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+      import yaml
+      data = yaml.safe_load(f)
+    else:
+      data = json.load(f)
+
+  # Either a list of rules or {'rules': [...]}
+  if isinstance(data, dict):
+    data = data.get('rules', [])
+
+  return data or []
+
+
+class Audit(object):
+  def __init__(self, rules=None):
+    self._rules = []
+    self._index = {}
+
+    for rule in rules or []:
+      self.add(rule)
+
+  @classmethod
+  def load(cls, path):
+    return cls(load_rules(path))
+
+  def add(self, rule):
+    position = len(self._rules)
+    compiled = compile_rule(rule, position)
+    self._rules.append(compiled)
+    self._index.setdefault(compiled.section, []).append((position, compiled))
+    return compiled
+
+  def __len__(self):
+    return len(self._rules)
+
+  @property
+  def rules(self):
+    return self._rules
+
+  @property
+  def sections(self):
+    return list(self._index)
+
+  def _collect(self, system, sysctl):
+    data = {}
+
+    # Only the sections the active rules need, gathered concurrently
+    os_sections = [section for section in self._index if section != 'sysctl']
+    if os_sections:
+      if system is None:
+        from sysmind.core.os import OperatingSystem
+        system = OperatingSystem()
+      # collect() only runs the sections the system hasn't memoized or
+      # cached yet, the values themselves are read through the properties
+      collection = system.collect(os_sections)
+      for section in os_sections:
+        if section in collection.errors or section in collection.timed_out:
+          logger.error(f'Failed to collect {section}, its rules will fail.')
+          continue
+        data[section] = getattr(system, section)
+
+    if 'sysctl' in self._index:
+      if sysctl is None:
+        from sysmind.core.sysctl import Sysctl
+        sysctl = Sysctl(sync=False, log_errors=False)
+      keys = {rule.source['sysctl'] for _, rule in self._index['sysctl']}
+      data['sysctl'] = {key: sysctl[key] for key in keys if key in sysctl}
+
+    return data
+
+  def run(self, system=None, sysctl=None, data=None, allow_unknown=False):
+    # 'data' maps sections to already collected values, e.g. a Snapshot's.
+    # The report is only ok with unknown results when allow_unknown is set.
+    if data is None:
+      data = self._collect(system, sysctl)
+
+    # Evaluated section by section, reported in rule order. Rules on a
+    # section missing from 'data' fail, nothing was checked. A check
+    # returning None for passed is reported as unknown.
+    results = [None] * len(self._rules)
+    for section, rules in self._index.items():
+      if section not in data:
+        for position, rule in rules:
+          results[position] = Result(rule.id, False, None, rule.description)
+        continue
+
+      value = data[section]
+      index = INDEXERS[section](value) if section in INDEXERS else (value or {})
+
+      for position, rule in rules:
+        try:
+          passed, actual = rule.check(index)
+        except Exception as e:
+          logger.error(f'Rule {rule.id} failed to evaluate. Error: {e}')
+          passed, actual = False, None
+        passed = None if passed is None else bool(passed)
+        results[position] = Result(rule.id, passed, actual, rule.description)
+
+    return AuditReport(results, allow_unknown)
+
+
+class AuditReport(object):
+  def __init__(self, results, allow_unknown=False):
+    self._results = results
+    self._allow_unknown = allow_unknown
+
+  def __repr__(self):
+    passed, failed, unknown = len(self.passed), len(self.failed), len(self.unknown)
+    return f'AuditReport(passed={passed}, failed={failed}, unknown={unknown})'
+
+  def __iter__(self):
+    return iter(self._results)
+
+  def __len__(self):
+    return len(self._results)
+
+  @property
+  def results(self):
+    return self._results
+
+  @property
+  def passed(self):
+    return [result for result in self._results if result.passed is True]
+
+  @property
+  def failed(self):
+    return [result for result in self._results if result.passed is False]
+
+  @property
+  def unknown(self):
+    return [result for result in self._results if result.passed is None]
+
+  @property
+  def ok(self):
+    # Nothing checked is not compliant: unknown results fail the report
+    # unless it was run with allow_unknown
+    if self.failed:
+      return False
+    return self._allow_unknown or not self.unknown
+
+  def to_dict(self):
+    return {
+      'ok': self.ok,
+      'passed': len(self.passed),
+      'failed': len(self.failed),
+      'unknown': len(self.unknown),
+      'results': [to_dicts(result) for result in self._results],
+    }
+
+
+__all__ = [
+  'Audit',
+  'AuditReport',
+  'Result',
+  'Rule',
+  'compile_rule',
+  'load_rules',
+  'rule_type',
+  'indexer',
+]
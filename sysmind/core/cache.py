@@ -0,0 +1,200 @@
+# sysmind/core/cache.py
+from __future__ import annotations
+
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from sysmind.logging import logger
+
+# Seconds each section stays cached by default. Hardware and kernel facts
+# only change across reboots or hotplug, volatile sections (ports,
+# processes, services, ...) are not listed and are never cached.
+DEFAULT_TTLS = {
+  'cpu_count': 3600,
+  'cpu_frequency': 3600,
+  'memory': 3600,
+  'posix_compliant': 3600,
+  'kernel_name': 3600,
+  'kernel_version': 3600,
+  'pci_devices': 300,
+  'usb_devices': 60,
+}
+
+# Key tagging a record in the encoded form, with its 'module:Name'
+RECORD_KEY = '__record__'
+
+
+def _encode(value):
+  # JSON types only, records tagged so they come back as records. Containers
+  # are always rebuilt, the cache never holds a caller's mutable object.
+  if value is None or isinstance(value, (bool, int, float, str)):
+    return value
+  if isinstance(value, tuple) and hasattr(value, '_fields'):
+    kind = type(value)
+    return {RECORD_KEY: f'{kind.__module__}:{kind.__name__}', 'fields': _encode(list(value))}
+  if isinstance(value, dict):
+    return {str(key): _encode(item) for key, item in value.items()}
+  if isinstance(value, (list, tuple)):
+    return [_encode(item) for item in value]
+  raise TypeError(f'Cannot cache {type(value).__name__} values')
+
+@lru_cache(maxsize=None)
+def _record_type(name):
+  # Only record types defined in sysmind are looked up, nothing else from a
+  # cache file is imported or called
+  module, _, qualname = name.partition(':')
+  if module != 'sysmind' and not module.startswith('sysmind.'):
+    raise ValueError(f'Not a sysmind record: {name}')
+  kind = getattr(importlib.import_module(module), qualname, None)
+  if not (isinstance(kind, type) and issubclass(kind, tuple) and hasattr(kind, '_fields')):
+    raise ValueError(f'Not a sysmind record: {name}')
+  return kind
+
+def _decode(value):
+  # A fresh copy of an encoded value, tuples other than records come back as
+  # lists
+  if isinstance(value, dict):
+    if RECORD_KEY in value:
+      return _record_type(value[RECORD_KEY])._make(_decode(value['fields']))
+    return {key: _decode(item) for key, item in value.items()}
+  if isinstance(value, list):
+    return [_decode(item) for item in value]
+  return value
+
+
+class Cache(object):
+  # TTL cache for collector results, keyed by section. Entries beyond
+  # max_entries are evicted least recently used first. Values are stored
+  # encoded and every get() returns a new copy, so callers can't change
+  # what other OperatingSystem instances see. With a path, entries are also
+  # written as JSON to '<path>/<section>.json' so short-lived processes
+  # share them.
+  def __init__(self, ttls=None, default_ttl=0, max_entries=128, path=None):
+    self._ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+    self._default_ttl = default_ttl
+    self._max_entries = max_entries
+    self._path = path
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+    if path is not None:
+      os.makedirs(path, mode=0o700, exist_ok=True)
+
+  def __repr__(self):
+    return f'Cache(entries={list(self._entries)}, path={self._path})'
+
+  def __len__(self):
+    return len(self._entries)
+
+  def ttl(self, section):
+    return self._ttls.get(section, self._default_ttl)
+
+  def set_ttl(self, section, ttl):
+    self._ttls[section] = ttl
+    if not ttl:
+      self.invalidate(section)
+
+  def _file(self, section):
+    return os.path.join(self._path, f'{section}.json')
+
+  def get(self, section):
+    # Returns (hit, value)
+    if not self.ttl(section):
+      return False, None
+
+    now = time.time()
+    with self._lock:
+      entry = self._entries.get(section)
+      if entry is not None:
+        if entry[0] > now:
+          self._entries.move_to_end(section)
+          return True, _decode(entry[1])
+        del self._entries[section]
+
+    if self._path is not None:
+      entry = self._read(section)
+      if entry is not None and entry[0] > now:
+        try:
+          value = _decode(entry[1])
+        except Exception as e:
+          logger.warning(f'Failed to read cache entry {section}. Error: {e}')
+          return False, None
+        self._put(section, entry)
+        return True, value
+
+    return False, None
+
+  def set(self, section, value):
+    ttl = self.ttl(section)
+    if not ttl:
+      return
+
+    try:
+      entry = (time.time() + ttl, _encode(value))
+    except TypeError as e:
+      logger.warning(f'Failed to cache {section}. Error: {e}')
+      return
+    self._put(section, entry)
+
+    if self._path is not None:
+      self._write(section, entry)
+
+  def _put(self, section, entry):
+    with self._lock:
+      self._entries[section] = entry
+      self._entries.move_to_end(section)
+      while len(self._entries) > self._max_entries:
+        self._entries.popitem(last=False)
+
+  def _read(self, section):
+    try:
+      with open(self._file(section), 'r') as f:
+        data = json.load(f)
+      return float(data['expires']), data['value']
+    except FileNotFoundError:
+      return None
+    except Exception as e:
+      logger.warning(f'Failed to read cache entry {section}. Error: {e}')
+      return None
+
+  def _write(self, section, entry):
+    try:
+      fd, temp_path = tempfile.mkstemp(prefix=f'.{section}.', dir=self._path)
+      with os.fdopen(fd, 'w') as f:
+        json.dump({'expires': entry[0], 'value': entry[1]}, f)
+      os.replace(temp_path, self._file(section))
+    except Exception as e:
+      logger.warning(f'Failed to write cache entry {section}. Error: {e}')
+
+  def invalidate(self, sections=None):
+    if sections is None:
+      sections = list(self._entries)
+      if self._path is not None:
+        names = os.listdir(self._path)
+        sections += [name[:-len('.json')] for name in names if name.endswith('.json')]
+    elif isinstance(sections, str):
+      sections = [sections]
+
+    with self._lock:
+      for section in sections:
+        self._entries.pop(section, None)
+
+    if self._path is not None:
+      for section in sections:
+        try:
+          os.unlink(self._file(section))
+        except FileNotFoundError:
+          pass
+
+
+# Shared by every OperatingSystem created without an explicit cache
+default_cache = Cache()
+
+
+__all__ = ['Cache', 'DEFAULT_TTLS', 'default_cache']
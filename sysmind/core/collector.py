@@ -0,0 +1,271 @@
+# sysmind/core/collector.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future
+from concurrent.futures import wait as _wait
+
+from sysmind.core import stats
+from sysmind.logging import logger
+
+
+class Command(object):
+  # A collector backed by a single subprocess. Calling it forks with
+  # subprocess, acall() runs the same command through asyncio so it does not
+  # hold a worker thread while the child runs. Failures are logged and
+  # raised, collect() and acollect() report them in Collection.errors.
+  def __init__(self, args, parse, error=None):
+    self._args = list(args)
+    self._parse = parse
+    self._error = error or f'Failed to run {self._args[0]}.'
+
+  def __repr__(self):
+    return f'Command({" ".join(self._args)})'
+
+  @property
+  def args(self):
+    return self._args
+
+  def __call__(self):
+    stats.fork()
+    try:
+      output = subprocess.check_output(self._args, text=True)
+      return self._parse(output)
+    except Exception as e:
+      logger.error(f'{self._error} Error: {e}')
+      raise
+
+  async def acall(self):
+    stats.fork()
+    try:
+      process = await asyncio.create_subprocess_exec(
+        *self._args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+      )
+    except Exception as e:
+      logger.error(f'{self._error} Error: {e}')
+      raise
+
+    try:
+      stdout, _ = await process.communicate()
+    except asyncio.CancelledError:
+      # Don't leave the child running when the collector times out
+      if process.returncode is None:
+        process.kill()
+        await process.wait()
+      raise
+
+    if process.returncode != 0:
+      e = subprocess.CalledProcessError(process.returncode, self._args)
+      logger.error(f'{self._error} Error: {e}')
+      raise e
+
+    try:
+      return self._parse(stdout.decode())
+    except Exception as e:
+      logger.error(f'{self._error} Error: {e}')
+      raise
+
+
+class Collection(object):
+  # Outcome of a collect()/acollect() run. Sections that failed or timed out
+  # are missing from results so callers can use whatever did finish.
+  def __init__(self):
+    self._results = {}
+    self._errors = {}
+    self._timed_out = []
+    self._durations = {}
+
+  def __repr__(self):
+    return (
+      f'Collection(results={list(self._results)}, errors={list(self._errors)},'
+      f' timed_out={self._timed_out})'
+    )
+
+  def __getitem__(self, name):
+    return self._results[name]
+
+  def __contains__(self, name):
+    return name in self._results
+
+  @property
+  def results(self):
+    return self._results
+
+  @property
+  def errors(self):
+    return self._errors
+
+  @property
+  def timed_out(self):
+    return self._timed_out
+
+  @property
+  def durations(self):
+    return self._durations
+
+  @property
+  def complete(self):
+    return not self._errors and not self._timed_out
+
+
+def _timeout_for(name, timeout, timeouts):
+  if timeouts is not None and name in timeouts:
+    return timeouts[name]
+
+  return timeout
+
+def _run(name, collector, collection):
+  start = time.perf_counter()
+  try:
+    return stats.call(name, collector)
+  finally:
+    collection._durations[name] = time.perf_counter() - start
+
+def _worker(jobs, lock):
+  while True:
+    with lock:
+      if not jobs:
+        return
+      future, started, function, args = jobs.popleft()
+    if not future.set_running_or_notify_cancel():
+      continue
+    # Timeouts count from here, a job waiting for a free worker isn't late
+    started.set_result(time.monotonic())
+    try:
+      result = function(*args)
+    except BaseException as e:
+      future.set_exception(e)
+    else:
+      future.set_result(result)
+
+def _jobs(collectors, collection):
+  # (jobs, {future: name}, {future: future set when a worker starts it})
+  jobs = deque()
+  futures = {}
+  starts = {}
+  for name, collector in collectors.items():
+    # Run in a copy of the caller's context so collector spans nest under
+    # the caller's span
+    context = contextvars.copy_context()
+    future = Future()
+    started = Future()
+    jobs.append((future, started, context.run, (_run, name, collector, collection)))
+    futures[future] = name
+    starts[future] = started
+  return jobs, futures, starts
+
+def _store(done, futures, collection):
+  for future in done:
+    name = futures[future]
+    try:
+      collection._results[name] = future.result()
+    except Exception as e:
+      logger.error(f'Collector {name} failed. Error: {e}')
+      collection._errors[name] = e
+
+def _expire(pending, futures, starts, limits, collection):
+  # Drops running collectors past their limit from 'pending', returns the
+  # seconds until the next deadline or None without one
+  now = time.monotonic()
+  remaining = None
+  for future in list(pending):
+    name = futures[future]
+    started = starts[future]
+    if name not in limits or not started.done():
+      continue
+    left = started.result() + limits[name] - now
+    if left > 0:
+      remaining = left if remaining is None else min(remaining, left)
+      continue
+    # Threads can't be interrupted, the collector keeps running in the
+    # background but its result is discarded
+    logger.warning(f'Collector {name} timed out after {limits[name]}s.')
+    collection._timed_out.append(name)
+    pending.discard(future)
+  return remaining
+
+def collect(collectors, timeout=None, timeouts=None, max_workers=None):
+  # Each collector's timeout runs from when a worker starts it
+  collection = Collection()
+
+  if not collectors:
+    return collection
+
+  limits = {}
+  for name in collectors:
+    limit = _timeout_for(name, timeout, timeouts)
+    if limit is not None:
+      limits[name] = limit
+
+  # Daemon threads rather than a ThreadPoolExecutor: a timed out collector
+  # can't be interrupted, and the executor's threads would be joined at
+  # interpreter exit, holding the process until the collector returns
+  jobs, futures, starts = _jobs(collectors, collection)
+  lock = threading.Lock()
+  for _ in range(min(max_workers or len(jobs), len(jobs))):
+    threading.Thread(target=_worker, args=(jobs, lock), name='sysmind', daemon=True).start()
+
+  pending = set(futures)
+  try:
+    while pending:
+      remaining = _expire(pending, futures, starts, limits, collection)
+      if not pending:
+        break
+      # Woken when a collector finishes, or when one with a limit starts and
+      # its deadline becomes known
+      waiting = {starts[f] for f in pending if futures[f] in limits and not starts[f].done()}
+      done, _ = _wait(pending | waiting, timeout=remaining, return_when=FIRST_COMPLETED)
+      done = [future for future in done if future in pending]
+      _store(done, futures, collection)
+      pending.difference_update(done)
+  finally:
+    # Collectors not started yet never will be
+    for future in futures:
+      future.cancel()
+
+  return collection
+
+async def _arun(name, collector, limit, collection):
+  start = time.perf_counter()
+
+  if isinstance(collector, Command):
+    coroutine = collector.acall()
+  elif asyncio.iscoroutinefunction(collector):
+    coroutine = collector()
+  else:
+    coroutine = asyncio.to_thread(collector)
+
+  with stats.span(name) as current:
+    try:
+      collection._results[name] = await asyncio.wait_for(coroutine, limit)
+      if current is not None:
+        current.items = stats.count_items(collection._results[name])
+    except asyncio.TimeoutError:
+      logger.warning(f'Collector {name} timed out after {limit}s.')
+      stats.error(f'Timed out after {limit}s')
+      collection._timed_out.append(name)
+    except Exception as e:
+      logger.error(f'Collector {name} failed. Error: {e}')
+      collection._errors[name] = e
+    finally:
+      collection._durations[name] = time.perf_counter() - start
+
+async def acollect(collectors, timeout=None, timeouts=None):
+  collection = Collection()
+
+  await asyncio.gather(*[
+    _arun(name, collector, _timeout_for(name, timeout, timeouts), collection)
+    for name, collector in collectors.items()
+  ])
+
+  return collection
+
+
+__all__ = ['Command', 'Collection', 'collect', 'acollect']
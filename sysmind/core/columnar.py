@@ -0,0 +1,592 @@
+# sysmind/core/columnar.py
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from sysmind.logging import logger
+
+# Packed format: magic, header length, JSON header, then 8-byte aligned
+# column blocks. Integers are int64 (INT_NULL for missing), floats float64,
+# booleans int8 (-1 for missing). Strings and nested values (JSON text) are
+# dictionary encoded: unique values are stored once and rows hold int32
+# codes, -1 for None and -2 where the row didn't have the key at all.
+# Columns whose values are all distinct skip the codes.
+MAGIC = b'SYSMIND\x01'
+INT_NULL = -(2 ** 63)
+NULL_CODE = -1
+ABSENT_CODE = -2
+
+
+class _Missing(object):
+  def __repr__(self):
+    return 'MISSING'
+
+  def __bool__(self):
+    return False
+
+# Column value for rows that didn't have the key at all, Table.rows() leaves
+# those keys out
+MISSING = _Missing()
+
+_HEADER = struct.Struct('<8sQ')
+
+
+def _arrow():
+  # pyarrow is optional, the packed format is always available
+  try:
+    import pyarrow
+  except ImportError:
+    return None
+  return pyarrow
+
+
+class Table(object):
+  # One section as named columns of equal length. 'shape' and 'key' record
+  # how to rebuild the section's original structure.
+  def __init__(self, columns, shape='rows', key=None, groups=None):
+    self._columns = columns
+    self._shape = shape
+    self._key = key
+    self._groups = groups
+
+  def __repr__(self):
+    return f'Table(rows={len(self)}, columns={list(self._columns)})'
+
+  def __len__(self):
+    for values in self._columns.values():
+      return len(values)
+    return 0
+
+  def __getitem__(self, name):
+    return self._columns[name]
+
+  @property
+  def columns(self):
+    return self._columns
+
+  @property
+  def shape(self):
+    return self._shape
+
+  @property
+  def key(self):
+    return self._key
+
+  @property
+  def groups(self):
+    return self._groups
+
+  def rows(self):
+    names = list(self._columns)
+    columns = [self._columns[name] for name in names]
+    for values in zip(*columns, strict=True):
+      yield {name: value for name, value in zip(names, values, strict=True) if value is not MISSING}
+
+
+def _table(rows, shape='rows', key=None, groups=None):
+  names = []
+  for row in rows:
+    for name in row:
+      if name not in names:
+        names.append(name)
+
+  columns = {name: [row.get(name, MISSING) for row in rows] for name in names}
+  return Table(columns, shape, key, groups)
+
+def _section_table(value):
+  # Flatten a snapshot section into rows
+  if isinstance(value, list):
+    return _table([row if isinstance(row, dict) else {'value': row} for row in value])
+
+  if isinstance(value, dict):
+    groups = list(value.values())
+    if groups and all(isinstance(group, list) for group in groups):
+      # get_ports() style {'group': [rows]}
+      rows = [dict(row, group=name) for name, group in value.items() for row in group]
+      return _table(rows, 'groups', 'group', list(value))
+    if groups and all(isinstance(row, dict) for row in groups):
+      # get_interfaces() style {'name': row}
+      return _table([dict(row, _key=name) for name, row in value.items()], 'mapping', '_key')
+    return _table([{'key': name, 'value': row} for name, row in value.items()], 'pairs', 'key')
+
+  return _table([{'value': value}], 'scalar')
+
+def to_columnar(snapshot):
+  return {section: _section_table(snapshot[section]) for section in snapshot.sections}
+
+def _rebuild(table):
+  rows = list(table.rows())
+
+  if table.shape == 'scalar':
+    return rows[0]['value'] if rows else None
+
+  if table.shape == 'pairs':
+    return {row['key']: row['value'] for row in rows}
+
+  if table.shape == 'mapping':
+    return {row.pop('_key'): row for row in rows}
+
+  if table.shape == 'groups':
+    groups = {name: [] for name in table.groups or []}
+    for row in rows:
+      groups.setdefault(row.pop('group'), []).append(row)
+    return groups
+
+  if list(table.columns) == ['value']:
+    return [row['value'] for row in rows]
+
+  return rows
+
+def _is_int(value):
+  # Fits an int64 column without colliding with the null sentinel
+  return isinstance(value, int) and not isinstance(value, bool) and INT_NULL < value < 2 ** 63
+
+def _column_type(values):
+  if any(value is MISSING for value in values):
+    return 'json'
+
+  present = [value for value in values if value is not None]
+  if present and all(isinstance(value, bool) for value in present):
+    return 'bool'
+  if present and all(_is_int(value) for value in present):
+    return 'int'
+  if present and all(isinstance(value, float) for value in present):
+    return 'float'
+  if all(isinstance(value, str) for value in present):
+    return 'str'
+  return 'json'
+
+
+class _Writer(object):
+  def __init__(self):
+    self._blocks = []
+    self._offset = 0
+
+  def add(self, data):
+    data = bytes(data)
+    offset = self._offset
+    padding = -len(data) % 8
+    self._blocks.append(data + b'\0' * padding)
+    self._offset += len(data) + padding
+    return [offset, len(data)]
+
+  @property
+  def blocks(self):
+    return self._blocks
+
+def _encode_column(writer, values, column_type):
+  if column_type == 'int':
+    return {'data': writer.add(array('q', [INT_NULL if v is None else v for v in values]))}
+
+  if column_type == 'float':
+    return {'data': writer.add(array('d', [float('nan') if v is None else v for v in values]))}
+
+  if column_type == 'bool':
+    return {'data': writer.add(array('b', [-1 if v is None else int(v) for v in values]))}
+
+  if column_type == 'json':
+    values = [v if v is None or v is MISSING else json.dumps(v, sort_keys=True) for v in values]
+
+  return _encode_dictionary(writer, values)
+
+def _encode_dictionary(writer, values):
+  # Strings as a dictionary of distinct values plus a code per row
+  dictionary = {}
+  codes = array('i')
+  for value in values:
+    if value is None:
+      codes.append(NULL_CODE)
+      continue
+    if value is MISSING:
+      codes.append(ABSENT_CODE)
+      continue
+    code = dictionary.get(value)
+    if code is None:
+      code = dictionary[value] = len(dictionary)
+    codes.append(code)
+
+  encoded = [value.encode('utf-8') for value in dictionary]
+  offsets = array('I', [0])
+  for value in encoded:
+    offsets.append(offsets[-1] + len(value))
+
+  column = {
+    'dictionary': writer.add(b''.join(encoded)),
+    'offsets': writer.add(offsets),
+  }
+  # Row i holds value i when every value is distinct
+  if len(dictionary) != len(values):
+    column['data'] = writer.add(codes)
+
+  return column
+
+def _dump_packed(tables, path, taken):
+  writer = _Writer()
+  header = {'taken': taken, 'sections': {}}
+
+  for section, table in tables.items():
+    columns = []
+    for name, values in table.columns.items():
+      column_type = _column_type(values)
+      column = {'name': name, 'type': column_type}
+      column.update(_encode_column(writer, values, column_type))
+      columns.append(column)
+    header['sections'][section] = {
+      'rows': len(table),
+      'shape': table.shape,
+      'key': table.key,
+      'groups': table.groups,
+      'columns': columns,
+    }
+
+  encoded = json.dumps(header, sort_keys=True).encode('utf-8')
+  encoded += b' ' * (-(len(encoded) + _HEADER.size) % 8)
+
+  temp_path = f'{path}.tmp'
+  try:
+    with open(temp_path, 'wb') as f:
+      f.write(_HEADER.pack(MAGIC, len(encoded)))
+      f.write(encoded)
+      for block in writer.blocks:
+        f.write(block)
+    os.replace(temp_path, path)
+  except BaseException:
+    if os.path.exists(temp_path):
+      os.unlink(temp_path)
+    raise
+
+def _dump_arrow(tables, path, taken, format):
+  import pyarrow
+  import pyarrow.feather
+  import pyarrow.parquet
+
+  os.makedirs(path, exist_ok=True)
+  for section, table in tables.items():
+    arrays = {}
+    # Arrow has no notion of a missing key. Columns with rows that lack the
+    # key are JSON columns: None is stored as the text 'null' and those rows
+    # as nulls, so loading leaves the key out again.
+    absent = []
+    for name, values in table.columns.items():
+      column_type = _column_type(values)
+      if any(v is MISSING for v in values):
+        absent.append(name)
+        values = [None if v is MISSING else json.dumps(v, sort_keys=True) for v in values]
+      elif column_type == 'json':
+        values = [None if v is None else json.dumps(v, sort_keys=True) for v in values]
+      data = pyarrow.array(values)
+      if column_type in ('str', 'json'):
+        data = data.cast(pyarrow.string()).dictionary_encode()
+      arrays[name] = (data, column_type)
+
+    metadata = {
+      'sysmind': json.dumps({
+        'taken': taken,
+        'shape': table.shape,
+        'key': table.key,
+        'groups': table.groups,
+        'types': {name: column_type for name, (_, column_type) in arrays.items()},
+        'absent': absent,
+      }),
+    }
+    fields = [(name, data.type) for name, (data, _) in arrays.items()]
+    schema = pyarrow.schema(fields, metadata=metadata)
+    arrow_table = pyarrow.Table.from_arrays([data for data, _ in arrays.values()], schema=schema)
+
+    if format == 'parquet':
+      file_path = os.path.join(path, f'{section}.parquet')
+      pyarrow.parquet.write_table(arrow_table, file_path, use_dictionary=True)
+    else:
+      file_path = os.path.join(path, f'{section}.arrow')
+      pyarrow.feather.write_feather(arrow_table, file_path, compression='uncompressed')
+
+def dump(snapshot, path, format=None):
+  # 'packed' writes a single file, 'arrow' and 'parquet' a directory with
+  # one file per section. Without a format Arrow is used when pyarrow is
+  # installed.
+  if format is None:
+    format = 'arrow' if _arrow() is not None else 'packed'
+
+  if format not in ('packed', 'arrow', 'parquet'):
+    raise ValueError(f'Unknown format: {format}')
+
+  if format != 'packed' and _arrow() is None:
+    logger.error(f'pyarrow is required for the {format} format.')
+    raise ImportError(f'pyarrow is required for the {format} format.')
+
+  tables = to_columnar(snapshot)
+  if format == 'packed':
+    _dump_packed(tables, path, snapshot.taken)
+  else:
+    _dump_arrow(tables, path, snapshot.taken, format)
+
+  return path
+
+
+class DictionaryColumn(object):
+  # Dictionary encoded strings over the mapped file. Codes are a zero-copy
+  # int32 view, values are decoded on access.
+  def __init__(self, codes, dictionary, offsets, decode=None):
+    # Without codes every row has its own dictionary entry
+    if codes is None:
+      codes = range(len(offsets) - 1)
+    self._codes = codes
+    self._dictionary = dictionary
+    self._offsets = offsets
+    self._decode = decode
+    self._cache = {}
+
+  def __len__(self):
+    return len(self._codes)
+
+  @property
+  def codes(self):
+    return self._codes
+
+  @property
+  def dictionary(self):
+    return [self.value(code) for code in range(len(self._offsets) - 1)]
+
+  def value(self, code):
+    if code == ABSENT_CODE:
+      return MISSING
+    if code < 0:
+      return None
+    if code not in self._cache:
+      text = bytes(self._dictionary[self._offsets[code]:self._offsets[code + 1]]).decode('utf-8')
+      self._cache[code] = self._decode(text) if self._decode is not None else text
+    return self._cache[code]
+
+  def __getitem__(self, index):
+    return self.value(self._codes[index])
+
+  def __iter__(self):
+    for code in self._codes:
+      yield self.value(code)
+
+  def count(self, value):
+    # Compares codes only, the string is looked up once
+    for code in range(len(self._offsets) - 1):
+      if self.value(code) == value:
+        return sum(1 for c in self._codes if c == code)
+    return 0
+
+
+class _NullableColumn(object):
+  def __init__(self, data, null):
+    self._data = data
+    self._null = null
+
+  def __len__(self):
+    return len(self._data)
+
+  @property
+  def data(self):
+    # Raw zero-copy view, missing values hold the null sentinel
+    return self._data
+
+  def __getitem__(self, index):
+    value = self._data[index]
+    return None if value == self._null else value
+
+  def __iter__(self):
+    for value in self._data:
+      yield None if value == self._null else value
+
+
+class _BoolColumn(_NullableColumn):
+  def __getitem__(self, index):
+    value = self._data[index]
+    return None if value < 0 else bool(value)
+
+  def __iter__(self):
+    for value in self._data:
+      yield None if value < 0 else bool(value)
+
+
+class _FloatColumn(_NullableColumn):
+  def __getitem__(self, index):
+    value = self._data[index]
+    return None if value != value else value
+
+  def __iter__(self):
+    for value in self._data:
+      yield None if value != value else value
+
+
+class _ArrowColumn(object):
+  # Wraps a memory mapped Arrow column, values are converted on access.
+  # With absent set, nulls are rows that didn't have the key.
+  def __init__(self, data, decode=None, absent=False):
+    self._data = data
+    self._decode = decode
+    self._absent = absent
+
+  def __len__(self):
+    return len(self._data)
+
+  @property
+  def data(self):
+    return self._data
+
+  def _value(self, value):
+    if value is None:
+      return MISSING if self._absent else None
+    return self._decode(value) if self._decode is not None else value
+
+  def __getitem__(self, index):
+    return self._value(self._data[index].as_py())
+
+  def __iter__(self):
+    for chunk in self._data.chunks:
+      for value in chunk.to_pylist():
+        yield self._value(value)
+
+
+class ColumnarSnapshot(object):
+  def __init__(self, tables, taken=None, close=None):
+    self._tables = tables
+    self._taken = taken
+    self._close = close
+
+  def __repr__(self):
+    return f'ColumnarSnapshot(sections={list(self._tables)})'
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def close(self):
+    # Drop column views before unmapping, memoryviews pin the mapping
+    self._tables = {}
+    if self._close is not None:
+      self._close()
+      self._close = None
+
+  def __getitem__(self, section):
+    return self._tables[section]
+
+  def __contains__(self, section):
+    return section in self._tables
+
+  @property
+  def sections(self):
+    return list(self._tables)
+
+  @property
+  def taken(self):
+    return self._taken
+
+  def to_snapshot(self):
+    from sysmind.core.snapshot import Snapshot
+    data = {section: _rebuild(table) for section, table in self._tables.items()}
+    return Snapshot(data, taken=self._taken)
+
+
+def _packed_column(column, block):
+  column_type = column['type']
+  if column_type == 'int':
+    return _NullableColumn(block(column['data'], 'q'), INT_NULL)
+  if column_type == 'float':
+    return _FloatColumn(block(column['data'], 'd'), None)
+  if column_type == 'bool':
+    return _BoolColumn(block(column['data'], 'b'), None)
+  return DictionaryColumn(
+    block(column['data'], 'i') if 'data' in column else None,
+    block(column['dictionary']),
+    block(column['offsets'], 'I'),
+    json.loads if column_type == 'json' else None,
+  )
+
+def _load_packed(path):
+  f = open(path, 'rb')
+  mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+  view = memoryview(mapped)
+
+  magic, length = _HEADER.unpack_from(mapped, 0)
+  if magic != MAGIC:
+    view.release()
+    mapped.close()
+    f.close()
+    raise ValueError(f'{path} is not a sysmind columnar file')
+
+  header = json.loads(bytes(view[_HEADER.size:_HEADER.size + length]))
+  base = _HEADER.size + length
+  views = []
+
+  def block(location, fmt=None):
+    offset, size = location
+    data = view[base + offset:base + offset + size]
+    if fmt is not None:
+      data = data.cast(fmt)
+    views.append(data)
+    return data
+
+  tables = {}
+  for section, info in header['sections'].items():
+    columns = {column['name']: _packed_column(column, block) for column in info['columns']}
+    tables[section] = Table(columns, info['shape'], info['key'], info.get('groups'))
+
+  def close():
+    for data in views:
+      data.release()
+    view.release()
+    mapped.close()
+    f.close()
+
+  return ColumnarSnapshot(tables, header.get('taken'), close)
+
+def _load_arrow(path):
+  if _arrow() is None:
+    logger.error(f'pyarrow is required to load {path}.')
+    raise ImportError(f'pyarrow is required to load {path}.')
+  import pyarrow.feather
+  import pyarrow.parquet
+
+  tables = {}
+  taken = None
+  for name in sorted(os.listdir(path)):
+    section, extension = os.path.splitext(name)
+    file_path = os.path.join(path, name)
+    if extension == '.arrow':
+      # Memory mapped, columns reference the file without copying
+      arrow_table = pyarrow.feather.read_table(file_path, memory_map=True)
+    elif extension == '.parquet':
+      arrow_table = pyarrow.parquet.read_table(file_path, memory_map=True)
+    else:
+      continue
+
+    info = json.loads(arrow_table.schema.metadata[b'sysmind'])
+    taken = info['taken']
+    columns = {}
+    absent = set(info.get('absent', ()))
+    for column_name in arrow_table.column_names:
+      decode = json.loads if info['types'].get(column_name) == 'json' else None
+      column = arrow_table.column(column_name)
+      columns[column_name] = _ArrowColumn(column, decode, column_name in absent)
+    tables[section] = Table(columns, info['shape'], info['key'], info.get('groups'))
+
+  return ColumnarSnapshot(tables, taken)
+
+def load(path):
+  if os.path.isdir(path):
+    return _load_arrow(path)
+
+  return _load_packed(path)
+
+
+__all__ = [
+  'MISSING',
+  'Table',
+  'ColumnarSnapshot',
+  'DictionaryColumn',
+  'to_columnar',
+  'dump',
+  'load',
+]
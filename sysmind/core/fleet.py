@@ -0,0 +1,395 @@
+# sysmind/core/fleet.py
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import subprocess
+import sys
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import wait as _wait
+from socket import gethostname as _gethostname
+
+from sysmind.logging import logger
+
+HostResult = namedtuple('HostResult', [
+  'target',
+  'ok',
+  'hostname',
+  'snapshot',
+  'audit',
+  'error',
+  'attempts',
+  'duration',
+])
+
+# Seconds the runner waits past the timeout for transports that enforce it
+# themselves, so their own timeout error (and retry) wins
+TIMEOUT_GRACE = 1.0
+
+
+class FleetError(Exception):
+  pass
+
+
+def execute(request):
+  # Runs on the target: the same Snapshot/Audit code as a single-host run,
+  # so fleet results match local ones exactly
+  from sysmind.core.audit import Audit
+  from sysmind.core.snapshot import DEFAULT_SNAPSHOT_SECTIONS, Snapshot
+
+  audit = Audit(request.get('rules') or [])
+
+  sections = list(request.get('sections') or DEFAULT_SNAPSHOT_SECTIONS)
+  for section in audit.sections:
+    if section not in sections:
+      sections.append(section)
+
+  snapshot = Snapshot.capture(sections=sections)
+  result = {'hostname': _gethostname(), 'snapshot': snapshot.to_dict()}
+  if len(audit):
+    allow_unknown = request.get('allow_unknown', False)
+    result['audit'] = audit.run(data=snapshot, allow_unknown=allow_unknown).to_dict()
+
+  return result
+
+def main():
+  # 'python -m sysmind.core.fleet' reads a JSON request on stdin and writes
+  # the JSON result to stdout, used by the subprocess and SSH transports
+  request = json.load(sys.stdin)
+  json.dump(execute(request), sys.stdout)
+
+
+class Transport(object):
+  # Runs a request against a target and returns the decoded result
+  # Process based transports run in a thread pool, in_process ones in a
+  # process pool.
+  in_process = False
+
+  def run(self, target, request, timeout=None):
+    raise NotImplementedError
+
+
+class LocalTransport(Transport):
+  # Collects in a worker of the runner's process pool, the target is only a
+  # label
+  in_process = True
+
+  def run(self, target, request, timeout=None):
+    return execute(request)
+
+
+class SubprocessTransport(Transport):
+  def __init__(self, command=None):
+    self._command = list(command or [sys.executable, '-m', 'sysmind.core.fleet'])
+
+  def command(self, target):
+    return self._command
+
+  def run(self, target, request, timeout=None):
+    try:
+      process = subprocess.run(
+        self.command(target),
+        input=json.dumps(request),
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+      )
+    except subprocess.TimeoutExpired as e:
+      raise FleetError(f'Timed out after {timeout}s') from e
+
+    if process.returncode != 0:
+      error = process.stderr.strip().splitlines()[-1:] or [f'exit status {process.returncode}']
+      raise FleetError(error[0])
+
+    try:
+      return json.loads(process.stdout)
+    except ValueError as e:
+      raise FleetError(f'Invalid response. Error: {e}') from e
+
+
+class SSHTransport(SubprocessTransport):
+  def __init__(self, python='python3', ssh='ssh', options=('-o', 'BatchMode=yes')):
+    super().__init__()
+    self._python = python
+    self._ssh = ssh
+    self._options = list(options)
+
+  def command(self, target):
+    return [self._ssh, *self._options, target, self._python, '-m', 'sysmind.core.fleet']
+
+
+def _attempt(transport, target, request, timeout):
+  return transport.run(target, request, timeout)
+
+
+class FleetSummary(object):
+  def __init__(self):
+    self._hosts = 0
+    self._ok = []
+    self._failed = {}
+    self._compliant = []
+    self._noncompliant = []
+    self._rule_failures = Counter()
+
+  def __repr__(self):
+    return (
+      f'FleetSummary(hosts={self._hosts}, ok={len(self._ok)}, failed={len(self._failed)},'
+      f' noncompliant={len(self._noncompliant)})'
+    )
+
+  def add(self, result):
+    self._hosts += 1
+    if not result.ok:
+      self._failed[result.target] = result.error
+      return
+
+    self._ok.append(result.target)
+    if result.audit is None:
+      return
+
+    if not result.audit['ok']:
+      self._noncompliant.append(result.target)
+    else:
+      self._compliant.append(result.target)
+    for rule in result.audit['results']:
+      if rule['passed'] is False:
+        self._rule_failures[rule['id']] += 1
+
+  @property
+  def hosts(self):
+    return self._hosts
+
+  @property
+  def ok(self):
+    return self._ok
+
+  @property
+  def failed(self):
+    return self._failed
+
+  @property
+  def compliant(self):
+    return self._compliant
+
+  @property
+  def noncompliant(self):
+    return self._noncompliant
+
+  @property
+  def rule_failures(self):
+    # Rule id -> number of hosts failing it
+    return self._rule_failures
+
+  def to_dict(self):
+    return {
+      'hosts': self._hosts,
+      'ok': len(self._ok),
+      'failed': self._failed,
+      'compliant': len(self._compliant),
+      'noncompliant': self._noncompliant,
+      'rule_failures': dict(self._rule_failures),
+    }
+
+
+class _Schedule(object):
+  # Jobs of one FleetRunner.run(): running, timed out but still holding a
+  # worker, and failed ones waiting out their backoff
+  def __init__(self, runner, targets, executor):
+    self._runner = runner
+    self._targets = iter(targets)
+    self._executor = executor
+    # future -> (target, attempts, started, deadline)
+    self._running = {}
+    # Timed out jobs still holding a worker, in-process collection can't be
+    # interrupted
+    self._abandoned = set()
+    # (ready, sequence, target, attempts, started) waiting out their backoff
+    self._retries = []
+    self._sequence = itertools.count()
+    # Next target, pulled ahead of a free worker only to know whether any
+    # are left
+    self._upcoming = None
+
+  def pending(self):
+    # Abandoned jobs hold back the targets left until they return
+    return bool(
+      self._running or self._retries or (self._abandoned and self._pull() is not None)
+    )
+
+  def _free(self):
+    return self._runner._max_workers - len(self._running) - len(self._abandoned)
+
+  def _pull(self):
+    if self._upcoming is None:
+      self._upcoming = next(self._targets, None)
+    return self._upcoming
+
+  def _start(self, target, attempts=1, started=None):
+    runner = self._runner
+    future = self._executor.submit(
+      _attempt, runner._transport, target, runner._request, runner._timeout
+    )
+    now = time.monotonic()
+    deadline = None
+    if runner._timeout is not None:
+      deadline = now + runner._timeout + (0 if runner._transport.in_process else TIMEOUT_GRACE)
+    self._running[future] = (target, attempts, started if started is not None else now, deadline)
+
+  def fill(self):
+    now = time.monotonic()
+    while self._free() > 0:
+      if self._retries and self._retries[0][0] <= now:
+        _, _, target, attempts, started = heapq.heappop(self._retries)
+        self._start(target, attempts, started)
+        continue
+      if len(self._running) + len(self._retries) >= self._runner._max_pending:
+        return
+      if self._pull() is None:
+        return
+      target, self._upcoming = self._upcoming, None
+      self._start(target)
+
+  def wait(self):
+    # Blocks until a job finishes, a deadline passes or a retry is due
+    wakeups = [info[3] for info in self._running.values() if info[3] is not None]
+    if self._retries and self._free() > 0:
+      wakeups.append(self._retries[0][0])
+    remaining = max(0, min(wakeups) - time.monotonic()) if wakeups else None
+    futures = [*self._running, *self._abandoned]
+    if futures:
+      done, _ = _wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+      return done
+    # Only retries waiting out their backoff
+    time.sleep(remaining)
+    return set()
+
+  def _fail(self, target, attempts, started, error, retry=True):
+    retries = self._runner._retries
+    if retry and attempts <= retries:
+      # Scheduled, not slept on, the worker takes other targets meanwhile
+      logger.warning(f'{target} failed, retrying ({attempts}/{retries}). Error: {error}')
+      ready = time.monotonic() + self._runner._backoff * attempts
+      heapq.heappush(self._retries, (ready, next(self._sequence), target, attempts + 1, started))
+      return []
+    logger.error(f'{target} failed. Error: {error}')
+    duration = time.monotonic() - started
+    return [HostResult(target, False, None, None, None, str(error), attempts, duration)]
+
+  def finished(self, done):
+    results = []
+    for future in done:
+      if future in self._abandoned:
+        self._abandoned.discard(future)
+        continue
+      target, attempts, started, _ = self._running.pop(future)
+      try:
+        results.append(self._runner._result(target, future.result(), attempts, started))
+      except Exception as e:
+        results.extend(self._fail(target, attempts, started, e))
+    return results
+
+  def expire(self):
+    results = []
+    now = time.monotonic()
+    for future, (target, attempts, started, deadline) in list(self._running.items()):
+      if deadline is None or deadline > now:
+        continue
+      del self._running[future]
+      # A job that already runs keeps going, retrying it would run the same
+      # collection twice
+      cancelled = future.cancel()
+      if not cancelled:
+        self._abandoned.add(future)
+      error = FleetError(f'Timed out after {self._runner._timeout}s')
+      results.extend(self._fail(target, attempts, started, error, retry=cancelled))
+    return results
+
+
+class FleetRunner(object):
+  def __init__(
+    self,
+    transport=None,
+    max_workers=8,
+    timeout=120,
+    retries=1,
+    backoff=1.0,
+    sections=None,
+    rules=None,
+    max_pending=None,
+    allow_unknown=False,
+  ):
+    self._transport = transport if transport is not None else LocalTransport()
+    self._max_workers = max_workers
+    self._timeout = timeout
+    self._retries = retries
+    self._backoff = backoff
+    self._request = {'sections': sections, 'rules': rules, 'allow_unknown': allow_unknown}
+    # Targets are pulled lazily, at most max_pending are running or waiting
+    # to be retried
+    self._max_pending = max_pending or max_workers * 2
+    self._summary = FleetSummary()
+
+  @property
+  def summary(self):
+    return self._summary
+
+  def _executor(self):
+    if self._transport.in_process:
+      return ProcessPoolExecutor(max_workers=self._max_workers)
+    return ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='sysmind-fleet')
+
+  def _result(self, target, data, attempts, started):
+    from sysmind.core.snapshot import Snapshot
+
+    return HostResult(
+      target,
+      True,
+      data.get('hostname'),
+      Snapshot.from_dict(data['snapshot']),
+      data.get('audit'),
+      None,
+      attempts,
+      time.monotonic() - started,
+    )
+
+  def run(self, targets):
+    # Yields a HostResult per target as soon as it finishes, in completion
+    # order. A target is only started when a worker is free, so its timeout
+    # counts from when it actually runs and slow consumers hold back
+    # collection instead of buffering results.
+    executor = self._executor()
+    schedule = _Schedule(self, targets, executor)
+    try:
+      schedule.fill()
+      while schedule.pending():
+        done = schedule.wait()
+        for result in schedule.finished(done) + schedule.expire():
+          self._summary.add(result)
+          yield result
+        schedule.fill()
+    finally:
+      executor.shutdown(wait=False, cancel_futures=True)
+
+  def run_all(self, targets):
+    results = list(self.run(targets))
+    return results, self._summary
+
+
+__all__ = [
+  'FleetRunner',
+  'FleetSummary',
+  'FleetError',
+  'HostResult',
+  'Transport',
+  'LocalTransport',
+  'SubprocessTransport',
+  'SSHTransport',
+  'execute',
+]
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,362 @@
+# sysmind/core/hosts.py
+from __future__ import annotations
+
+import os
+import socket
+import sys
+import threading
+
+from sysmind.core.records import intern, record
+from sysmind.logging import logger
+
+RESOLV_CONF = '/etc/resolv.conf'
+
+# Bytes before the parsed offset compared on every append, a mismatch means
+# the file was rewritten in place and is parsed from the start
+CHECK_BYTES = 256
+
+# Same fields as python_hosts.HostsEntry, names is a tuple
+HostsEntry = record('HostsEntry', ['entry_type', 'address', 'names', 'comment'], module=__name__)
+
+
+def hosts_path(platform=None):
+  platform = platform or sys.platform
+  if platform.startswith('win'):
+    root = os.environ.get('SystemRoot', r'C:\Windows')
+    return os.path.join(root, 'System32', 'drivers', 'etc', 'hosts')
+  return '/etc/hosts'
+
+def _address_type(address):
+  # inet_pton is far cheaper than ipaddress on 100k line blocklists
+  try:
+    socket.inet_pton(socket.AF_INET6, address.partition('%')[0])
+    return 'ipv6'
+  except (OSError, ValueError):
+    pass
+  try:
+    socket.inet_pton(socket.AF_INET, address)
+    return 'ipv4'
+  except (OSError, ValueError):
+    return None
+
+def _entry(line):
+  # One hosts file line, None for lines that are neither an address, a
+  # comment nor blank
+  stripped = line.strip()
+  if not stripped:
+    return HostsEntry('blank', None, (), None)
+  if stripped[0] == '#':
+    return HostsEntry('comment', None, (), line)
+
+  content, sep, comment = stripped.partition('#')
+  fields = content.split()
+  entry_type = _address_type(fields[0]) if fields else None
+  if entry_type is None or len(fields) < 2:
+    return None
+  # Blocklists point most names at one address, stored once
+  comment = comment.strip() or None if sep else None
+  return HostsEntry(entry_type, intern(fields[0]), tuple(fields[1:]), comment)
+
+def _field(entry, name):
+  return entry.get(name) if isinstance(entry, dict) else getattr(entry, name, None)
+
+
+class ConfigFile(object):
+  # A configuration file parsed once and kept until its (device, inode,
+  # mtime, size) changes. Subclasses with _incremental set are parsed from
+  # where the last parse stopped when the file only grew.
+  _incremental = False
+
+  def __init__(self, path):
+    self._path = path
+    self._key = None
+    self._offset = 0
+    self._check = b''
+    self._lock = threading.Lock()
+    self._reset()
+
+  def __repr__(self):
+    return f'{type(self).__name__}(path={self._path})'
+
+  @property
+  def path(self):
+    return self._path
+
+  @property
+  def key(self):
+    return self._key
+
+  def _reset(self):
+    raise NotImplementedError
+
+  def _parse(self, lines, partial=False):
+    raise NotImplementedError
+
+  def _rewind(self):
+    # Drop whatever the last parse read from an unterminated final line
+    pass
+
+  def _resumable(self, f, stat):
+    if not self._incremental or self._key is None or not self._offset:
+      return False
+    if self._key[:2] != (stat.st_dev, stat.st_ino) or stat.st_size < self._offset:
+      return False
+    f.seek(self._offset - len(self._check))
+    return f.read(len(self._check)) == self._check
+
+  def refresh(self):
+    # Returns True when the file was (re)parsed
+    if self._path is None:
+      raise ValueError('Built from records, there is no file to refresh')
+
+    try:
+      stat = os.stat(self._path)
+    except OSError:
+      stat = None
+
+    key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size) if stat is not None else None
+    with self._lock:
+      if key is not None and key == self._key:
+        return False
+
+      data = b''
+      start = 0
+      if stat is not None:
+        try:
+          with open(self._path, 'rb') as f:
+            if self._resumable(f, stat):
+              start = self._offset
+            f.seek(start)
+            data = f.read()
+        except OSError as e:
+          logger.error(f'Failed to read {self._path}. Error: {e}')
+          key = None
+
+      if start:
+        self._rewind()
+      else:
+        self._reset()
+        self._offset = 0
+        self._check = b''
+
+      if self._incremental:
+        # Only complete lines move the offset
+        end = data.rfind(b'\n') + 1
+        self._parse(data[:end].decode('utf-8', errors='replace').splitlines())
+        self._parse(data[end:].decode('utf-8', errors='replace').splitlines(), partial=True)
+        self._check = (self._check + data[:end])[-CHECK_BYTES:]
+        self._offset = start + end
+      else:
+        self._parse(data.decode('utf-8', errors='replace').splitlines())
+
+      self._key = key
+      return True
+
+
+class HostsFile(ConfigFile):
+  # hosts(5) indexed by name and by address. Names are matched case
+  # insensitively, addresses keep file order.
+  _incremental = True
+
+  def __init__(self, path=None):
+    super().__init__(path or hosts_path())
+
+  @classmethod
+  def from_entries(cls, entries):
+    # Index over collected entries, e.g. a snapshot's 'hosts' section
+    hosts = cls()
+    hosts._path = None
+    for entry in entries or []:
+      names = _field(entry, 'names')
+      hosts._add(HostsEntry(
+        _field(entry, 'entry_type'),
+        _field(entry, 'address'),
+        tuple(names or ()),
+        _field(entry, 'comment'),
+      ))
+    return hosts
+
+  def _reset(self):
+    self._entries = []
+    # name -> [addresses], address -> {name: None} (ordered set, blocklists
+    # point 100k names at one address)
+    self._by_name = {}
+    self._by_address = {}
+    self._partial = (0, [])
+
+  def _add(self, entry, added=None):
+    self._entries.append(entry)
+    if entry.address is None:
+      return
+    names = self._by_address.setdefault(entry.address, {})
+    for name in entry.names:
+      key = name.lower()
+      addresses = self._by_name.setdefault(key, [])
+      if entry.address not in addresses:
+        addresses.append(entry.address)
+        if added is not None:
+          added.append((key, entry.address, None))
+      if name not in names:
+        names[name] = None
+        if added is not None:
+          added.append((None, entry.address, name))
+
+  def _parse(self, lines, partial=False):
+    added = [] if partial else None
+    count = 0
+    for line in lines:
+      entry = _entry(line)
+      if entry is not None:
+        self._add(entry, added)
+        count += 1
+    if partial:
+      self._partial = (count, added)
+
+  def _rewind(self):
+    count, added = self._partial
+    if count:
+      del self._entries[-count:]
+    for key, address, name in added:
+      if key is not None:
+        self._by_name[key].remove(address)
+        if not self._by_name[key]:
+          del self._by_name[key]
+      else:
+        del self._by_address[address][name]
+        if not self._by_address[address]:
+          del self._by_address[address]
+    self._partial = (0, [])
+
+  def __len__(self):
+    return len(self._by_name)
+
+  def __contains__(self, name):
+    return name.lower() in self._by_name
+
+  def __iter__(self):
+    return iter(self.entries)
+
+  @property
+  def entries(self):
+    # Every line as a HostsEntry, blank lines and comments included
+    with self._lock:
+      return list(self._entries)
+
+  def names(self, address=None):
+    if address is None:
+      return list(self._by_name)
+    return list(self._by_address.get(address, ()))
+
+  def addresses(self, name=None):
+    if name is None:
+      return list(self._by_address)
+    return list(self._by_name.get(name.lower(), ()))
+
+  def has_address(self, address):
+    return address in self._by_address
+
+  def resolves(self, name, address):
+    return address in self._by_name.get(name.lower(), ())
+
+
+class ResolvConf(ConfigFile):
+  # resolv.conf(5): nameservers, search list, domain, sortlist and options.
+  # Small enough that any change is parsed from the start.
+  def __init__(self, path=RESOLV_CONF):
+    super().__init__(path)
+
+  def _reset(self):
+    self._nameservers = []
+    self._search = []
+    self._domain = None
+    self._sortlist = []
+    self._options = {}
+
+  def _parse(self, lines, partial=False):
+    for line in lines:
+      tokens = line.split()
+      if len(tokens) < 2 or tokens[0][0] in '#;':
+        continue
+      keyword, values = tokens[0], tokens[1:]
+      if keyword == 'nameserver':
+        self._nameservers.append(values[0])
+      elif keyword == 'domain':
+        # domain and search exclude each other, the last one wins
+        self._domain = values[0]
+        self._search = []
+      elif keyword == 'search':
+        self._search = values
+        self._domain = None
+      elif keyword == 'sortlist':
+        self._sortlist = values
+      elif keyword == 'options':
+        for option in values:
+          name, sep, value = option.partition(':')
+          self._options[name] = value if sep else True
+
+  def __contains__(self, nameserver):
+    return nameserver in self._nameservers
+
+  @property
+  def nameservers(self):
+    return list(self._nameservers)
+
+  @property
+  def search(self):
+    return list(self._search)
+
+  @property
+  def domain(self):
+    return self._domain
+
+  @property
+  def sortlist(self):
+    return list(self._sortlist)
+
+  @property
+  def options(self):
+    return dict(self._options)
+
+  def option(self, name, default=None):
+    return self._options.get(name, default)
+
+  def to_dict(self):
+    return {
+      'nameservers': self.nameservers,
+      'search': self.search,
+      'domain': self._domain,
+      'sortlist': self.sortlist,
+      'options': self.options,
+    }
+
+
+# One parsed instance per (class, path), shared by every caller
+_files = {}
+_files_lock = threading.Lock()
+
+def _shared(cls, path):
+  with _files_lock:
+    config = _files.get((cls, path))
+    if config is None:
+      config = _files[(cls, path)] = cls(path)
+  config.refresh()
+  return config
+
+def load_hosts(path=None):
+  # Parsed at most once per change of the file
+  return _shared(HostsFile, path or hosts_path())
+
+def load_resolv_conf(path=RESOLV_CONF):
+  return _shared(ResolvConf, path)
+
+
+__all__ = [
+  'HostsEntry',
+  'ConfigFile',
+  'HostsFile',
+  'ResolvConf',
+  'RESOLV_CONF',
+  'hosts_path',
+  'load_hosts',
+  'load_resolv_conf',
+]
@@ -0,0 +1,167 @@
+# sysmind/core/ids.py
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import threading
+
+from sysmind.logging import logger
+
+# Where distributions install the pci.ids / usb.ids databases
+PCI_IDS_PATHS = (
+  '/usr/share/hwdata/pci.ids',
+  '/usr/share/misc/pci.ids',
+  '/usr/share/pci.ids',
+  '/usr/share/pciutils/pci.ids',
+)
+
+USB_IDS_PATHS = (
+  '/usr/share/hwdata/usb.ids',
+  '/usr/share/misc/usb.ids',
+  '/usr/share/usb.ids',
+  '/var/lib/usbutils/usb.ids',
+)
+
+# Vendor lines start in column 0 with four hex digits. Other sections of
+# the files (device classes, HID usages, languages) start with a letter.
+_VENDOR = re.compile(rb'^([0-9a-fA-F]{4})  ', re.M)
+
+
+class IdsDatabase(object):
+  # Read-only view of a pci.ids/usb.ids file. The file is memory mapped and
+  # indexed once by vendor, a device lookup only scans that vendor's block.
+  def __init__(self, path):
+    self._path = path
+    self._file = open(path, 'rb')
+    self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    self._vendors = None
+    self._lock = threading.Lock()
+
+  def __repr__(self):
+    return f'IdsDatabase({self._path})'
+
+  @property
+  def path(self):
+    return self._path
+
+  def close(self):
+    self._map.close()
+    self._file.close()
+
+  def _index(self):
+    if self._vendors is None:
+      with self._lock:
+        if self._vendors is None:
+          vendors = {}
+          previous = None
+          for match in _VENDOR.finditer(self._map):
+            vendor = match.group(1).lower().decode()
+            if previous is not None:
+              vendors[previous[0]] = (previous[1], match.start())
+            previous = (vendor, match.start())
+          if previous is not None:
+            vendors[previous[0]] = (previous[1], self._section_end(previous[1]))
+          self._vendors = vendors
+
+    return self._vendors
+
+  def _section_end(self, start):
+    # The last vendor block ends where the next non-vendor section starts
+    position = start
+    while True:
+      position = self._map.find(b'\n', position)
+      if position == -1:
+        return len(self._map)
+      position += 1
+      if position >= len(self._map):
+        return position
+      first = self._map[position:position + 1]
+      if first not in (b'\t', b'#', b'\n'):
+        return position
+
+  def _line(self, start):
+    end = self._map.find(b'\n', start)
+    if end == -1:
+      end = len(self._map)
+    return self._map[start:end].decode('utf-8', errors='replace')
+
+  def vendor(self, vendor_id):
+    block = self._index().get(_normalize(vendor_id))
+    if block is None:
+      return None
+
+    return self._line(block[0])[6:].strip()
+
+  def device(self, vendor_id, device_id):
+    block = self._index().get(_normalize(vendor_id))
+    if block is None:
+      return None
+
+    needle = f'\n\t{_normalize(device_id)}  '.encode()
+    position = self._map.find(needle, block[0], block[1])
+    if position == -1:
+      return None
+
+    return self._line(position + len(needle)).strip()
+
+  def subsystem(self, vendor_id, device_id, subvendor_id, subdevice_id):
+    # '\t\tsubvendor subdevice  name' lines below a pci.ids device
+    block = self._index().get(_normalize(vendor_id))
+    if block is None:
+      return None
+
+    device = self._map.find(f'\n\t{_normalize(device_id)}  '.encode(), block[0], block[1])
+    if device == -1:
+      return None
+
+    needle = f'\t\t{_normalize(subvendor_id)} {_normalize(subdevice_id)}  '.encode()
+    position = self._map.find(b'\n', device + 1) + 1
+    # Comment lines may sit between the subsystem lines
+    while 0 < position < block[1]:
+      line = self._map[position:position + 2]
+      if line != b'\t\t' and line[:1] != b'#':
+        break
+      if self._map[position:position + len(needle)] == needle:
+        return self._line(position + len(needle)).strip()
+      position = self._map.find(b'\n', position) + 1
+
+    return None
+
+
+def _normalize(value):
+  if isinstance(value, int):
+    return f'{value:04x}'
+
+  value = str(value).lower()
+  if value.startswith('0x'):
+    value = value[2:]
+  return value.zfill(4)
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+def database(paths):
+  # Shared, lazily opened database for the first path that exists
+  for path in paths:
+    if not os.path.isfile(path):
+      continue
+    with _databases_lock:
+      if path not in _databases:
+        try:
+          _databases[path] = IdsDatabase(path)
+        except (OSError, ValueError) as e:
+          logger.warning(f'Failed to open {path}. Error: {e}')
+          continue
+      return _databases[path]
+
+  return None
+
+def pci_ids():
+  return database(PCI_IDS_PATHS)
+
+def usb_ids():
+  return database(USB_IDS_PATHS)
+
+
+__all__ = ['IdsDatabase', 'PCI_IDS_PATHS', 'USB_IDS_PATHS', 'database', 'pci_ids', 'usb_ids']
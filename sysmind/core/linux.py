@@ -1,12 +1,11 @@
 # systemind/core/linux.py
 from __future__ import annotations
 
-import subprocess
+import distro
 
-from sysmind.logging import logger
 from sysmind.core.os import OperatingSystem
+from sysmind.logging import logger
 
-import distro
 
 def get_distro_id():
   try:
@@ -14,14 +13,14 @@ def get_distro_id():
   except Exception as e:
     logger.error(e)
     return None
-    
+
 def get_distro_name():
   try:
     return distro.name().lower()
   except Exception as e:
     logger.error(e)
     return None
-  
+
 def get_distro_like():
   try:
     return distro.like().lower()
@@ -29,12 +28,12 @@ def get_distro_like():
     logger.error(e)
     return None
 
-    
+
 class Linux(OperatingSystem):
-  
-  def __init__(self):
-    super().__init__()
-    
+
+  def __init__(self, sections=None, cache=None):
+    super().__init__(sections=sections, cache=cache)
+
     # Get Linux distribution id
     self._id = get_distro_id()
     self._name = get_distro_name()
@@ -46,29 +45,29 @@ class Linux(OperatingSystem):
         self._pkg_manager = 'yum'
       else:
         logger.warning('Linux distribution not supported')
-        self._pkg_manager = None  
+        self._pkg_manager = None
     else:
       logger.warning('Linux distribution not supported')
       self._pkg_manager = None
-    
+
     logger.info(f'Detected Linux distribution: {self._name} ({self._id})')
-    
+
     @property
     def id(self):
       return self._id
-    
+
     @property
     def name(self):
       return self._name
-    
+
     @property
     def like(self):
       return self._like
-    
+
     @property
     def pkg_manager(self):
       return self._pkg_manager
-    
-    
 
-__all__ = ['Linux']
\ No newline at end of file
+
+
+__all__ = ['Linux']
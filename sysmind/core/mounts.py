@@ -0,0 +1,358 @@
+# sysmind/core/mounts.py
+from __future__ import annotations
+
+import fnmatch
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from collections import deque
+
+from sysmind.core.records import intern, record
+from sysmind.logging import logger
+
+MOUNTINFO = '/proc/self/mountinfo'
+
+# The first four fields match psutil's sdiskpart, 'opts' is the combined
+# option string /proc/mounts shows and 'options' the same options as a
+# tuple in that order
+Mount = record('Mount', [
+  'device',
+  'mountpoint',
+  'fstype',
+  'opts',
+  'options',
+  'mount_id',
+  'parent_id',
+  'root',
+], module=__name__)
+
+# Same fields and arithmetic as psutil.disk_usage
+Usage = record('Usage', ['total', 'used', 'free', 'percent'], module=__name__)
+
+_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+# Mountpoints whose statvfs outlived its timeout -> the thread still stuck
+# in it. They are skipped until that call returns instead of piling up more
+# blocked threads on the same dead server.
+_hung = {}
+
+
+def _unescape(field):
+  # The kernel octal-escapes space, tab, newline and backslash
+  if '\\' not in field:
+    return field
+  return _ESCAPE.sub(lambda match: chr(int(match.group(1), 8)), field)
+
+def _options(mount_options, super_options):
+  # Per-mount options first, then the superblock's, without repeating rw/ro
+  options = [intern(option) for option in mount_options.split(',')]
+  seen = set(options)
+  for option in super_options.split(','):
+    if option not in seen and option not in ('rw', 'ro'):
+      seen.add(option)
+      options.append(intern(option))
+  return tuple(options)
+
+def parse_mountinfo(lines):
+  # Mount per mountinfo line:
+  # 36 35 98:0 /mnt1 /mnt2 rw,noatime master:1 - ext3 /dev/root rw,errors=continue
+  for line in lines:
+    fields = line.split()
+    try:
+      separator = fields.index('-', 6)
+      options = _options(fields[5], fields[separator + 3] if len(fields) > separator + 3 else '')
+      yield Mount(
+        intern(_unescape(fields[separator + 2])),
+        _unescape(fields[4]),
+        intern(fields[separator + 1]),
+        intern(','.join(options)),
+        options,
+        int(fields[0]),
+        int(fields[1]),
+        _unescape(fields[3]),
+      )
+    except (ValueError, IndexError):
+      continue
+
+def iter_mounts(path=MOUNTINFO):
+  # Streams the file, mount tables with thousands of container mounts are
+  # never held as text
+  with open(path, 'r', errors='replace') as f:
+    yield from parse_mountinfo(f)
+
+def available(path=MOUNTINFO):
+  return os.path.exists(path)
+
+
+def disk_usage(mountpoint):
+  if not hasattr(os, 'statvfs'):
+    total, used, free = shutil.disk_usage(mountpoint)
+    return Usage(total, used, free, round(used / total * 100, 1) if total else 0.0)
+
+  stat = os.statvfs(mountpoint)
+  total = stat.f_blocks * stat.f_frsize
+  free = stat.f_bavail * stat.f_frsize
+  used = (stat.f_blocks - stat.f_bfree) * stat.f_frsize
+  # Percentage of what unprivileged users can use, like df
+  usable = used + free
+  return Usage(total, used, free, round(used / usable * 100, 1) if usable else 0.0)
+
+def _usage_worker(jobs, finished, running, lock):
+  me = threading.get_ident()
+  while True:
+    with lock:
+      if me not in running:
+        # Given up on while blocked, its replacement took over
+        return
+      try:
+        mountpoint, timeout = jobs.popleft()
+      except IndexError:
+        del running[me]
+        finished.put(None)
+        return
+      running[me] = (mountpoint, time.monotonic() + timeout)
+
+    try:
+      value = disk_usage(mountpoint)
+    except OSError as e:
+      logger.debug(f'Failed to stat {mountpoint}. Error: {e}')
+      value = None
+
+    with lock:
+      if me not in running:
+        _hung.pop(mountpoint, None)
+        return
+      running[me] = (None, None)
+    finished.put((mountpoint, value))
+
+def _start_worker(jobs, finished, running, lock):
+  thread = threading.Thread(
+    target=_usage_worker,
+    args=(jobs, finished, running, lock),
+    name='sysmind-statvfs',
+    daemon=True,
+  )
+  with lock:
+    thread.start()
+    running[thread.ident] = (None, None)
+
+def _next_deadline(running, lock, timeout):
+  # Seconds until the earliest running call is due
+  with lock:
+    deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+  return max(0.0, min(deadlines) - time.monotonic()) if deadlines else timeout
+
+def _expire(running, lock):
+  # Mountpoints whose call is past its deadline, their threads are given up
+  # on and left blocked
+  now = time.monotonic()
+  with lock:
+    expired = [
+      (ident, mountpoint)
+      for ident, (mountpoint, deadline) in running.items()
+      if deadline is not None and deadline <= now
+    ]
+    for ident, mountpoint in expired:
+      del running[ident]
+      _hung[mountpoint] = ident
+  return [mountpoint for _, mountpoint in expired]
+
+def usage(mountpoints, timeout=2.0, max_workers=16):
+  # {mountpoint: Usage} from concurrent statvfs calls on daemon threads.
+  # Each call gets 'timeout' seconds, a mount that doesn't answer in time
+  # (hung NFS, dead FUSE daemon) maps to None and its thread is abandoned.
+  results = {}
+  jobs = deque()
+  for mountpoint in dict.fromkeys(mountpoints):
+    if mountpoint in _hung:
+      logger.warning(f'Skipping {mountpoint}, an earlier statvfs on it has not returned')
+      results[mountpoint] = None
+    else:
+      jobs.append((mountpoint, timeout))
+
+  finished = queue.SimpleQueue()
+  lock = threading.Lock()
+  # thread ident -> (mountpoint, deadline) of the call it is in
+  running = {}
+
+  workers = min(max_workers, len(jobs))
+  for _ in range(workers):
+    _start_worker(jobs, finished, running, lock)
+
+  while workers:
+    try:
+      item = finished.get(timeout=_next_deadline(running, lock, timeout))
+    except queue.Empty:
+      for mountpoint in _expire(running, lock):
+        logger.warning(f'statvfs on {mountpoint} did not return within {timeout}s')
+        results[mountpoint] = None
+        # A replacement takes the jobs left
+        workers -= 1
+        if jobs:
+          _start_worker(jobs, finished, running, lock)
+          workers += 1
+      continue
+
+    if item is None:
+      workers -= 1
+    else:
+      results[item[0]] = item[1]
+
+  return results
+
+
+class MountTable(object):
+  # Every mount from one pass over mountinfo, indexed by mountpoint, fstype
+  # and option. Stacked mounts are all kept, lookups by mountpoint and
+  # option only see the visible (last) one.
+  def __init__(self, mounts=()):
+    self._mounts = []
+    self._by_mountpoint = {}
+    self._by_fstype = {}
+    # option -> {mountpoint: None} of the visible mounts carrying it
+    self._by_option = {}
+    for mount in mounts:
+      self._add(mount)
+
+  @classmethod
+  def scan(cls, path=MOUNTINFO):
+    return cls(iter_mounts(path))
+
+  @classmethod
+  def from_records(cls, records):
+    # Table over collected mounts: Mount records, psutil partitions or
+    # their dict form from a snapshot
+    mounts = []
+    for item in records or []:
+      if not isinstance(item, dict):
+        item = item._asdict()
+      opts = item.get('opts') or ''
+      options = item.get('options')
+      if options is None:
+        options = (option for option in opts.split(',') if option)
+      mounts.append(Mount(
+        item.get('device'),
+        item.get('mountpoint'),
+        item.get('fstype'),
+        opts,
+        tuple(options),
+        item.get('mount_id'),
+        item.get('parent_id'),
+        item.get('root'),
+      ))
+    return cls(mounts)
+
+  def _add(self, mount):
+    self._mounts.append(mount)
+    hidden = self._by_mountpoint.get(mount.mountpoint)
+    if hidden is not None:
+      # Stacked on top: the lower mount's options no longer apply here
+      for option in hidden.options:
+        mountpoints = self._by_option.get(option)
+        if mountpoints is not None:
+          mountpoints.pop(mount.mountpoint, None)
+          if not mountpoints:
+            del self._by_option[option]
+    self._by_mountpoint[mount.mountpoint] = mount
+    self._by_fstype.setdefault(mount.fstype, []).append(mount)
+    for option in mount.options:
+      self._by_option.setdefault(option, {})[mount.mountpoint] = None
+
+  def __repr__(self):
+    return f'MountTable(mounts={len(self._mounts)})'
+
+  def __len__(self):
+    return len(self._mounts)
+
+  def __iter__(self):
+    return iter(self._mounts)
+
+  def __contains__(self, mountpoint):
+    return mountpoint in self._by_mountpoint
+
+  def __getitem__(self, mountpoint):
+    return self._by_mountpoint[mountpoint]
+
+  def get(self, mountpoint, default=None):
+    return self._by_mountpoint.get(mountpoint, default)
+
+  @property
+  def mountpoints(self):
+    return list(self._by_mountpoint)
+
+  @property
+  def fstypes(self):
+    return list(self._by_fstype)
+
+  def visible(self):
+    # One mount per mountpoint, the one path lookups reach
+    return list(self._by_mountpoint.values())
+
+  def by_fstype(self, fstype):
+    return list(self._by_fstype.get(fstype, ()))
+
+  def with_option(self, option):
+    return [self._by_mountpoint[mountpoint] for mountpoint in self._by_option.get(option, ())]
+
+  def select(self, pattern=None, fstypes=None):
+    # Visible mounts whose mountpoint matches the glob and whose fstype is
+    # one of 'fstypes'
+    mounts = self.visible()
+    if fstypes is not None:
+      fstypes = {fstypes} if isinstance(fstypes, str) else set(fstypes)
+      mounts = [mount for mount in mounts if mount.fstype in fstypes]
+    if pattern is not None:
+      if any(char in pattern for char in '*?['):
+        mounts = [mount for mount in mounts if fnmatch.fnmatchcase(mount.mountpoint, pattern)]
+      else:
+        mounts = [mount for mount in mounts if mount.mountpoint == pattern]
+    return mounts
+
+  def missing(self, options, pattern=None, fstypes=None):
+    # {mountpoint: [missing options]} for the selected mounts lacking any
+    # of 'options', e.g. missing(['nodev', 'noexec'], fstypes='tmpfs')
+    options = [options] if isinstance(options, str) else list(options)
+    mounts = self.select(pattern, fstypes)
+    missing = {}
+    for option in options:
+      having = self._by_option.get(option, {})
+      for mount in mounts:
+        if mount.mountpoint not in having:
+          missing.setdefault(mount.mountpoint, []).append(option)
+    return missing
+
+  def find(self, path):
+    # The visible mount a path lives on, the longest matching mountpoint
+    path = os.path.abspath(path)
+    while True:
+      mount = self._by_mountpoint.get(path)
+      if mount is not None:
+        return mount
+      parent = os.path.dirname(path)
+      if parent == path:
+        return None
+      path = parent
+
+  def usage(self, mounts=None, timeout=2.0, max_workers=16):
+    # statvfs of each visible mountpoint, see usage()
+    mounts = self.visible() if mounts is None else mounts
+    return usage([mount.mountpoint for mount in mounts], timeout=timeout, max_workers=max_workers)
+
+  def to_records(self):
+    return list(self._mounts)
+
+
+__all__ = [
+  'Mount',
+  'MountTable',
+  'Usage',
+  'MOUNTINFO',
+  'available',
+  'disk_usage',
+  'iter_mounts',
+  'parse_mountinfo',
+  'usage',
+]
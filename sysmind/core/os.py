@@ -1,108 +1,190 @@
 from __future__ import annotations
 
-from socket import close, gethostname as _gethostname
-from python_hosts import Hosts as _Hosts
-from dns.resolver import Resolver as _Resolver
-
-import psutil
-import netifaces
-import subprocess
+import asyncio
 import os
-
+import threading
+from collections import Counter, namedtuple
+from functools import lru_cache, partial
+from itertools import islice
+from platform import architecture as _architecture
 from platform import system as _system
 from platform import version as _version
-from platform import architecture as _architecture
+from socket import AF_INET, AF_INET6, SOCK_STREAM
+from socket import gethostname as _gethostname
 
+import netifaces
+import psutil
+
+from sysmind.core import ids, mounts, procfs, stats, sysfs, systemd
+from sysmind.core.cache import default_cache
+from sysmind.core.collector import Command, acollect, collect
+from sysmind.core.hosts import load_hosts, load_resolv_conf
+from sysmind.core.proctable import ProcessRecord, ProcessTable
+from sysmind.core.records import intern, record
 from sysmind.logging import logger
 
+
 def get_ip(interface_name):
-  
+
   interfaces = netifaces.interfaces()
-  
+
   if interface_name in interfaces:
     addrs = netifaces.ifaddresses(interface_name)
     return addrs[netifaces.AF_INET][0]['addr']
   else:
     logger.error(f'Interface {interface_name} does not exist.')
-  
+
   return None
 
 def get_mac(interface_name):
-  
+
   interfaces = netifaces.interfaces()
-  
+
   if interface_name in interfaces:
     addrs = netifaces.ifaddresses(interface_name)
     return addrs[netifaces.AF_LINK][0]['addr']
   else:
     logger.error(f'Interface {interface_name} does not exist.')
-  
-def get_ports():
-  
-  # Get a list of all connections
-  connections = psutil.net_connections(kind='inet')
-  
-  listening_ports = []
-  established_connections = []
-  closed_connections = []
-  
-  for conn in connections:
-    laddr = conn.laddr
-    raddr = conn.raddr
-    
-    if conn.status == psutil.CONN_LISTEN:
-      listening_ports.append({
-        'local_ip': laddr.ip,
-        'local_port': laddr.port,
-        'status': conn.status
-      })
-      
-    elif conn.status == psutil.CONN_ESTABLISHED:
-      established_connections.append({
-        'local_ip': laddr.ip,
-        'local_port': laddr.port,
-        'remote_ip': raddr.ip,
-        'remote_port': raddr.port,
-        'status': conn.status
-      })
-      
-    elif conn.status == psutil.CONN_CLOSE_WAIT:
-      closed_connections.append({
-        'local_ip': laddr.ip,
-        'local_port': laddr.port,
-        'remote_ip': raddr.ip,
-        'remote_port': raddr.port,
-        'status': conn.status
-      })
-      continue
-      
-    elif conn.status == psutil.CONN_CLOSE:
-      closed_connections.append({
-        'local_ip': laddr.ip,
-        'local_port': laddr.port,
-        'remote_ip': raddr.ip,
-        'remote_port': raddr.port,
-        'status': conn.status
-      })
-      
-    elif conn.status == psutil.CONN_NONE:
-      closed_connections.append({
-        'local_ip': laddr.ip,
-        'local_port': laddr.port,
-        'remote_ip': raddr.ip,
-        'remote_port': raddr.port,
-        'status': conn.status
-      })
-      
+
+# Typed records for the list sections. They read like the dicts they
+# replaced (port['local_port'], port.get('status')) at a fraction of the
+# memory, repeated strings in them are interned.
+Interface = record(
+  'Interface', ['name', 'mac', 'ipv4', 'ipv6', 'mtu', 'state', 'speed'], module=__name__
+)
+ListeningPort = record('ListeningPort', ['local_ip', 'local_port', 'status'], module=__name__)
+Listener = record('Listener', ['port', 'pid', 'name', 'user'], module=__name__)
+Connection = record(
+  'Connection', ['local_ip', 'local_port', 'remote_ip', 'remote_port', 'status'], module=__name__
+)
+UsbDevice = record('UsbDevice', [
+  'idVendor',
+  'idProduct',
+  'manufacturer',
+  'serial_number',
+  'bus',
+  'address',
+  'product',
+], module=__name__)
+PciDevice = record(
+  'PciDevice', ['vendor_id', 'device_id', 'vendor_name', 'device_name'], module=__name__
+)
+Service = systemd.Service
+
+def get_interfaces():
+  # One getifaddrs() pass for every address, link attributes from
+  # /sys/class/net when available and psutil's per-link stats otherwise
+  addresses = psutil.net_if_addrs()
+  use_sysfs = sysfs.available()
+  if_stats = None if use_sysfs else psutil.net_if_stats()
+
+  names = sysfs.net_interfaces() if use_sysfs else sorted(addresses)
+  seen = set(names)
+  for name in addresses:
+    if name not in seen:
+      seen.add(name)
+      names.append(name)
+
+  interfaces = {}
+  for name in names:
+    ipv4 = []
+    ipv6 = []
+    mac = None
+    for address in addresses.get(name, ()):
+      if address.family == AF_INET:
+        ipv4.append(address.address)
+      elif address.family == AF_INET6:
+        ipv6.append(address.address)
+      elif address.family == psutil.AF_LINK:
+        mac = address.address
+
+    if use_sysfs:
+      link = sysfs.net_interface(name)
+      mac = mac or link['address']
+      mtu, state, speed = link['mtu'], link['state'], link['speed']
+    elif name in if_stats:
+      mtu = if_stats[name].mtu
+      state = 'up' if if_stats[name].isup else 'down'
+      speed = if_stats[name].speed or None
     else:
-      logger.info(f'Connection from {laddr.ip}:{laddr.port} to {raddr.ip}:{raddr.port} {conn.status}.')
+      mtu, state, speed = None, None, None
+
+    interfaces[name] = Interface(
+      intern(name), mac, tuple(ipv4), tuple(ipv6), mtu, intern(state), speed
+    )
+
+  return interfaces
+
+# Where get_ports() reports each connection status
+PORT_GROUPS = {
+  psutil.CONN_LISTEN: 'listening_ports',
+  psutil.CONN_ESTABLISHED: 'established_connections',
+  psutil.CONN_CLOSE_WAIT: 'closed_connections',
+  psutil.CONN_CLOSE: 'closed_connections',
+  psutil.CONN_NONE: 'closed_connections',
+}
+
+def _psutil_kind(conn):
+  kind = 'tcp' if conn.type == SOCK_STREAM else 'udp'
+  return kind + '6' if conn.family == AF_INET6 else kind
+
+def iter_connections(states=None, ports=None, pids=False):
+  # Linux streams /proc/net directly and only resolves owning pids when asked,
+  # other systems go through psutil.net_connections()
+  if procfs.available():
+    yield from procfs.iter_sockets(states=states, ports=ports, pids=pids)
+    return
+
+  for conn in psutil.net_connections(kind='inet'):
+    if states is not None and conn.status not in states:
+      continue
+    if ports is not None and conn.laddr.port not in ports:
       continue
-      
-  return {'listening_ports': listening_ports, 'established_connections': established_connections, 'closed_connections': closed_connections}
-  
+
+    yield procfs.Socket(
+      _psutil_kind(conn),
+      conn.laddr.ip,
+      conn.laddr.port,
+      conn.raddr.ip if conn.raddr else None,
+      conn.raddr.port if conn.raddr else None,
+      conn.status,
+      None,
+      None,
+      conn.pid if pids else None,
+    )
+
+def count_connections(states=None, ports=None):
+  if procfs.available():
+    return procfs.count_sockets(states=states, ports=ports)
+
+  return Counter(conn.status for conn in iter_connections(states=states, ports=ports))
+
+def get_ports(states=None, ports=None):
+
+  ports_info = {'listening_ports': [], 'established_connections': [], 'closed_connections': []}
+
+  for conn in iter_connections(states=states, ports=ports):
+    group = PORT_GROUPS.get(conn.status)
+
+    if group is None:
+      logger.info(
+        f'Connection from {conn.local_ip}:{conn.local_port}'
+        f' to {conn.remote_ip}:{conn.remote_port} {conn.status}.'
+      )
+      continue
+
+    if group == 'listening_ports':
+      ports_info[group].append(ListeningPort(conn.local_ip, conn.local_port, conn.status))
+    else:
+      ports_info[group].append(Connection(
+        conn.local_ip, conn.local_port, conn.remote_ip, conn.remote_port, conn.status
+      ))
+
+  return ports_info
+
 def get_services():
   os_name = _system().lower()
-  
+
   if os_name == 'darwin':
     return get_services_macos()
   elif os_name == 'windows':
@@ -111,79 +193,228 @@ def get_services():
     return get_services_linux()
   else:
     return None
-  
-def get_services_macos():
-  # Use launchctl to get macOS services
-  try:
-    output = subprocess.check_output(['launchctl', 'list'], text=True)
-    services = []
-    for line in output.splitlines()[1:]:
-      parts = line.split()[1:]
-      if len(parts) > 1:
-        services.append({
-          'name': parts[-1],
-          'status': parts[0],
-        })
-        
-    return services
-  except Exception as e:
-    logger.error(f'Failed to get macOS services. Error: {e}')
-    return []
-  
+
+def parse_services_macos(output):
+  services = []
+  for line in output.splitlines()[1:]:
+    parts = line.split()[1:]
+    if len(parts) > 1:
+      services.append(Service(parts[-1], None, None, None, None, None, intern(parts[0])))
+
+  return services
+
+# Use launchctl to get macOS services
+get_services_macos = Command(
+  ['launchctl', 'list'],
+  parse_services_macos,
+  error='Failed to get macOS services.',
+)
+
 def get_services_windows():
   services = []
   for service in psutil.win_service_iter():
-    services.append({
-      'name': service.name(),
-      'status': service.status(),
-      'description': service.display_name()
-    })
-    
+    services.append(Service(
+      service.name(), service.display_name(), None, None, None, None, intern(service.status())
+    ))
+
   return services
 
-def get_services_linux():
-  # Try to list services using systemd for Linux
+def parse_services_linux(output):
+  # 'systemctl list-units' output. Only unit rows are kept: the header,
+  # legend and summary lines are skipped and the failed unit marker is
+  # stripped.
+  services = []
+  for line in output.splitlines():
+    parts = line.replace('\u25cf', ' ').split(None, 4)
+    if len(parts) < 4 or not parts[0].endswith('.service'):
+      continue
+    services.append(Service(
+      parts[0],
+      parts[4] if len(parts) > 4 else None,
+      intern(parts[1]),
+      intern(parts[2]),
+      intern(parts[3]),
+      None,
+      intern(parts[3]),
+    ))
+
+  return services
+
+def get_services_linux(states=None, patterns=('*.service',)):
+  # Every unit from systemd over D-Bus, or from the unit files without it.
+  # 'states' (load, active or sub states) and 'patterns' (globs on the unit
+  # name) are applied by systemd.
+  try:
+    return systemd.list_services(states, patterns)
+  except Exception as e:
+    logger.error(f'Failed to get Linux services. Error: {e}')
+    return []
+
+async def aget_services_linux(states=None, patterns=('*.service',)):
   try:
-      output = subprocess.check_output(['systemctl', 'list-units', '--type=service', '--state=running'], text=True)
-      services = []
-      for line in output.splitlines()[1:]:
-          parts = line.split()
-          if len(parts) > 1:
-              services.append({
-                  "name": parts[0],
-                  "status": parts[3],
-              })
-      return services
+    return await systemd.alist_services(states, patterns)
   except Exception as e:
-      print(f"Error retrieving services on Linux: {e}")
-      return []
-    
+    logger.error(f'Failed to get Linux services. Error: {e}')
+    return []
+
+# Default fields for iter_processes(), any psutil.Process.as_dict() attribute
+# name is accepted
+PROCESS_FIELDS = ('pid', 'name', 'cmdline', 'status')
+
+@lru_cache(maxsize=None)
+def _process_record(fields):
+  return namedtuple('Process', fields)
+
+def iter_processes(fields=PROCESS_FIELDS, filter=None):
+  # Stream processes as compact records using the attributes psutil prefetches
+  # in one pass. Processes that exit mid-scan are skipped by process_iter and
+  # fields that can't be read (access denied, zombies) are None.
+  fields = tuple(fields)
+  record = _process_record(fields)
+
+  for p in psutil.process_iter(attrs=list(fields), ad_value=None):
+    info = p.info
+    item = record._make(info[field] for field in fields)
+
+    if filter is None or filter(item):
+      yield item
+
+async def aiter_processes(fields=PROCESS_FIELDS, filter=None, batch=256):
+  # iter_processes() for asyncio code. The scan runs on a worker thread and
+  # hands over 'batch' records at a time, so the loop never waits on /proc
+  # and breaking out of the loop stops the scan at the next batch.
+  processes = iter_processes(fields, filter)
+  while True:
+    records = await asyncio.to_thread(list, islice(processes, batch))
+    if not records:
+      return
+    for item in records:
+      yield item
+
 def get_processes():
-  return [{'pid': p.pid, 'name': p.name(), 'cmdline': ' '.join(p.cmdline())} for p in psutil.process_iter(attrs=['pid', 'name', 'cmdline', 'status']) if p.status() != psutil.STATUS_STOPPED]
+  # With /proc, one ProcessTable scan adds parent, owner and cgroup. RSS and
+  # CPU time are left out so snapshot diffs only show processes that
+  # actually changed, use ProcessTable for those. Ports are get_listeners().
+  if procfs.available():
+    table = ProcessTable.scan(ports=False)
+    return table.to_records([process for process in table if process.state != 'T'])
+
+  return [
+    ProcessRecord(p.pid, None, intern(p.name), ' '.join(p.cmdline or []), None, None, None)
+    for p in iter_processes(filter=lambda p: p.status != psutil.STATUS_STOPPED)
+  ]
+
+def get_listeners():
+  # Listening ports and the processes holding them. Attribution walks every
+  # /proc/<pid>/fd, so this is an opt-in section.
+  if procfs.available():
+    table = ProcessTable.scan(ports=True)
+    return [
+      Listener(port, process.pid, process.name, process.user)
+      for port in sorted(table.keys('port'))
+      for process in sorted(table.by_port(port), key=lambda process: process.pid)
+    ]
+
+  listeners = []
+  for conn in iter_connections(states=('LISTEN',), pids=True):
+    name = user = None
+    if conn.pid is not None:
+      try:
+        process = psutil.Process(conn.pid)
+        name, user = intern(process.name()), process.username()
+      except psutil.Error:
+        pass
+    listeners.append(Listener(conn.local_port, conn.pid, name, user))
+
+  return sorted(set(listeners), key=lambda listener: (listener.port, listener.pid or 0))
 
-def get_usb_devices():
+def get_mounts():
+  # Parsed from one read of mountinfo when available, options come as a
+  # tuple as well as psutil's 'opts' string
+  if mounts.available():
+    return list(mounts.iter_mounts())
+
+  return psutil.disk_partitions(all=True)
+
+def get_disk_usage(timeout=2.0):
+  # {mountpoint: Usage}, statvfs runs concurrently and a mount that doesn't
+  # answer within 'timeout' seconds maps to None
+  if mounts.available():
+    return mounts.MountTable.scan().usage(timeout=timeout)
+
+  mountpoints = [partition.mountpoint for partition in psutil.disk_partitions(all=False)]
+  return mounts.usage(mountpoints, timeout=timeout)
+
+def _get_usb_devices_libusb():
   import libusb_package
+  import usb.backend.libusb1 as libusb1
   import usb.core
   import usb.util
-  import usb.backend.libusb1 as libusb1
-  
-  libusb1_backend = libusb1.get_backend(find_library=libusb1.find_library)
-  
+
+  libusb1_backend = libusb1.get_backend(find_library=libusb_package.find_library)
+
   usb_devices = []
-  
+
   devices = usb.core.find(find_all=True, backend=libusb1_backend)
-  
+
   for device in devices:
-    usb_devices.append({
-      'idVendor': hex(device.idVendor),
-      'idProduct': hex(device.idProduct),
-      'manufacturer': usb.util.get_string(device, device.iManufacturer),
-      'serial_number': device.serial_number,
-      'bus': device.bus,
-      'address': device.address,
-      'product': device.product
-    })
-    
+    usb_devices.append(UsbDevice(
+      intern(hex(device.idVendor)),
+      hex(device.idProduct),
+      intern(usb.util.get_string(device, device.iManufacturer)),
+      device.serial_number,
+      device.bus,
+      device.address,
+      device.product,
+    ))
+
+  return usb_devices
+
+def _hex_or_none(value):
+  try:
+    return hex(int(value, 16))
+  except (TypeError, ValueError):
+    return None
+
+def _int_or_none(value):
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    return None
+
+def get_usb_devices(libusb=False, resolve_names=True):
+  # Linux reads /sys/bus/usb without opening any device. libusb issues
+  # control transfers to every device and is only used when asked for or
+  # when sysfs is not available.
+  if libusb or not sysfs.available():
+    return _get_usb_devices_libusb()
+
+  database = ids.usb_ids() if resolve_names else None
+
+  usb_devices = []
+  for _name, attributes in sysfs.usb_devices():
+    vendor_id = attributes['idVendor']
+    product_id = attributes['idProduct']
+    manufacturer = attributes['manufacturer']
+    product = attributes['product']
+
+    # Devices without string descriptors get their names from usb.ids
+    if database is not None:
+      if manufacturer is None:
+        manufacturer = database.vendor(vendor_id)
+      if product is None and product_id is not None:
+        product = database.device(vendor_id, product_id)
+
+    usb_devices.append(UsbDevice(
+      intern(_hex_or_none(vendor_id)),
+      _hex_or_none(product_id),
+      intern(manufacturer),
+      attributes['serial'],
+      _int_or_none(attributes['busnum']),
+      _int_or_none(attributes['devnum']),
+      product,
+    ))
+
   return usb_devices
 
 def normalize_device_info(
@@ -192,40 +423,65 @@ def normalize_device_info(
   vendor_name=None,
   device_name=None
 ):
-  return {
-    'vendor_id': vendor_id,
-    'device_id': device_id,
-    'vendor_name': vendor_name,
-    'device_name': device_name,
-  }
-  
-def get_pci_devices_linux():
+  return PciDevice(intern(vendor_id), device_id, intern(vendor_name), device_name)
+
+def _split_id(value):
+  # 'Intel Corporation [8086]' -> ('Intel Corporation', '8086')
+  if value.endswith(']') and ' [' in value:
+    name, _, device_id = value[:-1].rpartition(' [')
+    return name, device_id
+  return value, None
+
+def parse_pci_devices_linux(output):
+  # Parses machine readable 'lspci -vmmnn' output, one blank line separated
+  # record per device
   devices = []
-  try:
-    output = subprocess.check_output(['lspci', '-vnn'], text=True)
-    device_info = {}
-    for line in output.splitlines():
-      if line.strip() == '':
-        if device_info:
-          devices.append(device_info)
-          device_info = {}
-          
-      else:
-        key, value = line.split('\t', 1)
-        if key == "Vendor":
-          device_info['vendor_id'] = value
-        if key == "Device":
-          device_info['device_name'] = value
-        if key == "Slot":
-          device_info['vendor_id'], device_info['device_id'] = value.split(':')[0], value.split(':')[1]
-          
+  device_info = {}
+  for line in output.splitlines() + ['']:
+    if line.strip() == '':
       if device_info:
         devices.append(device_info)
-  except Exception as e:
-    logger.error(f'Failed to get PCI devices. Error: {e}')
-    
-    return [normalize_device_info(**d) for d in devices]
-  
+        device_info = {}
+      continue
+
+    key, _, value = line.partition(':')
+    value = value.strip()
+    if key == 'Vendor':
+      device_info['vendor_name'], device_info['vendor_id'] = _split_id(value)
+    elif key == 'Device':
+      device_info['device_name'], device_info['device_id'] = _split_id(value)
+
+  return [normalize_device_info(**d) for d in devices]
+
+_lspci = Command(
+  ['lspci', '-vmmnn'],
+  parse_pci_devices_linux,
+  error='Failed to get PCI devices.',
+)
+
+def get_pci_devices_linux(resolve_names=True):
+  # Read /sys/bus/pci directly, names come from the memory mapped pci.ids.
+  # lspci is only used when sysfs is not mounted.
+  if not sysfs.available():
+    return _lspci()
+
+  database = ids.pci_ids() if resolve_names else None
+
+  devices = []
+  known = database is not None
+  for _slot, attributes in sysfs.pci_devices():
+    vendor_id = attributes['vendor']
+    device_id = attributes['device']
+    device_known = known and vendor_id and device_id
+    devices.append(normalize_device_info(
+      vendor_id=vendor_id,
+      device_id=device_id,
+      vendor_name=database.vendor(vendor_id) if known and vendor_id else None,
+      device_name=database.device(vendor_id, device_id) if device_known else None,
+    ))
+
+  return devices
+
 def get_pci_devices_windows():
   devices = []
   try:
@@ -239,41 +495,42 @@ def get_pci_devices_windows():
           vendor_name=device.Manufacturer,
           device_name=device.Description
         ))
-        
+
   except Exception as e:
     logger.error(f'Failed to get PCI devices. Error: {e}')
-    
+
   return devices
 
-def get_pci_devices_macos():
+def parse_pci_devices_macos(output):
   devices = []
-  try:
-    output = subprocess.check_output(['system_profiler', 'SPPCIDataType'], text=True)
-    current_device = {}
-    for line in output.splitlines():
-        if "Vendor" in line:
-            current_device['vendor_name'] = line.split(":")[-1].strip()
-        if "Device" in line:
-            current_device['device_name'] = line.split(":")[-1].strip()
-        if "Vendor ID" in line:
-            current_device['vendor_id'] = line.split(":")[-1].strip()
-        if "Device ID" in line:
-            current_device['device_id'] = line.split(":")[-1].strip()
-        if line.strip() == "":
-            if current_device:
-                devices.append(current_device)
-                current_device = {}
-    if current_device:
+  current_device = {}
+  for line in output.splitlines():
+    if "Vendor" in line:
+      current_device['vendor_name'] = line.split(":")[-1].strip()
+    if "Device" in line:
+      current_device['device_name'] = line.split(":")[-1].strip()
+    if "Vendor ID" in line:
+      current_device['vendor_id'] = line.split(":")[-1].strip()
+    if "Device ID" in line:
+      current_device['device_id'] = line.split(":")[-1].strip()
+    if line.strip() == "":
+      if current_device:
         devices.append(current_device)
+        current_device = {}
+  if current_device:
+    devices.append(current_device)
 
-  except Exception as e:
-    logger.error(f'Failed to get PCI devices. Error: {e}')
-    
   return [normalize_device_info(**d) for d in devices]
 
+get_pci_devices_macos = Command(
+  ['system_profiler', 'SPPCIDataType'],
+  parse_pci_devices_macos,
+  error='Failed to get PCI devices.',
+)
+
 def get_pci_devices():
-  os_name = _system.lower()
-  
+  os_name = _system().lower()
+
   if os_name == 'darwin':
     return get_pci_devices_macos()
   elif os_name == 'windows':
@@ -282,48 +539,60 @@ def get_pci_devices():
     return get_pci_devices_linux()
   else:
     return None
-  
+
 def get_hosts():
- 
-  try:
-    hosts = _Hosts().entries
-    hosts_file = _Hosts().determine_hosts_path()
-  except Exception as e:
-    logger.error(f'Failed to retrieve hosts info. Error: {e}')
-    return None
-  
-  if not hosts or len(hosts) == 0:
-    logger.warning(f'Failed to get any hosts info from file "{hosts_file}".')
+  # Parsed once per change of the file, later calls reuse the index
+  hosts = load_hosts()
+  entries = hosts.entries
+
+  if not entries:
+    logger.warning(f'Failed to get any hosts info from file "{hosts.path}".')
     return None
-  
-  return hosts
+
+  return entries
+
+@lru_cache(maxsize=1)
+def _resolver_settings(key):
+  # One Resolver per resolv.conf (device, inode, mtime, size) key
+  from dns.resolver import Resolver as _Resolver
+
+  resolver = _Resolver()
+  return {
+    'nameservers': list(resolver.nameservers),
+    'search': list(resolver.search),
+    'port': resolver.port,
+    'domain': resolver.domain,
+    'retry_servfail': resolver.retry_servfail,
+    'timeout': resolver.timeout,
+    'lifetime': resolver.lifetime,
+    'edns': resolver.edns,
+    'ednsflags': resolver.ednsflags,
+  }
 
 def get_resolver():
+  key = load_resolv_conf().key
+
   try:
-    resolver = {
-      'nameservers': _Resolver().nameservers,
-      'search': _Resolver().search,
-      'port': _Resolver().port,
-      'domain': _Resolver().domain,
-      'retry_servfail': _Resolver().retry_servfail,
-      'timeout': _Resolver().timeout,
-      'lifetime': _Resolver().lifetime,
-      'edns': _Resolver().edns,
-      'ednsflags': _Resolver().ednsflags,
-    }
+    # Without a resolv.conf to key on (Windows reads the registry) every
+    # call builds a fresh Resolver
+    resolver = _resolver_settings(key) if key is not None else _resolver_settings.__wrapped__(key)
   except Exception as e:
     logger.error(f'Failed to retrieve resolver info. Error: {e}')
     return None
 
-  return resolver
+  # Callers get their own lists, the cached ones stay untouched
+  return {
+    name: list(value) if isinstance(value, list) else value
+    for name, value in resolver.items()
+  }
 
 def get_posix_compliant():
   os_name = _system().lower()
-  
+
   if os_name in ['linux', 'darwin']:
     try:
       #Try using POSIX function
-      uname_info = os.uname()
+      os.uname()
       return True
     except AttributeError:
       logger.info('POSIX function not available on this system.')
@@ -342,11 +611,11 @@ def get_posix_compliant():
   else:
     logger.warning(f'Unsupported operating system: {os_name}')
     return False
-  
-  
+
+
 def get_kernel_name():
   os_name = _system().lower()
-  
+
   if os_name in ['linux', 'darwin']:
     return os.uname().sysname
   elif os_name == 'windows':
@@ -354,7 +623,7 @@ def get_kernel_name():
   else:
     logger.warning(f'Unsupported operating system: {os_name}')
     return None
-  
+
 def get_kernel_version():
   os_name = _system().lower()
 
@@ -365,75 +634,280 @@ def get_kernel_version():
   else:
     logger.warning(f'Unsupported operating system: {os_name}')
     return None
-  
+
+# Sections collected lazily by OperatingSystem, in the order used by prefetch()
+SECTIONS = (
+  'cpu_count',
+  'cpu_frequency',
+  'memory',
+  'swap',
+  'mounts',
+  'disk_usage',
+  'usb_devices',
+  'pci_devices',
+  'hosts',
+  'resolver',
+  'posix_compliant',
+  'kernel_name',
+  'kernel_version',
+  'ip',
+  'mac',
+  'interfaces',
+  'ports',
+  'services',
+  'processes',
+  'listeners',
+)
+
+# Sections too expensive for a default collect, only collected when named
+OPT_IN_SECTIONS = ('listeners',)
+
+# What prefetch() and collect() gather when no sections are given
+DEFAULT_SECTIONS = tuple(section for section in SECTIONS if section not in OPT_IN_SECTIONS)
+
+# Subprocess-backed collectors, returned as Command objects so the asyncio
+# engine can run them without tying up a worker thread
+COMMANDS = {
+  ('services', 'darwin'): get_services_macos,
+  ('pci_devices', 'darwin'): get_pci_devices_macos,
+}
+
+# Native coroutine collectors used by acollect(), sections without one run
+# their Command through asyncio or their blocking collector on a thread
+ASYNC_COLLECTORS = {
+  ('services', 'linux'): aget_services_linux,
+}
+
+# Default interface used for the 'ip' and 'mac' sections
+DEFAULT_INTERFACES = {
+  'darwin': 'en0',
+  'windows': 'Ethernet',
+  'linux': 'eth0',
+}
+
 class OperatingSystem:
-  def __init__(self):
-    self._name = _system().lower()
+  def __init__(self, sections=None, cache=None):
+    self._system = _system().lower()
+    self._name = self._system
     self._version = _version()
     self._arch = _architecture()
     self._hostname = _gethostname()
-    
-    # Get number of cpus
-    self._cpu_count = psutil.cpu_count()
-    
-    # Get cpu frequency
-    self._cpu_frequency = psutil.cpu_freq().max
-    
-    # Get system memory
-    self._memory = psutil.virtual_memory().total
-    
-    # Get swap memory
-    self._swap = psutil.swap_memory().total
-    
-    # Get mounts info
-    self._mounts = psutil.disk_partitions(all=True)
-    
-    # Get usb device info
-    self._usb_devices = get_usb_devices()
-    
-    # Get pci/pcie device info
-    self._pci_devices = get_pci_devices()
-    
-    # Get hosts info
-    self._hosts = get_hosts()
-    
-    # Get resolver info
-    self._resolver = get_resolver()
-    
-    # Get if the OS is posix-compliant
-    self._posix_compliant = get_posix_compliant()
-    
-    # Get kernel name
-    self._kernel_name = get_kernel_name()
-    
-    # Get kernel_version
-    self._kernel_version = get_kernel_version()
-    
+
     if self._name == 'darwin':
       self._name = 'macos'
-      self._ip = get_ip('en0')
-      self._mac = get_mac('en0')
-
-    elif self._name == 'windows':
-      self._name = 'windows'
-      self._ip = get_ip('Ethernet')
-      self._mac = get_mac('Ethernet')
-      
-    elif self._name == 'linux':
-      self._name = 'linux'
-      self._ip = get_ip('eth0')
-      self._mac = get_mac('eth0')
 
-    else:
-      self._ip = None
-      self._mac = None
-      
-    self._interfaces = [{'name': interface, 'ip': get_ip(interface), 'mac': get_mac(interface)} for interface in netifaces.interfaces()]
-    
-    self._ports = get_ports()
-    self._services = get_services()
-    self._processes = get_processes()
-      
+    # Memoized section values, filled on first access or by prefetch()
+    self._sections = {}
+    # Per-section locks, see _once()
+    self._locks = {}
+    self._lock = threading.Lock()
+
+    # Cache shared across instances for sections that rarely change, pass
+    # cache=False to always probe
+    if cache is None:
+      cache = default_cache
+    self._cache = cache if cache is not False else None
+
+    if sections is not None:
+      self.prefetch(sections)
+
+  def prefetch(self, sections=None):
+    for section, collector in self._collectors(sections).items():
+      self._once(section, partial(stats.call, section, collector))
+
+    return self
+
+  def collect(self, sections=None, timeout=None, timeouts=None, max_workers=None):
+    # Run the missing sections concurrently. Sections that fail or time out
+    # are reported on the returned Collection. A failed section is left
+    # uncollected so a later access probes it again, a timed out one is
+    # memoized if its collector finishes after all.
+    collectors = {
+      section: partial(self._once, section, collector)
+      for section, collector in self._collectors(sections).items()
+    }
+    return collect(collectors, timeout=timeout, timeouts=timeouts, max_workers=max_workers)
+
+  async def acollect(self, sections=None, timeout=None, timeouts=None):
+    # collect() for asyncio code. Subprocesses and D-Bus calls are awaited
+    # instead of holding a thread, timed out and cancelled subprocesses are
+    # killed. Results are memoized like collect()'s, so the sync properties
+    # stay the facade over both.
+    collectors = {}
+    for section, collector in self._collectors(sections).items():
+      native = ASYNC_COLLECTORS.get((section, self._system))
+      if native is not None:
+        collectors[section] = native
+      elif isinstance(collector, Command):
+        collectors[section] = collector
+      else:
+        # Blocking collectors run on a thread, through _once() like collect()
+        collectors[section] = partial(self._once, section, collector)
+    collection = await acollect(collectors, timeout=timeout, timeouts=timeouts)
+    for section, value in collection.results.items():
+      if section not in self._sections:
+        self._store(section, value)
+
+    return collection
+
+  async def aget(self, section, timeout=None):
+    # One section, awaited: await system.aget('services')
+    if section not in self._sections:
+      collection = await self.acollect([section], timeout=timeout)
+      if section in collection.errors:
+        raise collection.errors[section]
+      if section in collection.timed_out:
+        raise asyncio.TimeoutError(f'Collector {section} timed out after {timeout}s')
+
+    return self._sections[section]
+
+  def invalidate(self, sections=None):
+    # Forget memoized and cached sections so the next access probes them again
+    if sections is None:
+      sections = SECTIONS
+    elif isinstance(sections, str):
+      sections = [sections]
+
+    for section in sections:
+      self._sections.pop(section, None)
+
+    if self._cache is not None:
+      self._cache.invalidate(sections)
+
+  @property
+  def collected(self):
+    return [section for section in SECTIONS if section in self._sections]
+
+  def _collectors(self, sections=None):
+    if sections is None:
+      sections = DEFAULT_SECTIONS
+    elif isinstance(sections, str):
+      sections = [sections]
+
+    unknown = [section for section in sections if section not in SECTIONS]
+    if unknown:
+      logger.error(f'Unknown sections: {", ".join(unknown)}')
+      raise ValueError(f'Unknown sections: {", ".join(unknown)}')
+
+    collectors = {}
+    for section in sections:
+      if section in self._sections:
+        continue
+
+      if self._cache is not None:
+        hit, value = self._cache.get(section)
+        if hit:
+          self._sections[section] = value
+          continue
+
+      collectors[section] = self._collector(section)
+
+    return collectors
+
+  def _collector(self, section):
+    command = COMMANDS.get((section, self._system))
+    if command is not None:
+      return command
+
+    return getattr(self, f'_collect_{section}')
+
+  def _store(self, section, value):
+    self._sections[section] = value
+    if self._cache is not None:
+      self._cache.set(section, value)
+
+  def _once(self, section, collector):
+    # Collect a section one caller at a time. A thread asking for a section
+    # another thread is collecting waits for that result instead of probing
+    # again, so ip and mac reuse the interfaces collect() is running.
+    with self._lock:
+      lock = self._locks.setdefault(section, threading.Lock())
+    with lock:
+      if section not in self._sections:
+        self._store(section, collector())
+      return self._sections[section]
+
+  def _get(self, section):
+    if section not in self._sections:
+      for name, collector in self._collectors([section]).items():
+        self._once(name, partial(stats.call, name, collector))
+
+    return self._sections[section]
+
+  def _collect_cpu_count(self):
+    return psutil.cpu_count()
+
+  def _collect_cpu_frequency(self):
+    frequency = psutil.cpu_freq()
+    return frequency.max if frequency is not None else None
+
+  def _collect_memory(self):
+    return psutil.virtual_memory().total
+
+  def _collect_swap(self):
+    return psutil.swap_memory().total
+
+  def _collect_mounts(self):
+    return get_mounts()
+
+  def _collect_disk_usage(self):
+    return get_disk_usage()
+
+  def _collect_usb_devices(self):
+    return get_usb_devices()
+
+  def _collect_pci_devices(self):
+    return get_pci_devices()
+
+  def _collect_hosts(self):
+    return get_hosts()
+
+  def _collect_resolver(self):
+    return get_resolver()
+
+  def _collect_posix_compliant(self):
+    return get_posix_compliant()
+
+  def _collect_kernel_name(self):
+    return get_kernel_name()
+
+  def _collect_kernel_version(self):
+    return get_kernel_version()
+
+  def _default_interface(self):
+    name = DEFAULT_INTERFACES.get(self._system)
+    if name is None:
+      return None
+
+    interface = self._get('interfaces').get(name)
+    if interface is None:
+      logger.error(f'Interface {name} does not exist.')
+
+    return interface
+
+  def _collect_ip(self):
+    interface = self._default_interface()
+    return interface.ipv4[0] if interface is not None and interface.ipv4 else None
+
+  def _collect_mac(self):
+    interface = self._default_interface()
+    return interface.mac if interface is not None else None
+
+  def _collect_interfaces(self):
+    return get_interfaces()
+
+  def _collect_ports(self):
+    return get_ports()
+
+  def _collect_services(self):
+    return get_services()
+
+  def _collect_processes(self):
+    return get_processes()
+
+  def _collect_listeners(self):
+    return get_listeners()
+
   def __str__(self):
     return self.name
 
@@ -448,79 +922,87 @@ class OperatingSystem:
   @property
   def arch(self):
     return self._arch
-  
+
   @property
   def hostname(self):
     return self._hostname
-  
+
   @property
   def cpu_count(self):
-    return self._cpu_count
-  
+    return self._get('cpu_count')
+
   @property
   def cpu_frequency(self):
-    return self._cpu_frequency
-  
+    return self._get('cpu_frequency')
+
   @property
   def memory(self):
-    return self._memory
-  
+    return self._get('memory')
+
   @property
   def swap(self):
-    return self._swap
-  
+    return self._get('swap')
+
   @property
   def mounts(self):
-    return self._mounts
-  
+    return self._get('mounts')
+
+  @property
+  def disk_usage(self):
+    return self._get('disk_usage')
+
   @property
   def usb_devices(self):
-    return self._usb_devices
-  
+    return self._get('usb_devices')
+
   @property
   def pci_devices(self):
-    return self._pci_devices
-  
+    return self._get('pci_devices')
+
   @property
   def hosts(self):
-    return self._hosts
-  
+    return self._get('hosts')
+
   @property
   def resolver(self):
-    return self._resolver
-  
+    return self._get('resolver')
+
   @property
   def posix_compliant(self):
-    return self._posix_compliant
-  
+    return self._get('posix_compliant')
+
   @property
   def kernel_name(self):
-    return self._kernel_name
-  
+    return self._get('kernel_name')
+
   @property
   def kernel_version(self):
-    return self._kernel_version
-  
+    return self._get('kernel_version')
+
   @property
   def ip(self):
-    return self._ip
-  
+    return self._get('ip')
+
   @property
   def mac(self):
-    return self._mac
-  
+    return self._get('mac')
+
   @property
   def interfaces(self):
-    return self._interfaces
-  
+    return self._get('interfaces')
+
   @property
   def ports(self):
-    return self._ports
-  
+    return self._get('ports')
+
   @property
   def services(self):
-    return self._services
-  
+    return self._get('services')
+
   @property
   def processes(self):
-    return self._processes
\ No newline at end of file
+    return self._get('processes')
+
+  @property
+  def listeners(self):
+    return self._get('listeners')
@@ -0,0 +1,160 @@
+# sysmind/core/procfs.py
+from __future__ import annotations
+
+import os
+import socket
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+PROC = '/proc'
+
+# /proc/net/tcp{,6} state codes, named like the psutil.CONN_* constants
+TCP_STATES = {
+  '01': 'ESTABLISHED',
+  '02': 'SYN_SENT',
+  '03': 'SYN_RECV',
+  '04': 'FIN_WAIT1',
+  '05': 'FIN_WAIT2',
+  '06': 'TIME_WAIT',
+  '07': 'CLOSE',
+  '08': 'CLOSE_WAIT',
+  '09': 'LAST_ACK',
+  '0A': 'LISTEN',
+  '0B': 'CLOSING',
+  '0C': 'SYN_RECV',
+}
+
+SOCKET_KINDS = ('tcp', 'tcp6', 'udp', 'udp6')
+
+Socket = namedtuple('Socket', [
+  'kind',
+  'local_ip',
+  'local_port',
+  'remote_ip',
+  'remote_port',
+  'status',
+  'uid',
+  'inode',
+  'pid',
+])
+
+
+def available(root=PROC):
+  return os.path.isfile(os.path.join(root, 'net', 'tcp'))
+
+@lru_cache(maxsize=4096)
+def _ip(address, family):
+  # Addresses are hex in host byte order, one 32-bit word at a time. Cached,
+  # a host has few distinct addresses and every socket on one shares the
+  # same string.
+  raw = bytes.fromhex(address)
+  if family == socket.AF_INET:
+    raw = raw[::-1]
+  else:
+    raw = b''.join(raw[i:i + 4][::-1] for i in range(0, 16, 4))
+
+  return socket.inet_ntop(family, raw)
+
+def _address(value, family):
+  address, port = value.split(':')
+  return _ip(address, family), int(port, 16)
+
+def socket_owners(root=PROC):
+  # Map socket inodes to the pid holding them by reading every /proc/<pid>/fd.
+  # Only needed for pid attribution, it is by far the most expensive step.
+  owners = {}
+  for entry in os.scandir(root):
+    if not entry.name.isdigit():
+      continue
+    fd_dir = os.path.join(entry.path, 'fd')
+    try:
+      fds = os.listdir(fd_dir)
+    except OSError:
+      continue
+    pid = int(entry.name)
+    for fd in fds:
+      try:
+        target = os.readlink(os.path.join(fd_dir, fd))
+      except OSError:
+        continue
+      if target.startswith('socket:['):
+        owners.setdefault(int(target[8:-1]), pid)
+
+  return owners
+
+def _socket_lines(kinds, root):
+  for kind in kinds:
+    try:
+      f = open(os.path.join(root, 'net', kind), 'r')
+    except OSError:
+      continue
+    with f:
+      # Skip the header
+      next(f, None)
+      for line in f:
+        yield kind, line.split()
+
+def _status(kind, code):
+  # psutil reports every UDP socket as NONE
+  if kind.startswith('udp'):
+    return 'NONE'
+
+  return TCP_STATES.get(code, code)
+
+def iter_sockets(kinds=SOCKET_KINDS, states=None, ports=None, pids=False, root=PROC):
+  # Stream /proc/net/{tcp,tcp6,udp,udp6}. 'states' is a collection of status
+  # names, 'ports' anything supporting 'in' for local ports, e.g.
+  # range(1, 1024). Filters run before addresses are decoded.
+  owners = socket_owners(root) if pids else None
+
+  for kind, fields in _socket_lines(kinds, root):
+    status = _status(kind, fields[3])
+    if states is not None and status not in states:
+      continue
+
+    local_port = int(fields[1][-4:], 16)
+    if ports is not None and local_port not in ports:
+      continue
+
+    family = socket.AF_INET6 if kind.endswith('6') else socket.AF_INET
+    local_ip, _ = _address(fields[1], family)
+    remote_ip, remote_port = _address(fields[2], family)
+    if remote_port == 0:
+      remote_ip, remote_port = None, None
+
+    inode = int(fields[9])
+    yield Socket(
+      kind,
+      local_ip,
+      local_port,
+      remote_ip,
+      remote_port,
+      status,
+      int(fields[7]),
+      inode,
+      owners.get(inode) if owners is not None else None,
+    )
+
+def count_sockets(kinds=SOCKET_KINDS, states=None, ports=None, root=PROC):
+  # Counts per status without decoding addresses, for dashboards
+  counts = Counter()
+  for kind, fields in _socket_lines(kinds, root):
+    status = _status(kind, fields[3])
+    if states is not None and status not in states:
+      continue
+    if ports is not None and int(fields[1][-4:], 16) not in ports:
+      continue
+    counts[status] += 1
+
+  return counts
+
+
+__all__ = [
+  'PROC',
+  'Socket',
+  'SOCKET_KINDS',
+  'available',
+  'iter_sockets',
+  'count_sockets',
+  'socket_owners',
+]
@@ -0,0 +1,462 @@
+# sysmind/core/proctable.py
+from __future__ import annotations
+
+import operator
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from sysmind.core import procfs
+from sysmind.core.records import intern, record
+
+Process = namedtuple('Process', [
+  'pid',
+  'ppid',
+  'name',
+  'cmdline',
+  'state',
+  'uid',
+  'user',
+  'cgroup',
+  'rss',
+  'cpu_time',
+  'start_time',
+  'ports',
+])
+
+# One entry of the 'processes' section. RSS and CPU time are left out so
+# snapshot diffs only show processes that actually changed, listening ports
+# are the opt-in 'listeners' section.
+ProcessRecord = record('ProcessRecord', [
+  'pid',
+  'ppid',
+  'name',
+  'cmdline',
+  'uid',
+  'user',
+  'cgroup',
+], module=__name__)
+_pick = operator.attrgetter(*ProcessRecord._fields)
+
+# Fields ProcessTable keeps an index for, queried with table.by(index, key)
+INDEXES = ('ppid', 'name', 'user', 'cgroup', 'service', 'port')
+
+# comm in /proc/<pid>/stat is cut to TASK_COMM_LEN - 1 bytes
+COMM_LENGTH = 15
+
+
+def _read(path):
+  # Whole file with raw os.read calls, cmdline can exceed a page
+  try:
+    fd = os.open(path, os.O_RDONLY)
+  except OSError:
+    return None
+  try:
+    chunks = []
+    while True:
+      chunk = os.read(fd, 65536)
+      if not chunk:
+        return b''.join(chunks)
+      chunks.append(chunk)
+  except OSError:
+    return None
+  finally:
+    os.close(fd)
+
+@lru_cache(maxsize=None)
+def _units():
+  # (clock ticks, page size), asked on first use: os.sysconf and pwd only
+  # exist on Unix and the module is imported everywhere for ProcessRecord
+  return os.sysconf('SC_CLK_TCK'), os.sysconf('SC_PAGE_SIZE')
+
+def _stat(path):
+  # (name, state, ppid, cpu_time, start_time, rss) from /proc/<pid>/stat.
+  # The name is in parentheses and may itself contain spaces or ')'.
+  data = _read(os.path.join(path, 'stat'))
+  if not data:
+    return None
+  start = data.index(b'(')
+  end = data.rindex(b')')
+  fields = data[end + 2:].split()
+  clock_ticks, page_size = _units()
+  return (
+    intern(data[start + 1:end].decode(errors='replace')),
+    intern(fields[0].decode()),
+    int(fields[1]),
+    (int(fields[11]) + int(fields[12])) / clock_ticks,
+    int(fields[19]),
+    int(fields[21]) * page_size,
+  )
+
+def _full_name(name, argv0, path):
+  # A comm that may have been cut is expanded from argv[0] or the
+  # executable when either starts with it, like psutil's Process.name()
+  if len(name.encode()) < COMM_LENGTH:
+    return name
+  candidate = os.path.basename(argv0)
+  if candidate.startswith(name):
+    return intern(candidate)
+  try:
+    candidate = os.path.basename(os.readlink(os.path.join(path, 'exe')))
+  except OSError:
+    return name
+  # ' (deleted)' is appended to replaced executables
+  candidate = candidate.removesuffix(' (deleted)')
+  return intern(candidate) if candidate.startswith(name) else name
+
+def _cgroup(path):
+  # The unified (v2) hierarchy, or systemd's named v1 hierarchy
+  data = _read(os.path.join(path, 'cgroup'))
+  if not data:
+    return None
+  fallback = None
+  for line in data.decode(errors='replace').splitlines():
+    hierarchy, _, rest = line.partition(':')
+    controllers, _, cgroup = rest.partition(':')
+    if hierarchy == '0' and controllers == '':
+      return intern(cgroup)
+    if controllers == 'name=systemd' or fallback is None:
+      fallback = cgroup
+  return intern(fallback)
+
+def _sockets(path):
+  # Inodes of every socket the process has open
+  fd_dir = os.path.join(path, 'fd')
+  try:
+    fds = os.listdir(fd_dir)
+  except OSError:
+    return frozenset()
+  inodes = set()
+  for fd in fds:
+    try:
+      target = os.readlink(os.path.join(fd_dir, fd))
+    except OSError:
+      continue
+    if target.startswith('socket:['):
+      inodes.add(int(target[8:-1]))
+  return frozenset(inodes)
+
+def _listening(root):
+  # {inode: port} of TCP listeners and bound, unconnected UDP sockets
+  listening = {}
+  for sock in procfs.iter_sockets(root=root):
+    if sock.status == 'LISTEN' or (sock.status == 'NONE' and sock.remote_port is None):
+      listening[sock.inode] = sock.local_port
+  return listening
+
+@lru_cache(maxsize=1024)
+def _user(uid):
+  import pwd
+
+  try:
+    return intern(pwd.getpwuid(uid).pw_name)
+  except KeyError:
+    return str(uid)
+
+def service(cgroup):
+  # '/system.slice/ssh.service' -> 'ssh.service'
+  if not cgroup:
+    return None
+  for part in reversed(cgroup.split('/')):
+    if part.endswith('.service'):
+      return part
+  return None
+
+
+class ProcessTable(object):
+  # Every process from one scan of /proc, indexed by pid, parent, name,
+  # user, cgroup, systemd service and listening port. refresh() re-reads
+  # only new, replaced or changed processes. Ports walk every
+  # /proc/<pid>/fd, ports=False leaves them out.
+  def __init__(self, root=procfs.PROC, ports=True):
+    self._root = root
+    self._attribute_ports = ports
+    self._processes = {}
+    # pid -> (start_time, name), a different value means the pid was reused
+    # or the process exec'd and everything is read again
+    self._identity = {}
+    self._sockets = {}
+    self._listening = {}
+    self._indexes = {index: {} for index in INDEXES}
+
+  @classmethod
+  def scan(cls, root=procfs.PROC, ports=True):
+    table = cls(root, ports)
+    table.refresh()
+    return table
+
+  @classmethod
+  def from_records(cls, records):
+    # Table over plain dicts, e.g. a snapshot's 'processes' section. Fields
+    # missing from the records are None.
+    table = cls(root=None)
+    for item in records or []:
+      process = Process(**{field: item.get(field) for field in Process._fields})
+      if isinstance(process.cmdline, list):
+        process = process._replace(cmdline=' '.join(process.cmdline))
+      process = process._replace(ports=tuple(process.ports or ()))
+      table._add(process)
+    return table
+
+  def __repr__(self):
+    return f'ProcessTable(processes={len(self._processes)})'
+
+  def __len__(self):
+    return len(self._processes)
+
+  def __iter__(self):
+    return iter(self._processes.values())
+
+  def __contains__(self, pid):
+    return pid in self._processes
+
+  def __getitem__(self, pid):
+    return self._processes[pid]
+
+  def get(self, pid, default=None):
+    return self._processes.get(pid, default)
+
+  # Index maintenance
+
+  def _keys(self, process):
+    yield 'ppid', process.ppid
+    yield 'name', process.name
+    yield 'user', process.user
+    yield 'cgroup', process.cgroup
+    yield 'service', service(process.cgroup)
+    for port in process.ports:
+      yield 'port', port
+
+  def _add(self, process):
+    self._processes[process.pid] = process
+    for index, key in self._keys(process):
+      self._indexes[index].setdefault(key, set()).add(process.pid)
+
+  def _remove(self, pid):
+    self._identity.pop(pid, None)
+    self._sockets.pop(pid, None)
+    self._unindex(pid)
+
+  def _unindex(self, pid):
+    process = self._processes.pop(pid, None)
+    if process is None:
+      return
+    for index, key in self._keys(process):
+      pids = self._indexes[index].get(key)
+      if pids is not None:
+        pids.discard(pid)
+        if not pids:
+          del self._indexes[index][key]
+
+  def _replace(self, process):
+    self._unindex(process.pid)
+    self._add(process)
+
+  # Scanning
+
+  def _ports(self, pid):
+    listening = self._listening
+    inodes = self._sockets.get(pid, ())
+    return tuple(sorted({listening[inode] for inode in inodes if inode in listening}))
+
+  def _read_process(self, pid, stat):
+    path = os.path.join(self._root, str(pid))
+    name, state, ppid, cpu_time, start_time, rss = stat
+    try:
+      uid = os.stat(path).st_uid
+    except OSError:
+      return None
+    cmdline = (_read(os.path.join(path, 'cmdline')) or b'').rstrip(b'\0')
+    if self._attribute_ports:
+      self._sockets[pid] = _sockets(path)
+    # Identity uses comm as read, it is what the next refresh compares
+    self._identity[pid] = (start_time, name)
+    argv0 = cmdline.partition(b'\0')[0].decode(errors='replace')
+    return Process(
+      pid,
+      ppid,
+      _full_name(name, argv0, path),
+      cmdline.replace(b'\0', b' ').decode(errors='replace'),
+      state,
+      uid,
+      _user(uid),
+      _cgroup(path),
+      rss,
+      cpu_time,
+      start_time,
+      (),
+    )
+
+  def refresh(self):
+    # Returns (added, removed, changed) pids. Existing processes cost one
+    # read of their stat file and a stat of their directory,
+    # /proc/<pid>/fd is only walked again for them when a listening socket
+    # appeared that no known process holds.
+    if self._root is None:
+      raise ValueError('Table was built from records, there is nothing to refresh')
+
+    pids = self._pids()
+    removed = [pid for pid in self._processes if pid not in pids]
+    for pid in removed:
+      self._remove(pid)
+
+    added = []
+    changed = []
+    for pid in pids:
+      self._refresh_process(pid, added, removed, changed)
+
+    if self._attribute_ports:
+      self._refresh_ports(added, changed)
+
+    return added, removed, changed
+
+  def _pids(self):
+    try:
+      return {int(entry) for entry in os.listdir(self._root) if entry.isdigit()}
+    except OSError:
+      return set()
+
+  def _refresh_process(self, pid, added, removed, changed):
+    path = os.path.join(self._root, str(pid))
+    stat = _stat(path)
+    if stat is None or self._identity.get(pid) != (stat[4], stat[0]):
+      # Exited, new, or the pid was reused or exec'd: read everything again
+      if pid in self._processes:
+        self._remove(pid)
+        removed.append(pid)
+      process = self._read_process(pid, stat) if stat is not None else None
+      if process is not None:
+        self._add(process)
+        added.append(pid)
+      return
+
+    _, state, ppid, cpu_time, _, rss = stat
+    process = self._processes[pid]
+    try:
+      uid = os.stat(path).st_uid
+    except OSError:
+      uid = process.uid
+
+    if (process.ppid, process.uid) != (ppid, uid):
+      # Reparented or changed owner, both are indexed
+      user = _user(uid) if uid != process.uid else process.user
+      self._replace(process._replace(
+        ppid=ppid, uid=uid, user=user, state=state, cpu_time=cpu_time, rss=rss
+      ))
+      changed.append(pid)
+    elif (process.state, process.cpu_time, process.rss) != (state, cpu_time, rss):
+      # Not an indexed field, update in place
+      self._processes[pid] = process._replace(state=state, cpu_time=cpu_time, rss=rss)
+      changed.append(pid)
+
+  def _refresh_ports(self, added, changed):
+    listening = _listening(self._root)
+    if listening != self._listening:
+      known = set().union(*self._sockets.values()) if self._sockets else set()
+      if any(inode not in known for inode in listening):
+        fresh = set(added)
+        for pid in self._processes:
+          if pid not in fresh:
+            self._sockets[pid] = _sockets(os.path.join(self._root, str(pid)))
+      self._listening = listening
+      update = list(self._processes)
+    else:
+      update = added
+
+    for pid in update:
+      process = self._processes[pid]
+      ports = self._ports(pid)
+      if ports != process.ports:
+        self._replace(process._replace(ports=ports))
+        if pid not in added and pid not in changed:
+          changed.append(pid)
+
+  # Queries, each proportional to the size of its result
+
+  def by(self, index, key):
+    if index not in self._indexes:
+      raise ValueError(f'Unknown index: {index}')
+    return [self._processes[pid] for pid in self._indexes[index].get(key, ())]
+
+  def keys(self, index):
+    if index not in self._indexes:
+      raise ValueError(f'Unknown index: {index}')
+    return list(self._indexes[index])
+
+  def by_name(self, name):
+    return self.by('name', name)
+
+  def by_user(self, user):
+    if isinstance(user, int):
+      user = _user(user)
+    return self.by('user', user)
+
+  def by_cgroup(self, cgroup):
+    return self.by('cgroup', cgroup)
+
+  def by_service(self, name):
+    if not name.endswith('.service'):
+      name = f'{name}.service'
+    return self.by('service', name)
+
+  def by_port(self, port):
+    return self.by('port', port)
+
+  def children(self, pid):
+    return self.by('ppid', pid)
+
+  def parent(self, pid):
+    process = self._processes.get(pid)
+    return self._processes.get(process.ppid) if process is not None else None
+
+  def ancestors(self, pid):
+    chain = []
+    seen = {pid}
+    process = self.parent(pid)
+    while process is not None and process.pid not in seen:
+      seen.add(process.pid)
+      chain.append(process)
+      process = self.parent(process.pid)
+    return chain
+
+  def subtree(self, pid):
+    # The process and all of its descendants, depth first
+    if pid not in self._processes:
+      return []
+    result = []
+    stack = [pid]
+    seen = set()
+    while stack:
+      current = stack.pop()
+      if current in seen:
+        continue
+      seen.add(current)
+      result.append(self._processes[current])
+      stack.extend(self._indexes['ppid'].get(current, ()))
+    return result
+
+  def listening(self):
+    # {port: [processes]}
+    return {port: self.by('port', port) for port in self._indexes['port']}
+
+  def total(self, field, processes):
+    return sum(getattr(process, field) or 0 for process in processes)
+
+  def aggregate(self, field='rss', by='service'):
+    # {key: sum of field} per index key, e.g. total RSS per service
+    if by not in self._indexes:
+      raise ValueError(f'Unknown index: {by}')
+    return {
+      key: sum(getattr(self._processes[pid], field) or 0 for pid in pids)
+      for key, pids in self._indexes[by].items()
+    }
+
+  def to_records(self, processes=None, fields=None):
+    # ProcessRecord per process, or dicts when 'fields' are given
+    processes = self._processes.values() if processes is None else processes
+    if fields is not None:
+      return [{field: getattr(process, field) for field in fields} for process in processes]
+    return [ProcessRecord._make(_pick(process)) for process in processes]
+
+
+__all__ = ['ProcessTable', 'Process', 'ProcessRecord', 'INDEXES', 'COMM_LENGTH', 'service']
@@ -0,0 +1,70 @@
+# sysmind/core/records.py
+from __future__ import annotations
+
+import sys
+from collections import namedtuple
+
+
+def intern(value):
+  # Repeated short strings (states, fstypes, users, interface names) stored
+  # once however many records hold them
+  return sys.intern(value) if type(value) is str else value
+
+def record(name, fields, module=None):
+  # Named tuple that also reads like the dict it replaces, so record['pid'],
+  # record.get('pid') and 'pid' in record keep working for callers written
+  # against dict sections. Iterating yields values, like any tuple. Pass
+  # module=__name__ so records pickle and the section cache can restore them.
+  base = namedtuple(name, fields)
+  index = {field: position for position, field in enumerate(base._fields)}
+
+  def getitem(self, key):
+    if type(key) is str:
+      try:
+        return tuple.__getitem__(self, index[key])
+      except KeyError:
+        raise KeyError(key) from None
+    return tuple.__getitem__(self, key)
+
+  def contains(self, key):
+    return key in index
+
+  def get(self, key, default=None):
+    position = index.get(key)
+    return default if position is None else tuple.__getitem__(self, position)
+
+  def keys(self):
+    return base._fields
+
+  def values(self):
+    return tuple(self)
+
+  def items(self):
+    return zip(base._fields, self, strict=True)
+
+  namespace = {
+    '__slots__': (),
+    '__getitem__': getitem,
+    '__contains__': contains,
+    'get': get,
+    'keys': keys,
+    'values': values,
+    'items': items,
+  }
+  if module is not None:
+    namespace['__module__'] = module
+  return type(name, (base,), namespace)
+
+def to_dicts(value):
+  # Records (and other named tuples) as dicts, nested ones included, for
+  # JSON and YAML output. json.dumps() would write them as arrays, it never
+  # calls default= for a tuple.
+  if isinstance(value, tuple) and hasattr(value, '_asdict'):
+    return {key: to_dicts(item) for key, item in value._asdict().items()}
+  if isinstance(value, dict):
+    return {key: to_dicts(item) for key, item in value.items()}
+  if isinstance(value, (list, tuple)):
+    return [to_dicts(item) for item in value]
+  return value
+
+__all__ = ['record', 'intern', 'to_dicts']
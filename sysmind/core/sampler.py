@@ -0,0 +1,278 @@
+# sysmind/core/sampler.py
+from __future__ import annotations
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+import psutil
+
+from sysmind.logging import logger
+
+# Host metrics recorded on every sample. Counters (bytes, cpu seconds) are
+# stored raw, use Sampler.rate() to turn them into per-second values.
+METRICS = (
+  'cpu_percent',
+  'memory_used',
+  'memory_percent',
+  'swap_used',
+  'disk_read_bytes',
+  'disk_write_bytes',
+  'net_bytes_sent',
+  'net_bytes_recv',
+)
+
+# Recorded for every pid passed to Sampler(pids=...) as 'process.<pid>.<field>'
+PROCESS_METRICS = ('rss', 'cpu_seconds')
+
+
+def _numpy():
+  # NumPy is optional, queries fall back to plain Python without it
+  try:
+    import numpy
+  except ImportError:
+    return None
+  return numpy
+
+
+class RingBuffer(object):
+  # Fixed size series of floats backed by array('d'), memory use is constant
+  # once the buffer is allocated. Missing samples are stored as NaN.
+  def __init__(self, capacity):
+    self._capacity = capacity
+    self._data = array('d', [math.nan]) * capacity
+    self._next = 0
+    self._count = 0
+
+  def __len__(self):
+    return self._count
+
+  @property
+  def capacity(self):
+    return self._capacity
+
+  def append(self, value):
+    self._data[self._next] = math.nan if value is None else value
+    self._next = (self._next + 1) % self._capacity
+    self._count = min(self._count + 1, self._capacity)
+
+  def values(self, last=None):
+    # Oldest first, optionally only the 'last' most recent values
+    count = self._count if last is None else min(last, self._count)
+    start = (self._next - count) % self._capacity
+
+    if start + count <= self._capacity:
+      return self._data[start:start + count]
+    return self._data[start:] + self._data[:self._next]
+
+  def latest(self):
+    if self._count == 0:
+      return None
+    return self._data[self._next - 1]
+
+
+def _percentile(values, q):
+  # Linear interpolation between closest ranks, same as numpy's default
+  values = sorted(v for v in values if not math.isnan(v))
+  if not values:
+    return None
+  position = (len(values) - 1) * q / 100
+  lower = math.floor(position)
+  upper = math.ceil(position)
+  return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class Sampler(object):
+  def __init__(self, interval=1.0, capacity=3600, pids=None, metrics=METRICS):
+    self._interval = interval
+    self._capacity = capacity
+    self._metrics = tuple(metrics)
+    self._lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread = None
+
+    self._timestamps = RingBuffer(capacity)
+    self._series = {metric: RingBuffer(capacity) for metric in self._metrics}
+
+    self._processes = {}
+    for pid in pids or []:
+      try:
+        self._processes[pid] = psutil.Process(pid)
+      except psutil.Error as e:
+        logger.error(f'Failed to watch process {pid}. Error: {e}')
+        continue
+      for field in PROCESS_METRICS:
+        self._series[f'process.{pid}.{field}'] = RingBuffer(capacity)
+
+    # Prime cpu_percent so the first sample isn't measured since boot
+    psutil.cpu_percent(interval=None)
+
+  def __repr__(self):
+    samples = len(self._timestamps)
+    return f'Sampler(interval={self._interval}, capacity={self._capacity}, samples={samples})'
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, *args):
+    self.stop()
+
+  @property
+  def metrics(self):
+    return list(self._series)
+
+  @property
+  def running(self):
+    return self._thread is not None and self._thread.is_alive()
+
+  def start(self):
+    if self.running:
+      return self
+
+    self._stop.clear()
+    self._thread = threading.Thread(target=self._run, name='sysmind-sampler', daemon=True)
+    self._thread.start()
+    return self
+
+  def stop(self, timeout=None):
+    self._stop.set()
+    if self._thread is not None:
+      self._thread.join(timeout)
+      self._thread = None
+
+  def _run(self):
+    next_sample = time.monotonic()
+    while not self._stop.is_set():
+      try:
+        self.sample()
+      except Exception as e:
+        logger.error(f'Failed to take sample. Error: {e}')
+
+      # Keep a fixed cadence regardless of how long sampling took
+      next_sample += self._interval
+      self._stop.wait(max(0, next_sample - time.monotonic()))
+
+  def _read(self):
+    values = {}
+    wanted = set(self._metrics)
+
+    if 'cpu_percent' in wanted:
+      values['cpu_percent'] = psutil.cpu_percent(interval=None)
+
+    if wanted.intersection(('memory_used', 'memory_percent')):
+      memory = psutil.virtual_memory()
+      values['memory_used'] = memory.used
+      values['memory_percent'] = memory.percent
+
+    if 'swap_used' in wanted:
+      values['swap_used'] = psutil.swap_memory().used
+
+    if wanted.intersection(('disk_read_bytes', 'disk_write_bytes')):
+      disk = psutil.disk_io_counters()
+      values['disk_read_bytes'] = disk.read_bytes if disk is not None else None
+      values['disk_write_bytes'] = disk.write_bytes if disk is not None else None
+
+    if wanted.intersection(('net_bytes_sent', 'net_bytes_recv')):
+      net = psutil.net_io_counters()
+      values['net_bytes_sent'] = net.bytes_sent if net is not None else None
+      values['net_bytes_recv'] = net.bytes_recv if net is not None else None
+
+    for pid, process in self._processes.items():
+      try:
+        with process.oneshot():
+          cpu = process.cpu_times()
+          values[f'process.{pid}.rss'] = process.memory_info().rss
+          values[f'process.{pid}.cpu_seconds'] = cpu.user + cpu.system
+      except psutil.Error:
+        # Gone or inaccessible, recorded as NaN
+        pass
+
+    return values
+
+  def sample(self):
+    values = self._read()
+    timestamp = time.time()
+
+    with self._lock:
+      self._timestamps.append(timestamp)
+      for metric, series in self._series.items():
+        series.append(values.get(metric))
+
+  def _window(self, metric, window=None, last=None):
+    # Copy the requested slice under the lock, (timestamps, values)
+    if metric not in self._series:
+      raise KeyError(metric)
+
+    with self._lock:
+      timestamps = self._timestamps.values(last)
+      values = self._series[metric].values(last)
+
+    if window is not None and timestamps:
+      start = bisect_left(timestamps, timestamps[-1] - window)
+      timestamps, values = timestamps[start:], values[start:]
+
+    return timestamps, values
+
+  def series(self, metric, window=None):
+    timestamps, values = self._window(metric, window)
+    return list(zip(timestamps, values, strict=True))
+
+  def latest(self, metric):
+    with self._lock:
+      return self._series[metric].latest()
+
+  def rate(self, metric, window=None):
+    # Per-second rate between consecutive samples of a counter
+    timestamps, values = self._window(metric, window)
+    numpy = _numpy()
+
+    if numpy is not None:
+      times = numpy.frombuffer(timestamps, dtype=numpy.float64)
+      data = numpy.frombuffer(values, dtype=numpy.float64)
+      return (numpy.diff(data) / numpy.diff(times)).tolist()
+
+    return [
+      (values[i] - values[i - 1]) / (timestamps[i] - timestamps[i - 1])
+      for i in range(1, len(values))
+    ]
+
+  def percentile(self, metric, q, window=None):
+    _, values = self._window(metric, window)
+    numpy = _numpy()
+
+    if numpy is not None:
+      data = numpy.frombuffer(values, dtype=numpy.float64)
+      data = data[~numpy.isnan(data)]
+      return float(numpy.percentile(data, q)) if data.size else None
+
+    return _percentile(values, q)
+
+  def rolling(self, metric, size, func='mean', window=None):
+    # Aggregate ('mean', 'min', 'max', 'sum') over every run of 'size'
+    # consecutive samples
+    if func not in ('mean', 'min', 'max', 'sum'):
+      raise ValueError(f'Unknown aggregation: {func}')
+
+    _, values = self._window(metric, window)
+    if len(values) < size:
+      return []
+
+    numpy = _numpy()
+    if numpy is not None:
+      data = numpy.frombuffer(values, dtype=numpy.float64)
+      windows = numpy.lib.stride_tricks.sliding_window_view(data, size)
+      return getattr(windows, func)(axis=1).tolist()
+
+    aggregate = {
+      'mean': lambda chunk: sum(chunk) / size,
+      'min': min,
+      'max': max,
+      'sum': sum,
+    }[func]
+    return [aggregate(values[i:i + size]) for i in range(len(values) - size + 1)]
+
+
+__all__ = ['Sampler', 'RingBuffer', 'METRICS', 'PROCESS_METRICS']
@@ -0,0 +1,344 @@
+# sysmind/core/snapshot.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+from sysmind.core import stats as _stats
+from sysmind.core.os import DEFAULT_SECTIONS, SECTIONS, OperatingSystem
+from sysmind.core.records import to_dicts
+from sysmind.logging import logger
+
+# Every section a Snapshot can hold, 'sysctl' is read through Sysctl
+SNAPSHOT_SECTIONS = SECTIONS + ('sysctl',)
+
+# What capture() records when no sections are given, opt-in sections such as
+# 'listeners' have to be asked for
+DEFAULT_SNAPSHOT_SECTIONS = DEFAULT_SECTIONS + ('sysctl',)
+
+# Identity of list items when diffing, items of other list sections are
+# compared by value
+DIFF_KEYS = {
+  'processes': lambda item: (item.get('pid'), item.get('name')),
+  'listeners': lambda item: (item.get('port'), item.get('pid')),
+  'services': lambda item: item.get('name'),
+  'ports': lambda item: (item.get('local_ip'), item.get('local_port')),
+  'mounts': lambda item: item.get('mountpoint'),
+  'usb_devices': lambda item: (
+    item.get('idVendor'), item.get('idProduct'), item.get('bus'), item.get('address')
+  ),
+}
+
+SectionDiff = namedtuple('SectionDiff', ['added', 'removed', 'changed'])
+
+
+def _stat(path):
+  try:
+    stat = os.stat(path)
+  except OSError:
+    return None
+  return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _listing(path):
+  try:
+    return tuple(sorted(os.listdir(path)))
+  except OSError:
+    return None
+
+def _digest(path):
+  # mountinfo has no usable mtime, hash the content instead
+  try:
+    with open(path, 'rb') as f:
+      return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+  except OSError:
+    return None
+
+def _boot_id():
+  try:
+    with open('/proc/sys/kernel/random/boot_id', 'r') as f:
+      return f.read().strip()
+  except OSError:
+    return None
+
+# Cheap probes of what each collector reads. refresh() re-runs a section
+# only when its fingerprint changed, sections without a fingerprint (or
+# whose fingerprint can't be read on this system) are always re-run.
+FINGERPRINTS = {
+  'cpu_count': _boot_id,
+  'cpu_frequency': _boot_id,
+  'memory': _boot_id,
+  'swap': lambda: _digest('/proc/swaps'),
+  'mounts': lambda: _digest('/proc/self/mountinfo'),
+  'usb_devices': lambda: _listing('/sys/bus/usb/devices'),
+  'pci_devices': lambda: _listing('/sys/bus/pci/devices'),
+  'hosts': lambda: _stat('/etc/hosts'),
+  'resolver': lambda: _stat('/etc/resolv.conf'),
+  'posix_compliant': _boot_id,
+  'kernel_name': _boot_id,
+  'kernel_version': _boot_id,
+}
+
+def fingerprint(section):
+  probe = FINGERPRINTS.get(section)
+  return probe() if probe is not None else None
+
+def _plain(value):
+  # Reduce collector output (namedtuples, psutil records, objects) to JSON
+  # types so snapshots serialize the same way everywhere
+  if value is None or isinstance(value, (bool, int, float, str)):
+    return value
+  if isinstance(value, bytes):
+    return value.decode(errors='replace')
+  if isinstance(value, dict):
+    return {str(k): _plain(v) for k, v in value.items()}
+  if hasattr(value, '_asdict'):
+    return {k: _plain(v) for k, v in value._asdict().items()}
+  if isinstance(value, (list, tuple, set, frozenset)):
+    return [_plain(v) for v in value]
+  if hasattr(value, '__dict__'):
+    return {k: _plain(v) for k, v in vars(value).items() if not k.startswith('_')}
+
+  return str(value)
+
+def _canonical(item):
+  return json.dumps(item, sort_keys=True)
+
+
+class Snapshot(object):
+  def __init__(self, data=None, taken=None, system=None):
+    self._data = dict(data or {})
+    self._taken = taken
+    self._system = system
+    self._fingerprints = {}
+    self._stats = None
+    self._missing = {}
+
+  @classmethod
+  def capture(cls, sections=None, system=None, stats=True, timeout=None, timeouts=None):
+    # stats=False skips instrumentation, snapshot.stats is then None.
+    # Sections whose collector fails or takes longer than its timeout are
+    # left out and listed in snapshot.missing.
+    snapshot = cls(system=system if system is not None else OperatingSystem())
+    if sections is None:
+      sections = DEFAULT_SNAPSHOT_SECTIONS
+    snapshot._record(sections, stats, timeout, timeouts)
+    return snapshot
+
+  def _record(self, sections, stats=True, timeout=None, timeouts=None):
+    if not stats:
+      self._collect(sections, timeout, timeouts)
+      return
+
+    with _stats.Stats() as recorded:
+      with _stats.span('snapshot', sections=len(sections)):
+        self._collect(sections, timeout, timeouts)
+    self._stats = recorded
+
+  def _collect(self, sections, timeout=None, timeouts=None):
+    unknown = [section for section in sections if section not in SNAPSHOT_SECTIONS]
+    if unknown:
+      logger.error(f'Unknown sections: {", ".join(unknown)}')
+      raise ValueError(f'Unknown sections: {", ".join(unknown)}')
+
+    # Fingerprint first, a change while collecting shows up next refresh
+    for section in sections:
+      self._fingerprints[section] = fingerprint(section)
+
+    # Collected concurrently. Failed and timed out sections are not read
+    # through the properties again, that would re-run them unbounded.
+    os_sections = [section for section in sections if section in SECTIONS]
+    collection = self._system.collect(os_sections, timeout=timeout, timeouts=timeouts)
+    failed = dict.fromkeys(collection.timed_out, 'timed out')
+    failed.update((section, f'failed: {e}') for section, e in collection.errors.items())
+
+    for section in sections:
+      self._missing.pop(section, None)
+      if section in failed:
+        self._data.pop(section, None)
+        self._missing[section] = failed[section]
+        continue
+
+      if section == 'sysctl':
+        from sysmind.core.sysctl import Sysctl
+        value = _stats.call('sysctl', Sysctl(sync=False, log_errors=False).read)
+      else:
+        value = getattr(self._system, section)
+
+      self._data[section] = _plain(value)
+
+    self._taken = time.time()
+
+  def refresh(self):
+    # Re-run only the sections whose inputs changed since the last collect,
+    # returns the sections that were collected again
+    if self._system is None:
+      self._system = OperatingSystem()
+
+    changed = []
+    # Sections missing from the last capture are always tried again
+    for section in [*self._data, *self._missing]:
+      current = fingerprint(section)
+      if current is None or current != self._fingerprints.get(section):
+        changed.append(section)
+
+    self._system.invalidate([section for section in changed if section in SECTIONS])
+    self._record(changed, self._stats is not None)
+
+    return changed
+
+  def __repr__(self):
+    return f'Snapshot(sections={list(self._data)}, taken={self._taken})'
+
+  def __getitem__(self, section):
+    return self._data[section]
+
+  def __contains__(self, section):
+    return section in self._data
+
+  @property
+  def sections(self):
+    return list(self._data)
+
+  @property
+  def taken(self):
+    return self._taken
+
+  @property
+  def missing(self):
+    # {section: reason} for sections the last capture()/refresh() couldn't
+    # collect
+    return self._missing
+
+  @property
+  def stats(self):
+    # Collector spans of the last capture()/refresh(), None for loaded
+    # snapshots
+    return self._stats
+
+  def copy(self):
+    # Detached copy for keeping the previous state around before refresh()
+    return Snapshot.from_dict(self.to_dict())
+
+  def to_dict(self):
+    return {'taken': self._taken, 'sections': json.loads(json.dumps(to_dicts(self._data)))}
+
+  def to_json(self, indent=None):
+    # Sorted keys so identical snapshots serialize identically
+    return json.dumps(self.to_dict(), sort_keys=True, indent=indent)
+
+  def to_columnar(self):
+    from sysmind.core import columnar
+    return columnar.to_columnar(self)
+
+  def dump(self, path, format=None):
+    from sysmind.core import columnar
+    return columnar.dump(self, path, format=format)
+
+  @classmethod
+  def load(cls, path):
+    # Use sysmind.core.columnar.load() to scan columns without rebuilding
+    from sysmind.core import columnar
+    with columnar.load(path) as loaded:
+      return loaded.to_snapshot()
+
+  @classmethod
+  def from_dict(cls, data):
+    return cls(data=data.get('sections'), taken=data.get('taken'))
+
+  @classmethod
+  def from_json(cls, text):
+    return cls.from_dict(json.loads(text))
+
+
+class SnapshotDiff(object):
+  def __init__(self, sections):
+    self._sections = sections
+
+  def __repr__(self):
+    return f'SnapshotDiff(sections={list(self._sections)})'
+
+  def __bool__(self):
+    return bool(self._sections)
+
+  def __getitem__(self, section):
+    return self._sections[section]
+
+  def __contains__(self, section):
+    return section in self._sections
+
+  def __iter__(self):
+    return iter(self._sections.items())
+
+  @property
+  def sections(self):
+    return list(self._sections)
+
+  def to_dict(self):
+    return {section: diff._asdict() for section, diff in self._sections.items()}
+
+
+def _diff_mapping(old, new):
+  added = {k: v for k, v in new.items() if k not in old}
+  removed = {k: v for k, v in old.items() if k not in new}
+  changed = {k: (old[k], v) for k, v in new.items() if k in old and old[k] != v}
+  return SectionDiff(added, removed, changed)
+
+def _diff_items(section, old, new):
+  key = DIFF_KEYS.get(section)
+
+  def index(items):
+    indexed = {}
+    for item in items:
+      if key is not None and isinstance(item, dict):
+        indexed[key(item)] = item
+      else:
+        indexed[_canonical(item)] = item
+    return indexed
+
+  diff = _diff_mapping(index(old), index(new))
+  return SectionDiff(
+    list(diff.added.values()), list(diff.removed.values()), list(diff.changed.values())
+  )
+
+def diff_section(section, old, new):
+  if section == 'ports':
+    # Only listening sockets are stable enough to compare
+    old = (old or {}).get('listening_ports', [])
+    new = (new or {}).get('listening_ports', [])
+
+  if isinstance(old, dict) and isinstance(new, dict):
+    return _diff_mapping(old, new)
+
+  if isinstance(old, list) and isinstance(new, list):
+    return _diff_items(section, old, new)
+
+  if old != new:
+    return SectionDiff(None, None, [(old, new)])
+
+  return SectionDiff(None, None, [])
+
+def diff(old, new):
+  # Compare the sections present in both snapshots
+  sections = {}
+  for section in old.sections:
+    if section not in new:
+      continue
+    result = diff_section(section, old[section], new[section])
+    if result.added or result.removed or result.changed:
+      sections[section] = result
+
+  return SnapshotDiff(sections)
+
+
+__all__ = [
+  'Snapshot',
+  'SnapshotDiff',
+  'SectionDiff',
+  'SNAPSHOT_SECTIONS',
+  'DEFAULT_SNAPSHOT_SECTIONS',
+  'diff',
+  'fingerprint',
+]
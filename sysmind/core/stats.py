@@ -0,0 +1,365 @@
+# sysmind/core/stats.py
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from sysmind.logging import logger
+
+# Functions called with every finished Span, process wide. While no hook
+# is installed no span is created and the call sites cost two checks.
+_hooks = []
+_lock = threading.Lock()
+# Installed hooks, process wide and scoped, the error handler is attached
+# while there are any
+_installed = 0
+
+# Hooks scoped to the current context (Stats), seen by the threads and
+# tasks started from it only, so concurrent captures don't record each
+# other's spans
+_scoped = contextvars.ContextVar('sysmind_hooks', default=())
+
+# Span of the collector running in the current thread or task
+_current = contextvars.ContextVar('sysmind_span', default=None)
+
+
+class Span(object):
+  # Timing of one collector run. forks and errors are filled in while it
+  # runs, by Command and by error records logged to the 'sysmind' logger.
+  __slots__ = (
+    'name',
+    'trace_id',
+    'span_id',
+    'parent_id',
+    'start',
+    'duration',
+    'items',
+    'forks',
+    'errors',
+    'attributes',
+  )
+
+  def __init__(self, name, parent=None, attributes=None):
+    self.name = name
+    self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+    self.span_id = secrets.token_hex(8)
+    self.parent_id = parent.span_id if parent is not None else None
+    self.start = time.time()
+    self.duration = None
+    self.items = None
+    self.forks = 0
+    self.errors = []
+    self.attributes = dict(attributes or {})
+
+  def __repr__(self):
+    return (
+      f'Span(name={self.name}, duration={self.duration}, items={self.items},'
+      f' forks={self.forks}, errors={len(self.errors)})'
+    )
+
+  def to_dict(self):
+    return {
+      'name': self.name,
+      'trace_id': self.trace_id,
+      'span_id': self.span_id,
+      'parent_id': self.parent_id,
+      'start': self.start,
+      'duration': self.duration,
+      'items': self.items,
+      'forks': self.forks,
+      'errors': list(self.errors),
+      'attributes': dict(self.attributes),
+    }
+
+
+class _ErrorHandler(logging.Handler):
+  # Attributes logger.error() calls made inside a collector to its span
+  def __init__(self):
+    super().__init__(level=logging.ERROR)
+
+  def emit(self, record):
+    current = _current.get()
+    if current is not None:
+      current.errors.append(record.getMessage())
+
+_handler = _ErrorHandler()
+
+
+def active():
+  return bool(_hooks) or bool(_scoped.get())
+
+def _install():
+  global _installed
+  if not _installed:
+    logger.addHandler(_handler)
+  _installed += 1
+
+def _uninstall():
+  global _installed
+  _installed -= 1
+  if not _installed:
+    logger.removeHandler(_handler)
+
+def add_hook(hook):
+  # Process wide, every span in every thread reaches the hook. Use
+  # scoped_hook() to only see the current context's spans.
+  with _lock:
+    _hooks.append(hook)
+    _install()
+
+def remove_hook(hook):
+  with _lock:
+    if hook in _hooks:
+      _hooks.remove(hook)
+      _uninstall()
+
+@contextmanager
+def scoped_hook(hook):
+  with _lock:
+    _install()
+  token = _scoped.set(_scoped.get() + (hook,))
+  try:
+    yield hook
+  finally:
+    _scoped.reset(token)
+    with _lock:
+      _uninstall()
+
+def current():
+  return _current.get()
+
+def fork():
+  # Called before spawning a subprocess
+  span = _current.get()
+  if span is not None:
+    span.forks += 1
+
+def error(message):
+  # Errors that are raised rather than logged
+  span = _current.get()
+  if span is not None:
+    span.errors.append(str(message))
+
+def count_items(value):
+  # Records in a collector result: list/dict length, summed over dicts of
+  # lists such as ports
+  if value is None:
+    return 0
+  if hasattr(value, '_fields'):
+    # A single namedtuple record, e.g. psutil.virtual_memory()
+    return 1
+  if isinstance(value, dict):
+    if value and all(isinstance(v, (list, tuple)) for v in value.values()):
+      return sum(len(v) for v in value.values())
+    return len(value)
+  if isinstance(value, (list, tuple, set)):
+    return len(value)
+  return 1
+
+def _finish(span, started):
+  span.duration = time.perf_counter() - started
+  for hook in (*_hooks, *_scoped.get()):
+    try:
+      hook(span)
+    except Exception as e:
+      logger.warning(f'Stats hook {hook} failed. Error: {e}')
+
+@contextmanager
+def span(name, **attributes):
+  if not _hooks and not _scoped.get():
+    yield None
+    return
+
+  current = Span(name, _current.get(), attributes)
+  token = _current.set(current)
+  started = time.perf_counter()
+  try:
+    yield current
+  except Exception as e:
+    current.errors.append(str(e))
+    raise
+  finally:
+    _current.reset(token)
+    _finish(current, started)
+
+def call(name, function, *args, **kwargs):
+  # function(*args, **kwargs) under a span named 'name', a plain call while
+  # no hook is installed
+  if not _hooks and not _scoped.get():
+    return function(*args, **kwargs)
+
+  with span(name) as current:
+    result = function(*args, **kwargs)
+    current.items = count_items(result)
+    return result
+
+
+class Stats(object):
+  # Records the spans finished while it is installed, use as a context
+  # manager: with Stats() as stats: ... Only spans of the entering context
+  # (and the collectors it starts) are recorded.
+  def __init__(self):
+    self._spans = []
+    self._scope = None
+
+  def __repr__(self):
+    return f'Stats(spans={len(self._spans)})'
+
+  def __call__(self, span):
+    self._spans.append(span)
+
+  def __enter__(self):
+    self._scope = scoped_hook(self)
+    self._scope.__enter__()
+    return self
+
+  def __exit__(self, *args):
+    scope, self._scope = self._scope, None
+    scope.__exit__(*args)
+
+  def __iter__(self):
+    return iter(self._spans)
+
+  def __len__(self):
+    return len(self._spans)
+
+  def __getitem__(self, name):
+    # Latest span with that name
+    for span in reversed(self._spans):
+      if span.name == name:
+        return span
+    raise KeyError(name)
+
+  @property
+  def spans(self):
+    return self._spans
+
+  @property
+  def duration(self):
+    return sum(span.duration for span in self._spans if span.parent_id is None)
+
+  @property
+  def forks(self):
+    return sum(span.forks for span in self._spans)
+
+  @property
+  def errors(self):
+    return {span.name: span.errors for span in self._spans if span.errors}
+
+  def slowest(self, count=5):
+    return sorted(self._spans, key=lambda span: span.duration, reverse=True)[:count]
+
+  def to_dict(self):
+    return [span.to_dict() for span in self._spans]
+
+  def to_otel(self, service='sysmind'):
+    # OTLP/JSON layout, accepted by OpenTelemetry collectors' otlphttp
+    # receivers and most tracing backends
+    from socket import gethostname
+
+    def attribute(key, value):
+      if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+      if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+      if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+      return {'key': key, 'value': {'stringValue': str(value)}}
+
+    spans = []
+    for span in self._spans:
+      start = int(span.start * 1e9)
+      attributes = {
+        'sysmind.items': span.items,
+        'sysmind.forks': span.forks,
+        'sysmind.errors': len(span.errors),
+      }
+      attributes.update(span.attributes)
+      spans.append({
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'parentSpanId': span.parent_id or '',
+        'name': span.name,
+        'kind': 1,
+        'startTimeUnixNano': str(start),
+        'endTimeUnixNano': str(start + int((span.duration or 0) * 1e9)),
+        'attributes': [
+          attribute(key, value) for key, value in attributes.items() if value is not None
+        ],
+        'events': [
+          {'name': 'error', 'attributes': [attribute('message', message)]}
+          for message in span.errors
+        ],
+        'status': {'code': 2, 'message': span.errors[-1]} if span.errors else {'code': 1},
+      })
+
+    return {
+      'resourceSpans': [{
+        'resource': {'attributes': [
+          attribute('service.name', service),
+          attribute('host.name', gethostname()),
+        ]},
+        'scopeSpans': [{'scope': {'name': 'sysmind'}, 'spans': spans}],
+      }],
+    }
+
+  def to_prometheus(self, prefix='sysmind_collector'):
+    # Text exposition format, latest span per collector
+    latest = {}
+    for span in self._spans:
+      latest[span.name] = span
+
+    metrics = (
+      ('duration_seconds', 'Time spent in the collector.', lambda span: span.duration),
+      ('items', 'Records returned by the collector.', lambda span: span.items),
+      ('forks', 'Subprocesses started by the collector.', lambda span: span.forks),
+      ('errors', 'Errors raised or logged by the collector.', lambda span: len(span.errors)),
+    )
+
+    lines = []
+    for suffix, help, value in metrics:
+      lines.append(f'# HELP {prefix}_{suffix} {help}')
+      lines.append(f'# TYPE {prefix}_{suffix} gauge')
+      for name, span in sorted(latest.items()):
+        if value(span) is not None:
+          label = name.replace('\\', '\\\\').replace('"', '\\"')
+          lines.append(f'{prefix}_{suffix}{{collector="{label}"}} {value(span)}')
+
+    return '\n'.join(lines) + '\n'
+
+  def write_prometheus(self, path, prefix='sysmind_collector'):
+    # Atomic so node_exporter's textfile collector never reads half a file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.sysmind-', suffix='.prom', dir=directory)
+    try:
+      with os.fdopen(fd, 'w') as f:
+        f.write(self.to_prometheus(prefix))
+      # mkstemp creates 0600, node_exporter usually runs as another user
+      os.chmod(temp_path, 0o644)
+      os.replace(temp_path, path)
+    except BaseException:
+      if os.path.exists(temp_path):
+        os.unlink(temp_path)
+      raise
+
+
+__all__ = [
+  'Span',
+  'Stats',
+  'active',
+  'add_hook',
+  'remove_hook',
+  'scoped_hook',
+  'current',
+  'span',
+  'call',
+  'fork',
+  'error',
+  'count_items',
+]
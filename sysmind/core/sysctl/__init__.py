@@ -1,153 +1,475 @@
 from __future__ import annotations
 
-import subprocess
+import glob
+import itertools
 import os
 import time
+from contextlib import contextmanager
 
+from sysmind.core.sysctl import procfs
+from sysmind.core.sysctl.table import SysctlTable
 from sysmind.logging import logger
 
+SYSCTL_CONF = '/etc/sysctl.conf'
+SYSCTL_D = '/etc/sysctl.d'
+
+
+class SysctlError(Exception):
+  pass
+
+
+def _config_key(line):
+  # Returns the key of a 'key = value' line, None for comments and blanks.
+  # A leading '-' tells systemd-sysctl to ignore failures for that key.
+  line = line.strip()
+  if not line or line[0] in '#;' or '=' not in line:
+    return None
+
+  key = line.split('=', 1)[0].strip().lstrip('-')
+  try:
+    return procfs.normalize(key)
+  except ValueError:
+    return key
+
+def render_config(text, changes):
+  # Rewrite only the lines for changed keys, keeping comments, ordering and
+  # unrelated keys. Keys not present yet are appended.
+  lines = text.splitlines() if text else []
+  seen = set()
+
+  for index, line in enumerate(lines):
+    key = _config_key(line)
+    if key in changes:
+      ignore = '-' if line.strip().startswith('-') else ''
+      lines[index] = f'{ignore}{key} = {changes[key]}'
+      seen.add(key)
+
+  for key, value in changes.items():
+    if key not in seen:
+      lines.append(f'{key} = {value}')
+
+  return '\n'.join(lines) + '\n'
+
+def _write_atomic(file_path, text):
+  import shutil
+  import tempfile
+
+  directory = os.path.dirname(file_path) or '.'
+  fd, temp_path = tempfile.mkstemp(prefix='.sysctl.', dir=directory)
+  try:
+    with os.fdopen(fd, 'w') as f:
+      f.write(text)
+      f.flush()
+      os.fsync(f.fileno())
+    if os.path.exists(file_path):
+      shutil.copymode(file_path, temp_path)
+    os.replace(temp_path, file_path)
+  except BaseException:
+    if os.path.exists(temp_path):
+      os.unlink(temp_path)
+    raise
+
 
 class Sysctl(object):
-  def __init__(self, sync=True, log_errors=True, backup_config=True):
+  def __init__(
+    self,
+    sync=True,
+    log_errors=True,
+    backup_config=True,
+    proc_sys=procfs.PROC_SYS,
+    config=SYSCTL_CONF,
+    config_dir=SYSCTL_D,
+    load=True,
+  ):
+    # Internal state is written to __dict__ directly, __setattr__ is reserved
+    # for sysctl keys. Key values live in a SysctlTable of their own.
     if os.path.exists('/sbin/sysctl'):
-      self._sysctl = '/sbin/sysctl'
+      self.__dict__['_sysctl'] = '/sbin/sysctl'
     else:
-      self._sysctl = 'sysctl'
-      
-    self._log_errors = log_errors
-    self._sync = sync
-    self._backup_config = backup_config
-    
+      self.__dict__['_sysctl'] = 'sysctl'
+
+    self.__dict__['_log_errors'] = log_errors
+    self.__dict__['_sync'] = sync
+    self.__dict__['_backup_config'] = backup_config
+    self.__dict__['_proc_sys'] = proc_sys
+    self.__dict__['_config'] = config
+    self.__dict__['_config_dir'] = config_dir
+    self.__dict__['_table'] = SysctlTable()
+
+    # Values assigned inside transaction() and, with sync=False, since the
+    # last sync(). The original value of every touched key is kept for
+    # rollback and to skip writes that don't change anything.
+    self.__dict__['_pending'] = None
+    self.__dict__['_previous'] = {}
+    self.__dict__['_dirty'] = {}
+
+    # Read and write /proc/sys directly when it is mounted, keys are loaded on
+    # first access. Otherwise fall back to parsing 'sysctl -a' once, load=False
+    # leaves that to aload()/aread().
+    self.__dict__['_procfs'] = procfs.available(proc_sys)
+
+    if self._procfs is False and load is True:
+      self._load_all()
+
+  @classmethod
+  async def aload(cls, prefix='', timeout=None, **kwargs):
+    # Async constructor: sysctl = await Sysctl.aload('net.ipv4')
+    sysctl = cls(load=False, **kwargs)
+    await sysctl.aread(prefix, timeout=timeout)
+    return sysctl
+
+  def _load_all(self):
+    # stats and subprocess are only needed without procfs, 'sysctl get'
+    # starts faster without them
+    import subprocess
+
+    from sysmind.core import stats
+
     sysctl_status = False
+    output = None
     try:
+      stats.fork()
       output = subprocess.check_output([self._sysctl, '-a'], text=True)
       sysctl_status = True
     except Exception as e:
-      if log_errors is True:
+      if self._log_errors is True:
         logger.error(f'Failed to get sysctl values. Error: {e}')
-    
+
     if sysctl_status is True and output is not None:
-      for line in output.splitlines():
-        data = line.split('=')
-        name = data[0].strip()
-        value = data[1].strip()
-        self.__dict__[name] = value
-        
-      
+      self._parse_all(output)
+
+  async def _aload_all(self):
+    import asyncio
+
+    from sysmind.core import stats
+
+    stats.fork()
+    try:
+      process = await asyncio.create_subprocess_exec(
+        self._sysctl,
+        '-a',
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+      )
+    except Exception as e:
+      if self._log_errors is True:
+        logger.error(f'Failed to get sysctl values. Error: {e}')
+      return
+
+    try:
+      stdout, _ = await process.communicate()
+    except asyncio.CancelledError:
+      if process.returncode is None:
+        process.kill()
+        await process.wait()
+      raise
+
+    if process.returncode != 0:
+      if self._log_errors is True:
+        error = f'{self._sysctl} exited with status {process.returncode}'
+        logger.error(f'Failed to get sysctl values. Error: {error}')
+      return
+
+    self._parse_all(stdout.decode(errors='replace'))
+
+  def _parse_all(self, output):
+    values = []
+    for line in output.splitlines():
+      data = line.split('=', 1)
+      if len(data) != 2:
+        continue
+      values.append((data[0].strip(), data[1].strip()))
+    self._table.update(values)
+
+  def _keys(self):
+    return list(self._table)
+
+  def _load(self, name):
+    if name.startswith('_'):
+      raise KeyError(name)
+
+    if name in self._table:
+      return self._table[name]
+
+    if self._procfs is True:
+      try:
+        value = procfs.read(name, self._proc_sys)
+      except (OSError, ValueError):
+        raise KeyError(name) from None
+      self._table[name] = value
+      return value
+
+    raise KeyError(name)
+
+  def _exists(self, name):
+    if name.startswith('_'):
+      return False
+
+    if name in self._table:
+      return True
+
+    return self._procfs is True and procfs.exists(name, self._proc_sys)
+
   def __repr__(self):
     return self._sysctl
-  
+
   def __str__(self):
     # Dispaly 'sysctl -a' variables
+    if self._procfs is True:
+      self.read()
+
     string = []
-    for name, value in self.__dict__.items():
-      string.append(f'{name} = {value}')
-    
+    for name in sorted(self._keys()):
+      string.append(f'{name} = {self._table[name]}')
+
     return '\n'.join(string)
-  
+
+  def __contains__(self, name):
+    return self._exists(name)
+
+  @property
+  def table(self):
+    # Every key read so far, as a SysctlTable
+    return self._table
+
+  def read(self, prefix=''):
+    # Bulk read every key below a prefix, e.g. 'net.ipv4.*'
+    prefix = prefix.rstrip('*').rstrip('.')
+
+    if self._procfs is True:
+      values = dict(procfs.walk(prefix, self._proc_sys))
+      self._table.update(values)
+      return values
+
+    return self._table.prefix(prefix)
+
+  async def aread(self, prefix='', timeout=None):
+    # read() without blocking the loop: /proc/sys is walked on a worker
+    # thread, 'sysctl -a' runs as an asyncio subprocess (killed on timeout
+    # or cancellation). asyncio is imported on use, it would add ~45 ms to
+    # 'sysmind sysctl get'
+    import asyncio
+
+    if self._procfs is True:
+      return await asyncio.wait_for(asyncio.to_thread(self.read, prefix), timeout)
+
+    if not self._keys():
+      await asyncio.wait_for(self._aload_all(), timeout)
+    return self.read(prefix)
+
+  async def aget(self, name, timeout=None):
+    # self[name] without blocking the loop, KeyError for unknown keys
+    import asyncio
+
+    if self._procfs is True:
+      return await asyncio.wait_for(asyncio.to_thread(self._load, name), timeout)
+
+    if not self._keys():
+      await asyncio.wait_for(self._aload_all(), timeout)
+    return self._load(name)
+
   def __getitem__(self, name):
-    return self.__dict__[name]
-  
+    return self._load(name)
+
+  def _current(self, name):
+    try:
+      return self._load(name)
+    except KeyError:
+      return None
+
   def __setitem__(self, name, value):
-    self.__dict__[name] = value
-    
-    if self._sync is True:
-      if os.path.isfile('/etc/sysctl.conf') and self._backup_config is True:
-        # Copy file /etc/sysctl.conf.<timestamp>
-        try:
-          os.system(f'cp /etc/sysctl.conf /etc/sysctl.conf.{int(time.time())}.bkp')
-        except Exception as e:
-          if self._log_errors is True:
-            logger.error(f'Failed to copy file /etc/sysctl.conf. Error: {e}')
-      
-      # Write sysctl.conf
+    if name.startswith('_'):
+      raise KeyError(name)
+
+    if self._pending is not None:
+      if name not in self._previous:
+        self._previous[name] = self._current(name)
+      self._pending[name] = value
+      self._table[name] = value
+
+    elif self._sync is True:
       try:
-        with open('/etc/sysctl.conf', 'w') as f:
-          sysctl_conf = []
-          
-          for name, value in self.__dict__.items():
-            sysctl_conf.append(f'{name} = {value}')
-          
-          f.write('\n'.join(sysctl_conf))
-          
-          result = subprocess.run([self._sysctl, '-w', f'{name}={value}'], capture_output=True)
-          if result.returncode != 0:
-            if self._log_errors is True:
-              logger.error(f"Error setting sysctl value: {result.stderr}")
-      except Exception as e:
+        with self.transaction():
+          self[name] = value
+      except SysctlError as e:
         if self._log_errors is True:
-          logger.error(f'Failed to write sysctl.conf. Error: {e}')
-          
-    
-  
-    
-  def __getattr__(self, name):
-    if name in self.__dict__:
-      return self.__dict__[name]
+          logger.error(f'Failed to set sysctl value {name}. Error: {e}')
+
     else:
-      raise AttributeError(name)
-    
-  def __setattr__(self, name, value):
-    if name in self.__dict__:
-      self.__dict__[name] = value
-    
-    
-      if self._sync is True:
-        if os.path.isfile('/etc/sysctl.conf') and self._backup_config is True:
-          # Copy file /etc/sysctl.conf.<timestamp>
-          try:
-            os.system(f'cp /etc/sysctl.conf /etc/sysctl.conf.{int(time.time())}.bkp')
-          except Exception as e:
-            if self._log_errors is True:
-              logger.error(f'Failed to copy file /etc/sysctl.conf. Error: {e}')
-
-        # Write sysctl.conf
+      if name not in self._previous:
+        self._previous[name] = self._current(name)
+      self._dirty[name] = value
+      self._table[name] = value
+
+  @contextmanager
+  def transaction(self):
+    # Batch assignments: one backup, one atomic config write and one apply
+    # for every changed key. Nested transactions join the outer one.
+    if self._pending is not None:
+      yield self
+      return
+
+    self.__dict__['_pending'] = {}
+    self.__dict__['_previous'] = {}
+    try:
+      yield self
+      changes, previous = self._pending, self._previous
+    except BaseException:
+      self._restore(self._previous)
+      raise
+    finally:
+      self.__dict__['_pending'] = None
+      self.__dict__['_previous'] = {}
+
+    self._commit(changes, previous)
+
+  def _restore(self, previous):
+    for name, value in previous.items():
+      if value is None:
+        self._table.pop(name, None)
+      else:
+        self._table[name] = value
+
+  def _commit(self, changes, previous, apply=True):
+    changed = {
+      name: value for name, value in changes.items()
+      if previous.get(name) is None or str(previous[name]) != str(value)
+    }
+    if not changed:
+      return changed
+
+    try:
+      original = None
+      if os.path.isfile(self._config):
+        with open(self._config, 'r') as f:
+          original = f.read()
+
+      self._backup()
+      _write_atomic(self._config, render_config(original, changed))
+    except Exception as e:
+      if apply is True:
+        self._restore(previous)
+      raise SysctlError(f'Failed to write {self._config}. Error: {e}') from e
+
+    self._check_drop_ins(changed)
+
+    if apply is True:
+      try:
+        self._apply(changed, previous)
+      except SysctlError:
+        # Put the config file and in-memory values back as they were
+        self._restore(previous)
         try:
-          with open('/etc/sysctl.conf', 'w') as f:
-            sysctl_conf = []
-            
-            for name, value in self.__dict__.items():
-              sysctl_conf.append(f'{name} = {value}')
-            
-            f.write('\n'.join(sysctl_conf))
-            
-            result = subprocess.run([self._sysctl, '-w', f'{name}={value}'], capture_output=True)
-            if result.returncode != 0 and self._log_errors is True:
-              logger.error(f"Error setting sysctl value: {result.stderr}")
+          if original is None:
+            os.unlink(self._config)
+          else:
+            _write_atomic(self._config, original)
         except Exception as e:
           if self._log_errors is True:
-            logger.error(f'Failed to write sysctl.conf. Error: {e}')
+            logger.error(f'Failed to restore {self._config}. Error: {e}')
+        raise
+
+    return changed
+
+  def _check_drop_ins(self, changed):
+    # Drop-in files are never rewritten, but a drop-in setting the same key
+    # may override sysctl.conf at boot
+    for file_path in sorted(glob.glob(os.path.join(self._config_dir, '*.conf'))):
+      if os.path.realpath(file_path) == os.path.realpath(self._config):
+        continue
+      try:
+        with open(file_path, 'r') as f:
+          keys = {_config_key(line) for line in f}
+      except OSError:
+        continue
+      for name in keys.intersection(changed):
+        logger.warning(f'{name} is also set in {file_path}, which may override {self._config}.')
+
+  def __getattr__(self, name):
+    # Only called when normal lookup fails
+    try:
+      return self._load(name)
+    except KeyError:
+      raise AttributeError(name) from None
+
+  def __setattr__(self, name, value):
+    if self._exists(name):
+      self[name] = value
     else:
       if self._log_errors is True:
         logger.error(f"Sysctl object has no attribute: {name}")
       raise AttributeError(name)
-    
+
+  def _backup(self):
+    # Copy the config to /etc/sysctl.conf.<timestamp>.bkp, or
+    # .<timestamp>.<n>.bkp when that exists. Existing backups are never
+    # overwritten, with sync=True every assignment commits on its own.
+    if not os.path.isfile(self._config) or self._backup_config is not True:
+      return None
+
+    stamp = int(time.time())
+    for attempt in itertools.count():
+      suffix = f'{stamp}.bkp' if attempt == 0 else f'{stamp}.{attempt}.bkp'
+      backup = f'{self._config}.{suffix}'
+      try:
+        fd = os.open(backup, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+      except FileExistsError:
+        continue
+      break
+
+    import shutil
+
+    with os.fdopen(fd, 'wb') as dst, open(self._config, 'rb') as src:
+      shutil.copyfileobj(src, dst)
+    shutil.copystat(self._config, backup)
+    return backup
+
+  def _apply(self, changes, previous):
+    if self._procfs is True:
+      applied = {}
+      for name, value in changes.items():
+        try:
+          current = procfs.read(name, self._proc_sys)
+          procfs.write(name, value, self._proc_sys)
+          applied[name] = current
+        except Exception as e:
+          # Roll back the keys already written
+          for applied_name, applied_value in applied.items():
+            try:
+              procfs.write(applied_name, applied_value, self._proc_sys)
+            except Exception:
+              pass
+          raise SysctlError(f'Error setting sysctl value {name}. Error: {e}') from e
+      return
+
+    import subprocess
+
+    from sysmind.core import stats
+
+    # One fork for every changed key
+    args = [f'{name}={value}' for name, value in changes.items()]
+    stats.fork()
+    result = subprocess.run([self._sysctl, '-w', *args], capture_output=True, text=True)
+    if result.returncode != 0:
+      # sysctl applies what it can, put the previous values back
+      restore = [f'{name}={previous[name]}' for name in changes if previous.get(name) is not None]
+      if restore:
+        stats.fork()
+        subprocess.run([self._sysctl, '-w', *restore], capture_output=True)
+      raise SysctlError(f'Error setting sysctl values: {result.stderr.strip()}')
+
   def sync(self):
     if self._sync is True:
-      logger.error(f'Sync function is does not need to be called directly when using in Sysctl(sync=True)')
-      
+      logger.error(
+        'Sync function is does not need to be called directly when using in Sysctl(sync=True)'
+      )
+
     else:
-      if os.path.isfile('/etc/sysctl.conf') and self._backup_config is True:
-        # Copy file /etc/sysctl.conf.<timestamp>
-        try:
-          os.system(f'cp /etc/sysctl.conf /etc/sysctl.conf.{int(time.time())}.bkp')
-        except Exception as e:
-          if self._log_errors is True:
-            logger.error(f'Failed to copy file /etc/sysctl.conf. Error: {e}')
-      
-      # Write sysctl.conf
       try:
-        with open('/etc/sysctl.conf', 'w') as f:
-          sysctl_conf = []
-          
-          for name, value in self.__dict__.items():
-            sysctl_conf.append(f'{name} = {value}')
-          
-          f.write('\n'.join(sysctl_conf))
-      except Exception as e:
+        self._commit(self._dirty, self._previous, apply=False)
+      except SysctlError as e:
         if self._log_errors is True:
-          logger.error(f'Failed to write sysctl.conf. Error: {e}')
-          
-    
-  
-  
\ No newline at end of file
+          logger.error(e)
+        return
+      self.__dict__['_dirty'] = {}
+      self.__dict__['_previous'] = {}
@@ -0,0 +1,90 @@
+# sysmind/core/sysctl/procfs.py
+from __future__ import annotations
+
+import os
+
+PROC_SYS = '/proc/sys'
+
+
+def available(root=PROC_SYS):
+  return os.path.isdir(root)
+
+def components(name):
+  # Path components of a key, as sysctl(8) and sysctl.d(5) read them: the
+  # first separator decides. 'net.ipv4.conf.eth0/100.forwarding' and
+  # 'net/ipv4/conf/eth0.100/forwarding' both name the eth0.100 directory.
+  slash, dot = name.find('/'), name.find('.')
+  if slash != -1 and (dot == -1 or slash < dot):
+    parts = name.split('/')
+  else:
+    parts = [part.replace('/', '.') for part in name.split('.')]
+
+  # Nothing may point outside /proc/sys
+  if any(part in ('', '.', '..') or os.sep in part for part in parts):
+    raise ValueError(f'Invalid sysctl key: {name}')
+  return parts
+
+def normalize(name):
+  # The dotted form 'sysctl -a' prints, dots inside a component become '/'
+  return '.'.join(part.replace('.', '/') for part in components(name))
+
+def path(name, root=PROC_SYS):
+  # 'net.ipv4.ip_forward' -> '/proc/sys/net/ipv4/ip_forward'
+  return os.path.join(root, *components(name))
+
+def name(file_path, root=PROC_SYS):
+  return '.'.join(part.replace('.', '/') for part in os.path.relpath(file_path, root).split(os.sep))
+
+def exists(key, root=PROC_SYS):
+  try:
+    return os.path.isfile(path(key, root))
+  except ValueError:
+    return False
+
+def read(key, root=PROC_SYS):
+  with open(path(key, root), 'r') as f:
+    # Multi-value keys (tcp_rmem, ip_local_port_range) are tab separated
+    return f.read().strip()
+
+def write(key, value, root=PROC_SYS):
+  with open(path(key, root), 'w') as f:
+    f.write(str(value))
+
+def walk(prefix='', root=PROC_SYS):
+  # Accepts 'net.ipv4', 'net.ipv4.*' or a single key, yields (name, value)
+  # for every readable key below it. Write-only entries such as
+  # vm.compact_memory and keys hidden by permissions are skipped.
+  prefix = prefix.rstrip('*').rstrip('.')
+  top = path(prefix, root) if prefix else root
+
+  if os.path.isfile(top):
+    try:
+      yield normalize(prefix), read(prefix, root)
+    except OSError:
+      pass
+    return
+
+  for directory, dirnames, filenames in os.walk(top):
+    dirnames.sort()
+    for filename in sorted(filenames):
+      file_path = os.path.join(directory, filename)
+      try:
+        with open(file_path, 'r') as f:
+          value = f.read().strip()
+      except OSError:
+        continue
+      yield name(file_path, root), value
+
+
+__all__ = [
+  'PROC_SYS',
+  'available',
+  'components',
+  'normalize',
+  'path',
+  'name',
+  'exists',
+  'read',
+  'write',
+  'walk',
+]
@@ -0,0 +1,62 @@
+# sysmind/core/sysctl/table.py
+from __future__ import annotations
+
+from collections.abc import MutableMapping
+
+from sysmind.core.records import intern
+
+
+class SysctlTable(MutableMapping):
+  # Key -> value store behind Sysctl, kept apart from the object's own
+  # state. Values are interned, a live /proc/sys has a thousand or more
+  # keys but only a hundred or so distinct values ('0', '1', '60', ...).
+  __slots__ = ('_values',)
+
+  def __init__(self, values=None):
+    self._values = {}
+    if values:
+      self.update(values)
+
+  def __repr__(self):
+    return f'SysctlTable(keys={len(self._values)})'
+
+  def __getitem__(self, name):
+    return self._values[name]
+
+  def __setitem__(self, name, value):
+    self._values[name] = intern(value)
+
+  def __delitem__(self, name):
+    del self._values[name]
+
+  def __iter__(self):
+    return iter(self._values)
+
+  def __len__(self):
+    return len(self._values)
+
+  def __contains__(self, name):
+    return name in self._values
+
+  def update(self, values=(), **kwargs):
+    # Bulk path for read() and 'sysctl -a', skips MutableMapping's per-key
+    # __setitem__ dispatch
+    if hasattr(values, 'items'):
+      values = values.items()
+    self._values.update((name, intern(value)) for name, value in values)
+    if kwargs:
+      self.update(kwargs)
+
+  def prefix(self, prefix=''):
+    # {key: value} for the prefix itself and every key below it
+    prefix = prefix.rstrip('*').rstrip('.')
+    if not prefix:
+      return dict(self._values)
+    below = f'{prefix}.'
+    return {
+      name: value for name, value in self._values.items()
+      if name == prefix or name.startswith(below)
+    }
+
+
+__all__ = ['SysctlTable']
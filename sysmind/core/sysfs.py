@@ -0,0 +1,120 @@
+# sysmind/core/sysfs.py
+from __future__ import annotations
+
+import os
+
+SYS = '/sys'
+
+
+def available(root=SYS):
+  return os.path.isdir(os.path.join(root, 'class'))
+
+def read_attribute(path, default=None):
+  # Some attributes fail to read rather than being absent, e.g. 'speed' on a
+  # link that is down returns EINVAL
+  try:
+    with open(path, 'r') as f:
+      return f.read().strip()
+  except (OSError, ValueError):
+    return default
+
+def read_attributes(path, names):
+  # Batch read small attribute files with raw os.read calls, skipping the
+  # buffered text wrapper open() builds for every file
+  values = {}
+  for name in names:
+    try:
+      fd = os.open(os.path.join(path, name), os.O_RDONLY)
+    except OSError:
+      values[name] = None
+      continue
+    try:
+      values[name] = os.read(fd, 4096).decode('utf-8', errors='replace').strip()
+    except OSError:
+      values[name] = None
+    finally:
+      os.close(fd)
+
+  return values
+
+def read_int(path, default=None, base=10):
+  value = read_attribute(path)
+  if value is None:
+    return default
+
+  try:
+    return int(value, base)
+  except ValueError:
+    return default
+
+def net_interfaces(root=SYS):
+  try:
+    return sorted(os.listdir(os.path.join(root, 'class', 'net')))
+  except OSError:
+    return []
+
+def net_interface(name, root=SYS):
+  path = os.path.join(root, 'class', 'net', name)
+  speed = read_int(os.path.join(path, 'speed'))
+
+  return {
+    'address': read_attribute(os.path.join(path, 'address')),
+    'mtu': read_int(os.path.join(path, 'mtu')),
+    'state': read_attribute(os.path.join(path, 'operstate')),
+    # Virtual links report -1
+    'speed': speed if speed is not None and speed >= 0 else None,
+  }
+
+PCI_ATTRIBUTES = ('vendor', 'device', 'class', 'subsystem_vendor', 'subsystem_device')
+
+def _hex_id(value):
+  # '0x8086' -> '8086', class '0x030000' -> '030000'
+  if value is None:
+    return None
+  return value[2:] if value.startswith('0x') else value
+
+def pci_devices(root=SYS):
+  # Yields (slot, attributes) for every device under /sys/bus/pci/devices
+  base = os.path.join(root, 'bus', 'pci', 'devices')
+  try:
+    slots = sorted(os.listdir(base))
+  except OSError:
+    return
+
+  for slot in slots:
+    attributes = read_attributes(os.path.join(base, slot), PCI_ATTRIBUTES)
+    yield slot, {name: _hex_id(value) for name, value in attributes.items()}
+
+USB_ATTRIBUTES = ('idVendor', 'idProduct', 'manufacturer', 'product', 'serial', 'busnum', 'devnum')
+
+def usb_devices(root=SYS):
+  # Yields (name, attributes) for every device under /sys/bus/usb/devices.
+  # String descriptors are the kernel's cached copies, nothing is sent to
+  # the device.
+  base = os.path.join(root, 'bus', 'usb', 'devices')
+  try:
+    names = sorted(os.listdir(base))
+  except OSError:
+    return
+
+  for name in names:
+    # Interfaces ('1-1:1.0') share the directory with devices
+    if ':' in name:
+      continue
+    attributes = read_attributes(os.path.join(base, name), USB_ATTRIBUTES)
+    if attributes['idVendor'] is None:
+      continue
+    yield name, attributes
+
+
+__all__ = [
+  'SYS',
+  'available',
+  'read_attribute',
+  'read_attributes',
+  'read_int',
+  'net_interfaces',
+  'net_interface',
+  'pci_devices',
+  'usb_devices',
+]
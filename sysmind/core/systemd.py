@@ -0,0 +1,530 @@
+# sysmind/core/systemd.py
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import os
+import subprocess
+import time
+from collections import namedtuple
+from functools import partial
+
+from sysmind.core import stats
+from sysmind.core.records import intern, record
+from sysmind.logging import logger
+
+SYSTEMD_BUS_NAME = 'org.freedesktop.systemd1'
+SYSTEMD_PATH = '/org/freedesktop/systemd1'
+MANAGER_INTERFACE = 'org.freedesktop.systemd1.Manager'
+UNIT_INTERFACE = 'org.freedesktop.systemd1.Unit'
+
+# Unit search path in priority order, the first file found for a name wins
+UNIT_PATHS = (
+  '/etc/systemd/system',
+  '/run/systemd/system',
+  '/usr/local/lib/systemd/system',
+  '/usr/lib/systemd/system',
+  '/lib/systemd/system',
+)
+
+# systemd keeps a marker per started unit here
+RUN_UNITS = '/run/systemd/units'
+
+# [Install] keys that make a unit enableable
+INSTALL_KEYS = ('WantedBy', 'RequiredBy', 'UpheldBy', 'Alias', 'Also')
+
+# Exists while systemd is the running init, sd_booted(3)
+RUNTIME = '/run/systemd/system'
+
+Unit = namedtuple('Unit', ['name', 'description', 'load', 'active', 'sub', 'enabled'])
+UnitChange = namedtuple('UnitChange', ['name', 'active', 'sub', 'previous_active', 'previous_sub'])
+
+# One entry of the 'services' section on every platform, fields a platform
+# doesn't report are None. 'status' is the sub state on Linux.
+Service = record('Service', [
+  'name',
+  'description',
+  'load',
+  'active',
+  'sub',
+  'enabled',
+  'status',
+], module=__name__)
+
+
+def _jeepney():
+  # jeepney is optional, without it (or without a system bus) units are read
+  # from the unit files
+  try:
+    import jeepney
+    from jeepney.io.blocking import open_dbus_connection
+  except ImportError:
+    return None, None
+  return jeepney, open_dbus_connection
+
+def _matches(name, patterns):
+  return patterns is None or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+def _filter_units(units, states, patterns):
+  # ListUnits fallback for systemd < 230, which can't filter itself
+  return [
+    unit for unit in units
+    if _matches(unit[0], patterns) and (not states or {unit[2], unit[3], unit[4]} & set(states))
+  ]
+
+def _file_states(files, patterns):
+  states = {}
+  for path, state in files:
+    name = os.path.basename(path)
+    if _matches(name, patterns):
+      states[name] = state
+  return states
+
+def _record(unit):
+  # Services keep the 'status' key (the sub state, 'running', 'exited', ...)
+  # that audits and older callers use
+  return Service(
+    unit.name,
+    unit.description,
+    intern(unit.load),
+    intern(unit.active),
+    intern(unit.sub),
+    intern(unit.enabled),
+    intern(unit.sub),
+  )
+
+
+class Bus(object):
+  # One connection to systemd on the system bus
+  def __init__(self, timeout=5.0):
+    jeepney, open_dbus_connection = _jeepney()
+    if jeepney is None:
+      raise OSError('jeepney is not installed')
+
+    self._jeepney = jeepney
+    self._timeout = timeout
+    self._connection = open_dbus_connection(bus='SYSTEM')
+    self._manager = jeepney.DBusAddress(
+      SYSTEMD_PATH, bus_name=SYSTEMD_BUS_NAME, interface=MANAGER_INTERFACE
+    )
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def close(self):
+    self._connection.close()
+
+  def call(self, method, signature=None, body=()):
+    message = self._jeepney.new_method_call(self._manager, method, signature, body)
+    reply = self._connection.send_and_get_reply(message, timeout=self._timeout)
+    return self._jeepney.wrappers.unwrap_msg(reply)
+
+  def list_units(self, states=None, patterns=None):
+    # (name, description, load, active, sub, following, path, job id, job
+    # type, job path) tuples, filtered by systemd
+    try:
+      units, = self.call('ListUnitsByPatterns', 'asas', (list(states or []), list(patterns or [])))
+    except self._jeepney.DBusErrorResponse:
+      # systemd < 230
+      units, = self.call('ListUnits')
+      units = _filter_units(units, states, patterns)
+    return units
+
+  def list_unit_files(self, patterns=None):
+    # {name: state}, state is 'enabled', 'disabled', 'static', 'masked', ...
+    try:
+      files, = self.call('ListUnitFilesByPatterns', 'asas', ([], list(patterns or [])))
+    except self._jeepney.DBusErrorResponse:
+      files, = self.call('ListUnitFiles')
+    return _file_states(files, patterns)
+
+  def unit_name(self, path):
+    unit = self._jeepney.DBusAddress(
+      path, bus_name=SYSTEMD_BUS_NAME, interface='org.freedesktop.DBus.Properties'
+    )
+    message = self._jeepney.new_method_call(unit, 'Get', 'ss', (UNIT_INTERFACE, 'Id'))
+    reply = self._connection.send_and_get_reply(message, timeout=self._timeout)
+    (_, name), = self._jeepney.wrappers.unwrap_msg(reply)
+    return name
+
+  def subscribe(self):
+    # systemd only emits unit signals while at least one client subscribed
+    self.call('Subscribe')
+
+  def filter(self, rule, bufsize=1024):
+    match = self._jeepney.message_bus.AddMatch(rule)
+    self._connection.send_and_get_reply(match, timeout=self._timeout)
+    return self._connection.filter(rule, bufsize=bufsize)
+
+  def receive(self, queue, timeout=None):
+    return self._connection.recv_until_filtered(queue, timeout=timeout)
+
+
+class AsyncBus(object):
+  # Bus over jeepney's asyncio router, for use inside a running loop:
+  # async with AsyncBus() as bus: await bus.list_units()
+  def __init__(self, timeout=5.0):
+    jeepney, _ = _jeepney()
+    if jeepney is None:
+      raise OSError('jeepney is not installed')
+
+    self._jeepney = jeepney
+    self._timeout = timeout
+    self._context = None
+    self._router = None
+    self._manager = jeepney.DBusAddress(
+      SYSTEMD_PATH, bus_name=SYSTEMD_BUS_NAME, interface=MANAGER_INTERFACE
+    )
+
+  async def __aenter__(self):
+    from jeepney.io.asyncio import open_dbus_router
+    self._context = open_dbus_router(bus='SYSTEM')
+    self._router = await asyncio.wait_for(self._context.__aenter__(), self._timeout)
+    return self
+
+  async def __aexit__(self, *args):
+    await self._context.__aexit__(*args)
+
+  async def call(self, method, signature=None, body=()):
+    message = self._jeepney.new_method_call(self._manager, method, signature, body)
+    reply = await asyncio.wait_for(self._router.send_and_get_reply(message), self._timeout)
+    return self._jeepney.wrappers.unwrap_msg(reply)
+
+  async def list_units(self, states=None, patterns=None):
+    try:
+      filters = (list(states or []), list(patterns or []))
+      units, = await self.call('ListUnitsByPatterns', 'asas', filters)
+    except self._jeepney.DBusErrorResponse:
+      units, = await self.call('ListUnits')
+      units = _filter_units(units, states, patterns)
+    return units
+
+  async def list_unit_files(self, patterns=None):
+    try:
+      files, = await self.call('ListUnitFilesByPatterns', 'asas', ([], list(patterns or [])))
+    except self._jeepney.DBusErrorResponse:
+      files, = await self.call('ListUnitFiles')
+    return _file_states(files, patterns)
+
+
+def list_units_dbus(states=None, patterns=None, bus=None):
+  # Two calls: ListUnitsByPatterns for the loaded units and
+  # ListUnitFilesByPatterns for enablement
+  owned = bus is None
+  bus = bus or Bus()
+  try:
+    files = bus.list_unit_files(patterns)
+    return [
+      Unit(name, description, load, active, sub, files.get(name))
+      for name, description, load, active, sub, *_ in bus.list_units(states, patterns)
+    ]
+  finally:
+    if owned:
+      bus.close()
+
+
+def _unit_files(paths):
+  # {name: path} of the highest priority file per unit, drop-in and
+  # wants/requires directories are skipped
+  files = {}
+  for directory in paths:
+    try:
+      entries = sorted(os.listdir(directory))
+    except OSError:
+      continue
+    for name in entries:
+      file_path = os.path.join(directory, name)
+      if name in files or os.path.isdir(file_path) or '.' not in name:
+        continue
+      files[name] = file_path
+  return files
+
+def _parse_unit(file_path):
+  # Only the keys the inventory needs: Description and whether [Install]
+  # has anything to enable
+  description = None
+  installable = False
+  section = None
+  try:
+    with open(file_path, 'r', errors='replace') as f:
+      for line in f:
+        line = line.strip()
+        if not line or line[0] in '#;':
+          continue
+        if line.startswith('['):
+          section = line
+          continue
+        key, _, value = line.partition('=')
+        key = key.strip()
+        if section == '[Unit]' and key == 'Description':
+          description = value.strip()
+        elif section == '[Install]' and key in INSTALL_KEYS:
+          installable = True
+  except OSError:
+    pass
+  return description, installable
+
+def _wanted(paths):
+  # Units pulled in through *.wants/*.requires symlinks -> where they were
+  # found, '/run' links only last until reboot
+  wanted = {}
+  for directory in paths:
+    try:
+      entries = os.listdir(directory)
+    except OSError:
+      continue
+    for entry in entries:
+      if not entry.endswith(('.wants', '.requires', '.upholds')):
+        continue
+      try:
+        links = os.listdir(os.path.join(directory, entry))
+      except OSError:
+        continue
+      for name in links:
+        wanted.setdefault(name, directory)
+  return wanted
+
+def _show_states(names, systemctl='systemctl'):
+  # {name: (active, sub)} from one 'systemctl show', for a running systemd
+  # that can't be reached over D-Bus (no jeepney)
+  if not names:
+    return {}
+  stats.fork()
+  try:
+    process = subprocess.run(
+      [systemctl, 'show', '--property=Id,ActiveState,SubState', '--', *names],
+      capture_output=True,
+      text=True,
+      timeout=10,
+    )
+  except (OSError, subprocess.SubprocessError) as e:
+    logger.debug(f'Failed to run systemctl show. Error: {e}')
+    return {}
+  if process.returncode != 0:
+    # Units it can't load are left out, the rest are still printed
+    logger.debug(f'systemctl show exited with status {process.returncode}')
+
+  states = {}
+  for block in process.stdout.split('\n\n'):
+    fields = dict(line.partition('=')[::2] for line in block.splitlines() if '=' in line)
+    if fields.get('Id'):
+      active = intern(fields.get('ActiveState') or None)
+      states[fields['Id']] = (active, intern(fields.get('SubState') or None))
+  return states
+
+def _started(run_units):
+  # Units with an invocation marker, i.e. started since boot
+  try:
+    entries = os.listdir(run_units)
+  except OSError:
+    return set()
+  return {entry.partition(':')[2] for entry in entries if entry.startswith('invocation:')}
+
+def _enablement(name, target, installable, wanted, instances):
+  if target == os.devnull:
+    return 'masked'
+  if os.path.basename(target) != name:
+    # Alias symlink such as dbus-org.freedesktop.timesync1.service
+    return 'alias'
+  if name in wanted:
+    return 'enabled-runtime' if wanted[name].startswith('/run/') else 'enabled'
+  if '@.' in name and name.partition('@')[0] in instances:
+    return 'enabled'
+  if '@.' in name:
+    return 'indirect' if installable else 'static'
+  return 'disabled' if installable else 'static'
+
+def list_units_files(
+  states=None,
+  patterns=None,
+  paths=UNIT_PATHS,
+  run_units=RUN_UNITS,
+  runtime=RUNTIME,
+  show=False,
+):
+  # Unit inventory from the unit files when systemd can't be asked over
+  # D-Bus. With systemd running, the active state comes from the markers in
+  # /run/systemd/units; show=True asks one 'systemctl show' for active and
+  # sub states instead, list_units() does when D-Bus is unavailable.
+  # Without systemd both are unknown (None).
+  booted = os.path.isdir(runtime)
+  started = _started(run_units) if booted else set()
+
+  wanted = _wanted(paths)
+  # Templates are enabled through their instances, getty@tty1.service
+  instances = {name.partition('@')[0] for name in wanted if '@' in name}
+  files = {
+    name: file_path for name, file_path in _unit_files(paths).items() if _matches(name, patterns)
+  }
+  # Templates have no state of their own
+  shown = {}
+  if booted and show:
+    shown = _show_states([name for name in files if '@.' not in name])
+
+  units = []
+  for name, file_path in files.items():
+    target = os.path.realpath(file_path)
+    masked = target == os.devnull
+    description, installable = (None, False) if masked else _parse_unit(file_path)
+    enabled = _enablement(name, target, installable, wanted, instances)
+
+    load = 'masked' if masked else 'loaded'
+    if name in shown:
+      active, sub = shown[name]
+    elif booted:
+      active, sub = 'active' if name in started else 'inactive', None
+    else:
+      active, sub = None, None
+    if states and not {load, active, sub} & set(states):
+      continue
+
+    units.append(Unit(name, description, load, active, sub, enabled))
+
+  return units
+
+def list_units(states=None, patterns=None):
+  # 'states' matches load, active or sub state ('running', 'failed', ...),
+  # 'patterns' are shell globs on the unit name ('*.service')
+  try:
+    return list_units_dbus(states, patterns)
+  except Exception as e:
+    logger.debug(f'systemd is not reachable over D-Bus, reading unit files. Error: {e}')
+  return list_units_files(states, patterns, show=True)
+
+def list_services(states=None, patterns=('*.service',)):
+  return [_record(unit) for unit in list_units(states, patterns)]
+
+async def alist_units_dbus(states=None, patterns=None):
+  async with AsyncBus() as bus:
+    units, files = await asyncio.gather(
+      bus.list_units(states, patterns), bus.list_unit_files(patterns)
+    )
+  return [
+    Unit(name, description, load, active, sub, files.get(name))
+    for name, description, load, active, sub, *_ in units
+  ]
+
+async def alist_units(states=None, patterns=None):
+  # list_units() without blocking the loop: D-Bus through the asyncio
+  # router, the unit file fallback on a worker thread
+  try:
+    return await alist_units_dbus(states, patterns)
+  except Exception as e:
+    logger.debug(f'systemd is not reachable over D-Bus, reading unit files. Error: {e}')
+  return await asyncio.to_thread(partial(list_units_files, states, patterns, show=True))
+
+async def alist_services(states=None, patterns=('*.service',)):
+  return [_record(unit) for unit in await alist_units(states, patterns)]
+
+
+def _watch_dbus(patterns, timeout):
+  with Bus() as bus:
+    # Object path -> (name, active, sub), kept current from the signals
+    known = {}
+    for name, _, _, active, sub, _, path, *_ in bus.list_units(None, patterns):
+      known[path] = (name, active, sub)
+
+    bus.subscribe()
+    jeepney = bus._jeepney
+    changed = jeepney.MatchRule(
+      type='signal',
+      sender=SYSTEMD_BUS_NAME,
+      interface='org.freedesktop.DBus.Properties',
+      member='PropertiesChanged',
+      path_namespace=f'{SYSTEMD_PATH}/unit',
+    )
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    with bus.filter(changed) as queue:
+      while deadline is None or time.monotonic() < deadline:
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        try:
+          message = bus.receive(queue, timeout=remaining)
+        except TimeoutError:
+          return
+
+        interface, properties, _ = message.body
+        if interface != UNIT_INTERFACE:
+          continue
+
+        path = message.header.fields[jeepney.HeaderFields.path]
+        if path not in known:
+          # Unit loaded after the watch started
+          try:
+            known[path] = (bus.unit_name(path), None, None)
+          except Exception as e:
+            logger.debug(f'Failed to resolve unit {path}. Error: {e}')
+            continue
+
+        name, active, sub = known[path]
+        if not _matches(name, patterns):
+          continue
+
+        new_active = properties['ActiveState'][1] if 'ActiveState' in properties else active
+        new_sub = properties['SubState'][1] if 'SubState' in properties else sub
+        if (new_active, new_sub) == (active, sub):
+          continue
+
+        known[path] = (name, new_active, new_sub)
+        yield UnitChange(name, new_active, new_sub, active, sub)
+
+def _unit_changes(previous, current):
+  # UnitChange per unit that appeared, changed state or disappeared, a
+  # removed unit has active and sub None
+  for name, unit in current.items():
+    before = previous.get(name)
+    if before is None:
+      yield UnitChange(name, unit.active, unit.sub, None, None)
+    elif (before.active, before.sub) != (unit.active, unit.sub):
+      yield UnitChange(name, unit.active, unit.sub, before.active, before.sub)
+  for name, before in previous.items():
+    if name not in current:
+      yield UnitChange(name, None, None, before.active, before.sub)
+
+def _watch_files(patterns, timeout, interval):
+  def units():
+    return {unit.name: unit for unit in list_units_files(None, patterns, show=True)}
+
+  previous = units()
+  deadline = time.monotonic() + timeout if timeout is not None else None
+
+  while deadline is None or time.monotonic() < deadline:
+    wait = interval if deadline is None else min(interval, deadline - time.monotonic())
+    time.sleep(max(0, wait))
+    current = units()
+    yield from _unit_changes(previous, current)
+    previous = current
+
+def watch(patterns=('*.service',), timeout=None, interval=5.0):
+  # Yields a UnitChange whenever a unit's active/sub state changes. Uses
+  # systemd's PropertiesChanged signals, falls back to re-reading the unit
+  # files every 'interval' seconds without D-Bus.
+  try:
+    bus = Bus()
+    bus.close()
+  except Exception as e:
+    logger.debug(f'systemd is not reachable over D-Bus, polling unit files. Error: {e}')
+    return _watch_files(patterns, timeout, interval)
+
+  return _watch_dbus(patterns, timeout)
+
+
+__all__ = [
+  'Unit',
+  'UnitChange',
+  'Service',
+  'Bus',
+  'AsyncBus',
+  'UNIT_PATHS',
+  'RUNTIME',
+  'list_units',
+  'list_units_dbus',
+  'list_units_files',
+  'list_services',
+  'alist_units',
+  'alist_services',
+  'watch',
+]
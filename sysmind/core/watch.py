@@ -0,0 +1,496 @@
+# sysmind/core/watch.py
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import os
+import select
+import socket
+import struct
+from collections import namedtuple
+
+from sysmind.core.mounts import MOUNTINFO, iter_mounts
+from sysmind.logging import logger
+
+# Files watched with inotify -> section they feed. The parent directory is
+# watched so replacing the file (editors, resolvconf, NetworkManager) is seen.
+FILES = {
+  '/etc/hosts': 'hosts',
+  '/etc/resolv.conf': 'resolver',
+  '/etc/sysctl.conf': 'sysctl',
+}
+
+# Directories whose every entry feeds a section
+DIRECTORIES = {
+  '/etc/sysctl.d': 'sysctl',
+}
+
+# Event sources a Watcher opens by default
+SOURCES = ('files', 'mounts', 'devices', 'interfaces')
+
+# Typed events. 'section' is the OperatingSystem/Snapshot section to refresh.
+FileEvent = namedtuple('FileEvent', ['section', 'path', 'action'])
+MountEvent = namedtuple(
+  'MountEvent', ['section', 'mountpoint', 'action', 'source', 'fstype', 'options']
+)
+DeviceEvent = namedtuple('DeviceEvent', ['section', 'devpath', 'action', 'subsystem', 'properties'])
+InterfaceEvent = namedtuple(
+  'InterfaceEvent', ['section', 'name', 'action', 'index', 'up', 'address']
+)
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+_INOTIFY_MASK = (
+  IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+# <linux/netlink.h>, <linux/rtnetlink.h>
+NETLINK_ROUTE = 0
+NETLINK_KOBJECT_UEVENT = 15
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+IFLA_IFNAME = 3
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+IFF_UP = 0x1
+
+_NLMSGHDR = struct.Struct('=IHHII')
+_IFINFOMSG = struct.Struct('=BxHiII')
+_IFADDRMSG = struct.Struct('=BBBBI')
+_RTATTR = struct.Struct('=HH')
+
+# Uevent subsystems -> section
+DEVICE_SECTIONS = {
+  'usb': 'usb_devices',
+  'pci': 'pci_devices',
+}
+
+
+class Inotify(object):
+  # Minimal inotify binding through ctypes, non-blocking
+  def __init__(self):
+    self._libc = ctypes.CDLL(None, use_errno=True)
+    self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if self._fd < 0:
+      error = ctypes.get_errno()
+      raise OSError(error, os.strerror(error))
+
+  def fileno(self):
+    return self._fd
+
+  def add_watch(self, path, mask=_INOTIFY_MASK):
+    wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+    if wd < 0:
+      error = ctypes.get_errno()
+      raise OSError(error, os.strerror(error), path)
+    return wd
+
+  def read(self):
+    # [(wd, mask, name)] of everything queued
+    try:
+      data = os.read(self._fd, 65536)
+    except BlockingIOError:
+      return []
+
+    events = []
+    offset = 0
+    while offset + _INOTIFY_EVENT.size <= len(data):
+      wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+      offset += _INOTIFY_EVENT.size
+      name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+      offset += length
+      events.append((wd, mask, name))
+    return events
+
+  def close(self):
+    os.close(self._fd)
+
+
+def _mountinfo(path=MOUNTINFO):
+  # {mountpoint: (source, fstype, options)}, the last mount on a mountpoint
+  # is the visible one
+  return {mount.mountpoint: (mount.device, mount.fstype, mount.opts) for mount in iter_mounts(path)}
+
+def parse_uevent(data):
+  # 'action@devpath\0KEY=VALUE\0...' from the kernel; udev's own 'libudev'
+  # messages on other groups are not received
+  parts = data.split(b'\0')
+  if b'@' not in parts[0]:
+    return None
+  properties = {}
+  for part in parts[1:]:
+    key, sep, value = part.partition(b'=')
+    if sep:
+      properties[key.decode()] = value.decode(errors='replace')
+  return properties
+
+def _attributes(data, offset, end):
+  attributes = {}
+  while offset + _RTATTR.size <= end:
+    length, kind = _RTATTR.unpack_from(data, offset)
+    if length < _RTATTR.size:
+      break
+    attributes[kind] = data[offset + _RTATTR.size:offset + length]
+    offset += (length + 3) & ~3
+  return attributes
+
+def parse_rtnetlink(data, names=None):
+  # Yields InterfaceEvents for link and address messages. 'names' maps
+  # interface indexes to names for address messages without a label.
+  names = names if names is not None else {}
+  offset = 0
+  while offset + _NLMSGHDR.size <= len(data):
+    length, kind, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+    if length < _NLMSGHDR.size:
+      break
+    body = offset + _NLMSGHDR.size
+    end = offset + length
+
+    if kind in (RTM_NEWLINK, RTM_DELLINK):
+      _, _, index, flags, _ = _IFINFOMSG.unpack_from(data, body)
+      attributes = _attributes(data, body + _IFINFOMSG.size, end)
+      name = attributes.get(IFLA_IFNAME, b'').rstrip(b'\0').decode() or names.get(index)
+      names[index] = name
+      action = 'removed' if kind == RTM_DELLINK else 'changed'
+      yield InterfaceEvent('interfaces', name, action, index, bool(flags & IFF_UP), None)
+
+    elif kind in (RTM_NEWADDR, RTM_DELADDR):
+      family, _, _, _, index = _IFADDRMSG.unpack_from(data, body)
+      attributes = _attributes(data, body + _IFADDRMSG.size, end)
+      raw = attributes.get(IFA_LOCAL) or attributes.get(IFA_ADDRESS)
+      address = socket.inet_ntop(family, raw) if raw else None
+      name = attributes.get(IFA_LABEL, b'').rstrip(b'\0').decode() or names.get(index)
+      action = 'address_removed' if kind == RTM_DELADDR else 'address_added'
+      yield InterfaceEvent('interfaces', name, action, index, None, address)
+
+    offset += (length + 3) & ~3
+
+
+class Watcher(object):
+  # Collects change events from inotify, mountinfo and netlink on the
+  # running asyncio loop. Bursts are debounced per key (file, mountpoint,
+  # device, interface): an event is delivered once nothing new arrived for
+  # it within 'debounce' seconds, only the latest state is kept.
+  #
+  #   async with Watcher() as watcher:
+  #     async for event in watcher:
+  #       system.invalidate(event.section)
+  def __init__(
+    self,
+    sources=SOURCES,
+    debounce=0.25,
+    files=None,
+    directories=None,
+    mountinfo=MOUNTINFO,
+    targets=(),
+  ):
+    self._sources = tuple(sources)
+    self._debounce = debounce
+    self._files = dict(FILES if files is None else files)
+    self._directories = dict(DIRECTORIES if directories is None else directories)
+    self._mountinfo_path = mountinfo
+    # Objects with invalidate(sections), e.g. an OperatingSystem or Cache,
+    # invalidated before an event is delivered
+    self._targets = list(targets)
+
+    self._loop = None
+    self._queue = None
+    self._pending = {}
+    self._closers = []
+    self._started = False
+
+    self._inotify = None
+    self._watches = {}
+    self._mounts = {}
+    self._links = {}
+
+  def __repr__(self):
+    return f'Watcher(sources={self._sources}, debounce={self._debounce})'
+
+  async def __aenter__(self):
+    self.start()
+    return self
+
+  async def __aexit__(self, *args):
+    self.stop()
+
+  def __aiter__(self):
+    return self
+
+  async def __anext__(self):
+    if not self._started:
+      raise StopAsyncIteration
+    return await self._queue.get()
+
+  @property
+  def sources(self):
+    # Sources that opened successfully
+    return [source for source, _ in self._closers]
+
+  def start(self):
+    if self._started:
+      return self
+
+    self._loop = asyncio.get_running_loop()
+    self._queue = asyncio.Queue()
+
+    openers = {
+      'files': self._open_files,
+      'mounts': self._open_mounts,
+      'devices': self._open_devices,
+      'interfaces': self._open_interfaces,
+    }
+    for source in self._sources:
+      if source not in openers:
+        raise ValueError(f'Unknown watch source: {source}')
+      try:
+        self._closers.append((source, openers[source]()))
+      except Exception as e:
+        logger.error(f'Failed to watch {source}. Error: {e}')
+
+    self._started = True
+    return self
+
+  def stop(self):
+    for handle, _ in self._pending.values():
+      handle.cancel()
+    self._pending.clear()
+
+    for source, close in self._closers:
+      try:
+        close()
+      except Exception as e:
+        logger.warning(f'Failed to close {source} watch. Error: {e}')
+    self._closers = []
+    self._started = False
+
+  async def get(self, timeout=None):
+    # Next event, None on timeout
+    try:
+      return await asyncio.wait_for(self._queue.get(), timeout)
+    except asyncio.TimeoutError:
+      return None
+
+  def _schedule(self, key, produce):
+    # Trailing edge debounce: restart the key's timer, keep the latest
+    # producer. produce() runs at delivery and returns a list of events.
+    if key in self._pending:
+      self._pending[key][0].cancel()
+    handle = self._loop.call_later(self._debounce, self._deliver, key)
+    self._pending[key] = (handle, produce)
+
+  def _deliver(self, key):
+    _, produce = self._pending.pop(key)
+    try:
+      events = produce()
+    except Exception as e:
+      logger.error(f'Failed to read change for {key}. Error: {e}')
+      return
+
+    for event in events:
+      for target in self._targets:
+        target.invalidate([event.section])
+      self._queue.put_nowait(event)
+
+  def _reader(self, fd, callback):
+    self._loop.add_reader(fd, callback)
+    return lambda: self._loop.remove_reader(fd)
+
+  # inotify
+
+  def _open_files(self):
+    self._inotify = Inotify()
+
+    # Directory -> {name: (path, section)}, None matches every name
+    wanted = {}
+    for path, section in self._files.items():
+      candidates = {path, os.path.realpath(path)}
+      for candidate in candidates:
+        directory, name = os.path.split(candidate)
+        wanted.setdefault(directory, {})[name] = (path, section)
+    for directory, section in self._directories.items():
+      wanted.setdefault(directory, {})[None] = (directory, section)
+
+    for directory, names in wanted.items():
+      try:
+        wd = self._inotify.add_watch(directory, _INOTIFY_MASK | IN_ONLYDIR)
+      except OSError as e:
+        logger.warning(f'Failed to watch {directory}. Error: {e}')
+        continue
+      self._watches[wd] = (directory, names)
+
+    if not self._watches:
+      self._inotify.close()
+      raise OSError('None of the watched directories exist')
+
+    close = self._reader(self._inotify.fileno(), self._on_inotify)
+
+    def closer():
+      close()
+      self._inotify.close()
+    return closer
+
+  def _on_inotify(self):
+    for wd, mask, name in self._inotify.read():
+      if wd not in self._watches or mask & IN_IGNORED:
+        continue
+      directory, names = self._watches[wd]
+      match = names.get(name) or names.get(None)
+      if match is None:
+        continue
+
+      path, section = match
+      if None in names and name:
+        path = os.path.join(directory, name)
+      action = 'deleted' if mask & (IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF) else 'modified'
+      event = FileEvent(section, path, action)
+      self._schedule(('file', path), lambda event=event: [event])
+
+  # mountinfo
+
+  def _open_mounts(self):
+    # mountinfo never becomes readable, the kernel flags a change with
+    # POLLPRI. An epoll set holding it is readable when that happens and can
+    # be handed to the loop.
+    self._mounts = _mountinfo(self._mountinfo_path)
+    mountinfo = open(self._mountinfo_path, 'rb')
+    mountinfo.read()
+    poller = select.epoll()
+    poller.register(mountinfo.fileno(), select.EPOLLPRI | select.EPOLLERR)
+
+    def on_change():
+      poller.poll(0)
+      # Re-arm by reading again from the start
+      mountinfo.seek(0)
+      mountinfo.read()
+      self._schedule(('mounts',), self._diff_mounts)
+
+    close = self._reader(poller.fileno(), on_change)
+
+    def closer():
+      close()
+      poller.close()
+      mountinfo.close()
+    return closer
+
+  def _diff_mounts(self):
+    current = _mountinfo(self._mountinfo_path)
+    events = []
+    for mountpoint, (source, fstype, options) in current.items():
+      previous = self._mounts.get(mountpoint)
+      if previous is None:
+        events.append(MountEvent('mounts', mountpoint, 'mounted', source, fstype, options))
+      elif previous != (source, fstype, options):
+        events.append(MountEvent('mounts', mountpoint, 'changed', source, fstype, options))
+    for mountpoint, (source, fstype, options) in self._mounts.items():
+      if mountpoint not in current:
+        events.append(MountEvent('mounts', mountpoint, 'unmounted', source, fstype, options))
+    self._mounts = current
+    return events
+
+  # netlink
+
+  def _netlink(self, protocol, groups):
+    kind = socket.SOCK_RAW | socket.SOCK_NONBLOCK | socket.SOCK_CLOEXEC
+    sock = socket.socket(socket.AF_NETLINK, kind, protocol)
+    try:
+      sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+      sock.bind((0, groups))
+    except OSError:
+      sock.close()
+      raise
+    return sock
+
+  def _receive(self, sock):
+    messages = []
+    while True:
+      try:
+        messages.append(sock.recv(65536))
+      except BlockingIOError:
+        return messages
+      except OSError as e:
+        # ENOBUFS: events were dropped, the consumer should re-collect
+        logger.warning(f'Netlink receive failed, events may be missing. Error: {e}')
+        return messages
+
+  def _open_devices(self):
+    sock = self._netlink(NETLINK_KOBJECT_UEVENT, 1)
+
+    def on_uevent():
+      for data in self._receive(sock):
+        properties = parse_uevent(data)
+        if properties is None:
+          continue
+        section = DEVICE_SECTIONS.get(properties.get('SUBSYSTEM'))
+        # USB interfaces are announced next to their device
+        if section is None:
+          continue
+        if section == 'usb_devices' and properties.get('DEVTYPE') != 'usb_device':
+          continue
+        devpath = properties.get('DEVPATH')
+        action, subsystem = properties.get('ACTION'), properties.get('SUBSYSTEM')
+        event = DeviceEvent(section, devpath, action, subsystem, properties)
+        self._schedule(('device', devpath), lambda event=event: [event])
+
+    close = self._reader(sock.fileno(), on_uevent)
+
+    def closer():
+      close()
+      sock.close()
+    return closer
+
+  def _open_interfaces(self):
+    sock = self._netlink(NETLINK_ROUTE, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR)
+
+    def on_rtnetlink():
+      for data in self._receive(sock):
+        for event in parse_rtnetlink(data, self._links):
+          key = ('interface', event.index, event.address)
+          self._schedule(key, lambda event=event: [event])
+
+    close = self._reader(sock.fileno(), on_rtnetlink)
+
+    def closer():
+      close()
+      sock.close()
+    return closer
+
+
+async def watch(sources=SOURCES, debounce=0.25, targets=()):
+  # Async generator over a Watcher's events
+  async with Watcher(sources=sources, debounce=debounce, targets=targets) as watcher:
+    async for event in watcher:
+      yield event
+
+
+__all__ = [
+  'Watcher',
+  'Inotify',
+  'FileEvent',
+  'MountEvent',
+  'DeviceEvent',
+  'InterfaceEvent',
+  'FILES',
+  'DIRECTORIES',
+  'SOURCES',
+  'parse_uevent',
+  'parse_rtnetlink',
+  'watch',
+]
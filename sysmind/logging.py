@@ -1,11 +1,14 @@
 import logging
 
-logging.basicConfig(
-  level=logging.DEBUG, # Global debug level
-  format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', # Format of the logger
-)
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s' # Format of the logger
 
 logger = logging.getLogger('sysmind')
 
-# Log a basic message about the logging system
-logger.info('Logging set to DEBUG.')
+# Libraries shouldn't configure logging on import, applications (and the
+# CLI) call configure() or set up their own handlers
+logger.addHandler(logging.NullHandler())
+
+def configure(level=logging.WARNING):
+  logging.basicConfig(level=level, format=FORMAT)
+  logger.setLevel(level)
+  logger.debug(f'Logging set to {logging.getLevelName(level)}.')
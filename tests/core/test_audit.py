@@ -0,0 +1,90 @@
+# tests/core/test_audit.py
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from sysmind import cli
+from sysmind.core.audit import Audit
+from sysmind.core.os import OperatingSystem, ListeningPort
+
+
+@pytest.fixture
+def system(monkeypatch):
+  ports = {'listening_ports': [ListeningPort('0.0.0.0', 2024, 'LISTEN')], 'established_connections': [], 'closed_connections': []}
+  monkeypatch.setattr(OperatingSystem, '_collect_ports', lambda self: ports)
+  return OperatingSystem(cache=False)
+
+
+def test_audit_same_system_twice(system):
+  # The second run finds ports memoized, collect() has nothing left to run
+  audit = Audit([{'port': 2024, 'listening': False}])
+  assert not audit.run(system=system).ok
+  assert 'ports' in system.collected
+  assert not audit.run(system=system).ok
+  assert Audit([{'port': 2024}]).run(system=system).ok
+
+def test_failed_section_fails_its_rules(monkeypatch):
+  def broken(self):
+    raise RuntimeError('no ports')
+  monkeypatch.setattr(OperatingSystem, '_collect_ports', broken)
+  report = Audit([{'port': 2024, 'listening': False}]).run(system=OperatingSystem(cache=False))
+  assert not report.ok
+
+def test_missing_section_in_data_fails():
+  report = Audit([{'port': 2024, 'listening': False}]).run(data={})
+  assert not report.ok
+  assert report.results[0].actual is None
+
+def test_cli_without_yaml(tmp_path, monkeypatch, capsys):
+  rules = tmp_path / 'rules.yaml'
+  rules.write_text('- port: 22\n')
+  monkeypatch.setitem(sys.modules, 'yaml', None)
+  assert cli.main(['audit', str(rules)]) == 2
+  assert 'pip install sysmind[yaml]' in capsys.readouterr().err
+
+def test_listener_rule():
+  listeners = [
+    {'port': 22, 'pid': 10, 'name': 'sshd', 'user': 'root'},
+    {'port': 8080, 'pid': 11, 'name': 'nc', 'user': 'nobody'},
+  ]
+  audit = Audit([
+    {'listener': 22, 'allow': 'sshd'},
+    {'listener': 8080, 'allow': ['nginx']},
+    {'listener': 443, 'allow': ['nginx']},
+  ])
+  assert audit.sections == ['listeners']
+  report = audit.run(data={'listeners': listeners})
+  assert [result.passed for result in report] == [True, False, True]
+  assert report.results[1].actual == ['nc']
+
+def test_absent_values():
+  data = {'services': [], 'sysctl': {}}
+  audit = Audit([
+    {'service': 'telnet', 'op': '!=', 'status': 'running'},
+    {'service': 'telnet', 'op': 'not in', 'status': ['running', 'exited']},
+    {'service': 'telnet', 'op': 'in', 'status': ['running', 'exited']},
+    {'service': 'telnet'},
+    {'sysctl': 'kernel.missing', 'op': '!=', 'value': 1},
+    {'sysctl': 'kernel.missing', 'op': '>=', 'value': 1},
+  ])
+  report = audit.run(data=data)
+  assert [result.passed for result in report] == [True, True, False, False, True, False]
+
+def test_unknown_results_fail_unless_allowed(tmp_path, monkeypatch, capsys):
+  # A known unit whose state systemd can't report
+  services = [{'name': 'sshd.service', 'status': None, 'enabled': 'enabled'}]
+  audit = Audit([{'service': 'sshd'}, {'service': 'sshd', 'enabled': 'enabled'}])
+  report = audit.run(data={'services': services})
+  assert [result.passed for result in report] == [None, True]
+  assert not report.ok
+  assert not report.to_dict()['ok']
+  assert audit.run(data={'services': services}, allow_unknown=True).ok
+
+  rules = tmp_path / 'rules.json'
+  rules.write_text('[{"service": "sshd"}]')
+  monkeypatch.setattr(OperatingSystem, '_collect_services', lambda self: services)
+  assert cli.main(['audit', str(rules)]) == 1
+  assert cli.main(['audit', str(rules), '--allow-unknown']) == 0
+  assert '1 unknown' in capsys.readouterr().out
@@ -0,0 +1,126 @@
+# tests/core/test_cache.py
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+from sysmind.core import cache as cache_module
+from sysmind.core.cache import Cache
+from sysmind.core.os import OperatingSystem, UsbDevice
+
+
+@pytest.fixture
+def clock(monkeypatch):
+  now = [1000.0]
+  monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+  return now
+
+def _device(index):
+  return UsbDevice(f'{index:04x}', '0001', 'Vendor', None, 1, index, 'Device')
+
+
+def test_ttl_expiry(clock):
+  cache = Cache(ttls={'memory': 10})
+  cache.set('memory', 4096)
+  assert cache.get('memory') == (True, 4096)
+  clock[0] += 9.9
+  assert cache.get('memory') == (True, 4096)
+  clock[0] += 0.2
+  assert cache.get('memory') == (False, None)
+  assert len(cache) == 0
+
+def test_sections_without_ttl_are_not_cached():
+  cache = Cache(ttls={'memory': 10})
+  cache.set('processes', [1, 2])
+  assert cache.get('processes') == (False, None)
+  cache.set('memory', 1)
+  cache.set_ttl('memory', 0)
+  assert cache.get('memory') == (False, None)
+
+def test_lru_eviction():
+  cache = Cache(default_ttl=60, max_entries=2)
+  cache.set('a', 1)
+  cache.set('b', 2)
+  cache.get('a')
+  cache.set('c', 3)
+  assert cache.get('b') == (False, None)
+  assert cache.get('a') == (True, 1)
+  assert cache.get('c') == (True, 3)
+
+def test_invalidate(tmp_path):
+  cache = Cache(default_ttl=60, path=str(tmp_path))
+  for section in ('a', 'b', 'c'):
+    cache.set(section, section)
+  cache.invalidate('a')
+  assert cache.get('a') == (False, None)
+  assert not os.path.exists(tmp_path / 'a.json')
+  assert cache.get('b') == (True, 'b')
+
+  # Everything, on disk too: a new instance finds nothing
+  cache.invalidate()
+  assert len(cache) == 0
+  assert os.listdir(tmp_path) == []
+  assert Cache(default_ttl=60, path=str(tmp_path)).get('c') == (False, None)
+
+def test_values_are_copies():
+  cache = Cache(default_ttl=60)
+  devices = [_device(1)]
+  cache.set('usb_devices', devices)
+  devices.append(_device(2))
+
+  hit, value = cache.get('usb_devices')
+  assert value == [_device(1)]
+  value.clear()
+  assert cache.get('usb_devices') == (True, [_device(1)])
+
+def test_systems_sharing_a_cache_dont_share_values(monkeypatch):
+  monkeypatch.setattr(OperatingSystem, '_collect_usb_devices', lambda self: [_device(1)])
+  cache = Cache()
+  first = OperatingSystem(cache=cache)
+  first.usb_devices.append(_device(2))
+  assert OperatingSystem(cache=cache).usb_devices == [_device(1)]
+
+def test_disk_store(tmp_path, clock):
+  writer = Cache(ttls={'usb_devices': 60, 'kernel_name': 60}, path=str(tmp_path))
+  writer.set('usb_devices', [_device(1), _device(2)])
+  writer.set('kernel_name', 'Linux')
+  assert sorted(os.listdir(tmp_path)) == ['kernel_name.json', 'usb_devices.json']
+  with open(tmp_path / 'kernel_name.json') as f:
+    assert json.load(f) == {'expires': 1060.0, 'value': 'Linux'}
+
+  # Another process reads the entries back, records as records
+  reader = Cache(ttls={'usb_devices': 60, 'kernel_name': 60}, path=str(tmp_path))
+  hit, devices = reader.get('usb_devices')
+  assert hit
+  assert devices == [_device(1), _device(2)]
+  assert type(devices[0]) is UsbDevice
+  assert devices[1].address == 2
+
+  clock[0] += 61
+  assert Cache(ttls={'kernel_name': 60}, path=str(tmp_path)).get('kernel_name') == (False, None)
+
+def test_disk_store_rejects_foreign_types(tmp_path):
+  # A planted entry can name a type, it is only used if it is a sysmind record
+  entries = {
+    'a': {'__record__': 'subprocess:Popen', 'fields': [['id']]},
+    'b': {'__record__': 'sysmind.core.cache:Cache', 'fields': []},
+  }
+  for section, value in entries.items():
+    with open(tmp_path / f'{section}.json', 'w') as f:
+      json.dump({'expires': 2 ** 40, 'value': value}, f)
+  with open(tmp_path / 'c.json', 'w') as f:
+    f.write('not json')
+
+  cache = Cache(default_ttl=60, path=str(tmp_path))
+  for section in ('a', 'b', 'c'):
+    assert cache.get(section) == (False, None)
+
+def test_values_that_cant_be_encoded_are_not_cached():
+  cache = Cache(default_ttl=60)
+  cache.set('a', {object()})
+  assert cache.get('a') == (False, None)
+  # Non-record tuples come back as lists
+  cache.set('b', {'x': (1, 2)})
+  assert cache.get('b') == (True, {'x': [1, 2]})
@@ -0,0 +1,173 @@
+# tests/core/test_collector.py
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+from sysmind.core.collector import Command, acollect, collect
+
+
+def _sleep(seconds, value=None):
+  def collector():
+    time.sleep(seconds)
+    return value
+  return collector
+
+
+def test_collectors_run_concurrently():
+  barrier = threading.Barrier(3, timeout=2)
+  def collector():
+    # Only returns once all three are running at the same time
+    barrier.wait()
+    return threading.current_thread().name
+  collection = collect({'a': collector, 'b': collector, 'c': collector})
+  assert collection.complete
+  assert sorted(collection.results) == ['a', 'b', 'c']
+
+def test_per_collector_timeouts():
+  start = time.monotonic()
+  collection = collect(
+    {'slow': _sleep(2, 'slow'), 'fast': _sleep(0, 'fast'), 'patient': _sleep(0.3, 'patient')},
+    timeout=0.2,
+    timeouts={'patient': 1.0},
+  )
+  assert time.monotonic() - start < 1.5
+  assert collection.timed_out == ['slow']
+  assert collection.results == {'fast': 'fast', 'patient': 'patient'}
+  assert not collection.complete
+  assert 'slow' not in collection
+
+def test_timeouts_start_when_a_worker_picks_up_the_job():
+  # Queued behind 'a', 'b' would be past a deadline counted from submit
+  collection = collect({'a': _sleep(0.4, 1), 'b': _sleep(0.4, 2)}, timeout=0.6, max_workers=1)
+  assert collection.timed_out == []
+  assert collection.results == {'a': 1, 'b': 2}
+
+def test_max_workers_queues_jobs():
+  running = []
+  peak = []
+  lock = threading.Lock()
+  def collector():
+    with lock:
+      running.append(1)
+      peak.append(len(running))
+    time.sleep(0.05)
+    with lock:
+      running.pop()
+  collection = collect({f'c{index}': collector for index in range(6)}, max_workers=2)
+  assert len(collection.results) == 6
+  assert max(peak) == 2
+
+def test_errors():
+  def broken():
+    raise RuntimeError('boom')
+  collection = collect({'broken': broken, 'ok': _sleep(0, 1)})
+  assert collection.results == {'ok': 1}
+  assert isinstance(collection.errors['broken'], RuntimeError)
+  assert not collection.complete
+
+def test_failed_command_is_an_error():
+  failing = Command([sys.executable, '-c', 'raise SystemExit(3)'], str.split)
+  missing = Command(['/nonexistent/sysmind-command'], str.split)
+  working = Command([sys.executable, '-c', 'print("a b")'], str.split)
+  collection = collect({'failing': failing, 'missing': missing, 'working': working})
+  assert collection.results == {'working': ['a', 'b']}
+  assert collection.errors['failing'].returncode == 3
+  assert isinstance(collection.errors['missing'], OSError)
+
+def test_durations():
+  collection = collect({'a': _sleep(0.1), 'b': _sleep(0)}, max_workers=1)
+  assert set(collection.durations) == {'a', 'b'}
+  # Time spent running, not waiting for a worker
+  assert 0.1 <= collection.durations['a'] < 0.5
+  assert collection.durations['b'] < 0.1
+
+def test_empty():
+  collection = collect({})
+  assert collection.complete
+  assert collection.results == {}
+
+@pytest.mark.parametrize('max_workers', [1, None])
+def test_results_keep_collector_values(max_workers):
+  collectors = {name: _sleep(0, name.upper()) for name in 'abc'}
+  assert collect(collectors, max_workers=max_workers).results == {'a': 'A', 'b': 'B', 'c': 'C'}
+
+def _asleep(seconds, value=None):
+  async def collector():
+    await asyncio.sleep(seconds)
+    return value
+  return collector
+
+
+def test_acollect_runs_every_kind_of_collector():
+  loop_threads = []
+  def blocking():
+    # Plain functions go to a thread, off the event loop
+    loop_threads.append(threading.current_thread() is threading.main_thread())
+    return 'thread'
+  collectors = {
+    'coroutine': _asleep(0, 'coroutine'),
+    'blocking': blocking,
+    'command': Command([sys.executable, '-c', 'print("a b")'], str.split),
+  }
+  collection = asyncio.run(acollect(collectors))
+  assert collection.complete
+  assert collection.results == {'coroutine': 'coroutine', 'blocking': 'thread', 'command': ['a', 'b']}
+  assert loop_threads == [False]
+  assert set(collection.durations) == set(collectors)
+
+def test_acollect_runs_concurrently():
+  start = time.monotonic()
+  collection = asyncio.run(acollect({f'c{index}': _asleep(0.2, index) for index in range(5)}))
+  assert time.monotonic() - start < 0.8
+  assert collection.results == {f'c{index}': index for index in range(5)}
+
+def test_acollect_timeouts():
+  start = time.monotonic()
+  collection = asyncio.run(acollect(
+    {
+      'slow': _asleep(2, 'slow'),
+      'fast': _asleep(0, 'fast'),
+      'patient': _asleep(0.3, 'patient'),
+      'command': Command([sys.executable, '-c', 'import time; time.sleep(2)'], str.split),
+    },
+    timeout=0.2,
+    timeouts={'patient': 1.0},
+  ))
+  # The timed out command was killed, not waited for
+  assert time.monotonic() - start < 1.5
+  assert sorted(collection.timed_out) == ['command', 'slow']
+  assert collection.results == {'fast': 'fast', 'patient': 'patient'}
+  assert not collection.complete
+  assert collection.durations['slow'] < 1
+
+def test_acollect_errors():
+  async def broken():
+    raise RuntimeError('boom')
+  def blocking_broken():
+    raise ValueError('bad')
+  collectors = {
+    'broken': broken,
+    'blocking_broken': blocking_broken,
+    'failing': Command([sys.executable, '-c', 'raise SystemExit(3)'], str.split),
+    'missing': Command(['/nonexistent/sysmind-command'], str.split),
+    'unparsable': Command([sys.executable, '-c', 'print("x")'], int),
+    'ok': _asleep(0, 1),
+  }
+  collection = asyncio.run(acollect(collectors))
+  assert collection.results == {'ok': 1}
+  assert isinstance(collection.errors['broken'], RuntimeError)
+  assert isinstance(collection.errors['blocking_broken'], ValueError)
+  assert collection.errors['failing'].returncode == 3
+  assert isinstance(collection.errors['missing'], OSError)
+  assert isinstance(collection.errors['unparsable'], ValueError)
+  assert collection.timed_out == []
+
+def test_acollect_empty():
+  collection = asyncio.run(acollect({}))
+  assert collection.complete
+  assert collection.results == {}
@@ -0,0 +1,71 @@
+# tests/core/test_columnar.py
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from sysmind.core import columnar
+from sysmind.core.snapshot import Snapshot
+
+FORMATS = ['packed', 'arrow', 'parquet']
+
+SECTIONS = {
+  'cpu_count': 8,
+  'cpu_frequency': 3600.5,
+  'posix_compliant': True,
+  'kernel_name': 'Linux',
+  'hosts': None,
+  'ports': {
+    # Listening rows have no remote_* keys
+    'listening_ports': [
+      {'local_ip': '0.0.0.0', 'local_port': 22, 'status': 'LISTEN'},
+      {'local_ip': '::', 'local_port': 80, 'status': 'LISTEN'},
+    ],
+    'established_connections': [
+      {'local_ip': '10.0.0.2', 'local_port': 22, 'remote_ip': '10.0.0.9', 'remote_port': 50000, 'status': 'ESTABLISHED'},
+    ],
+    'closed_connections': [],
+  },
+  'interfaces': {
+    'lo': {'name': 'lo', 'mac': None, 'ipv4': ['127.0.0.1'], 'ipv6': [], 'mtu': 65536, 'state': 'unknown', 'speed': None},
+    'eth0': {'name': 'eth0', 'mac': '00:11:22:33:44:55', 'ipv4': [], 'ipv6': ['fe80::1'], 'mtu': 1500, 'state': 'up', 'speed': 1000},
+  },
+  'resolver': {'nameservers': ['10.0.0.1'], 'domain': None, 'port': 53},
+  'processes': [
+    {'pid': 1, 'name': 'init', 'user': 'root', 'ports': []},
+    {'pid': 2, 'name': 'kthreadd', 'user': None},
+  ],
+  'sysctl': {'kernel.ostype': 'Linux', 'net.ipv4.conf.eth0/100.forwarding': '0'},
+}
+
+
+def _formats():
+  arrow = pytest.mark.skipif(columnar._arrow() is None, reason='pyarrow is not installed')
+  return [pytest.param(format, marks=[] if format == 'packed' else [arrow]) for format in FORMATS]
+
+
+@pytest.mark.parametrize('format', _formats())
+def test_round_trip(tmp_path, format):
+  snapshot = Snapshot.from_dict({'taken': 1700000000.0, 'sections': SECTIONS})
+  path = str(tmp_path / 'snapshot')
+  snapshot.dump(path, format=format)
+  loaded = Snapshot.load(path)
+  assert loaded.to_dict() == snapshot.to_dict()
+
+@pytest.mark.parametrize('format', _formats())
+def test_missing_keys_stay_missing(tmp_path, format):
+  snapshot = Snapshot.from_dict({'taken': None, 'sections': SECTIONS})
+  path = str(tmp_path / 'snapshot')
+  snapshot.dump(path, format=format)
+  listening = Snapshot.load(path)['ports']['listening_ports']
+  assert all('remote_ip' not in row for row in listening)
+
+def test_failed_dump_leaves_no_temp_file(tmp_path, monkeypatch):
+  def fail(*args):
+    raise OSError('disk full')
+  monkeypatch.setattr(columnar.os, 'replace', fail)
+  path = str(tmp_path / 'snapshot')
+  with pytest.raises(OSError):
+    Snapshot.from_dict({'sections': SECTIONS}).dump(path, format='packed')
+  assert os.listdir(tmp_path) == []
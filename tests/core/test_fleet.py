@@ -0,0 +1,53 @@
+# tests/core/test_fleet.py
+from __future__ import annotations
+
+import time
+
+from sysmind.core.fleet import FleetRunner, Transport
+
+
+class SleepTransport(Transport):
+  # Takes 'seconds' per target, the first attempt of targets in 'fail'
+  # raises
+  def __init__(self, seconds, fail=(), in_process=False):
+    self._seconds = seconds
+    self._fail = set(fail)
+    self.in_process = in_process
+    self.calls = []
+
+  def run(self, target, request, timeout=None):
+    self.calls.append((target, time.monotonic()))
+    if target in self._fail:
+      self._fail.discard(target)
+      raise RuntimeError('unreachable')
+    time.sleep(self._seconds)
+    return {'hostname': target, 'snapshot': {'taken': None, 'sections': {}}}
+
+
+def test_timeout_counts_from_start_not_queue():
+  # Three 0.7s jobs on one worker, each well inside its own 1s timeout
+  runner = FleetRunner(SleepTransport(0.7), max_workers=1, timeout=1.0, retries=0)
+  results, summary = runner.run_all(['a', 'b', 'c'])
+  assert [result.error for result in results] == [None, None, None]
+  assert summary.ok == ['a', 'b', 'c']
+
+def test_timeout_counts_from_start_in_process():
+  runner = FleetRunner(SleepTransport(0.7, in_process=True), max_workers=1, timeout=1.0, retries=0)
+  results, _ = runner.run_all(['a', 'b', 'c'])
+  assert all(result.ok for result in results)
+
+def test_timed_out_in_process_job_is_not_retried():
+  runner = FleetRunner(SleepTransport(1.5, in_process=True), max_workers=1, timeout=0.3, retries=2)
+  results, _ = runner.run_all(['a'])
+  assert not results[0].ok
+  assert results[0].attempts == 1
+  assert 'Timed out' in results[0].error
+
+def test_retry_backoff_frees_the_worker():
+  transport = SleepTransport(0.1, fail=['a'])
+  runner = FleetRunner(transport, max_workers=1, timeout=5, retries=1, backoff=0.5)
+  results, _ = runner.run_all(['a', 'b'])
+  # b runs while a waits out its backoff
+  assert [result.target for result in results] == ['b', 'a']
+  assert results[1].ok and results[1].attempts == 2
+  assert [target for target, _ in transport.calls] == ['a', 'b', 'a']
@@ -0,0 +1,83 @@
+# tests/core/test_hosts.py
+from __future__ import annotations
+
+import itertools
+import os
+
+import pytest
+
+from sysmind.core.hosts import HostsFile
+
+_mtimes = itertools.count(1)
+
+
+def _write(path, data, mode='wb'):
+  with open(path, mode) as f:
+    f.write(data)
+  # Distinct mtimes however fast the test runs
+  mtime = next(_mtimes) * 1000000000
+  os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def hosts(tmp_path, monkeypatch):
+  path = str(tmp_path / 'hosts')
+  _write(path, b'127.0.0.1 localhost\n# comment\n10.0.0.1 db db.internal\n')
+  resets = []
+  reset = HostsFile._reset
+  def counting(self):
+    resets.append(True)
+    reset(self)
+  monkeypatch.setattr(HostsFile, '_reset', counting)
+  hosts = HostsFile(path)
+  assert hosts.refresh()
+  resets.clear()
+  return path, hosts, resets
+
+
+def test_unchanged_file_is_not_parsed(hosts):
+  _, hosts, _ = hosts
+  assert not hosts.refresh()
+
+def test_append_parses_only_new_lines(hosts):
+  path, hosts, resets = hosts
+  _write(path, b'10.0.0.2 web\n', 'ab')
+  assert hosts.refresh()
+  assert resets == []
+  assert hosts.addresses('web') == ['10.0.0.2']
+  assert hosts.resolves('db', '10.0.0.1')
+  assert len(hosts.entries) == 4
+
+def test_append_to_unterminated_line(hosts):
+  path, hosts, resets = hosts
+  _write(path, b'10.0.0.3 par', 'ab')
+  assert hosts.refresh()
+  assert 'par' in hosts
+  _write(path, b'tial other\n10.0.0.4 next\n', 'ab')
+  assert hosts.refresh()
+  assert resets == []
+  assert 'par' not in hosts
+  assert hosts.names('10.0.0.3') == ['partial', 'other']
+  assert 'next' in hosts
+  assert len(hosts.entries) == 5
+
+def test_rewrite_in_place_reparses(hosts):
+  path, hosts, resets = hosts
+  # Same inode and a larger size, but the parsed bytes changed
+  _write(path, b'127.0.0.1 localhost\n# comment\n10.0.0.9 db db.internal\n10.0.0.2 web\n', 'r+b')
+  assert hosts.refresh()
+  assert resets == [True]
+  assert hosts.addresses('db') == ['10.0.0.9']
+  assert not hosts.has_address('10.0.0.1')
+
+def test_truncate_and_replace_reparse(hosts):
+  path, hosts, resets = hosts
+  _write(path, b'10.0.0.5 small\n')
+  assert hosts.refresh()
+  assert hosts.names() == ['small']
+  replacement = f'{path}.new'
+  _write(replacement, b'10.0.0.6 small larger file than before\n')
+  os.replace(replacement, path)
+  assert hosts.refresh()
+  assert resets == [True, True]
+  assert hosts.addresses('small') == ['10.0.0.6']
@@ -0,0 +1,81 @@
+# tests/core/test_ids.py
+from __future__ import annotations
+
+import pytest
+
+from sysmind.core import ids
+from sysmind.core.ids import IdsDatabase
+
+PCI_IDS = (
+  '#\n'
+  '# List of PCI ID\'s\n'
+  '#\n'
+  '8086  Intel Corporation\n'
+  '\t1234  Ethernet Controller\n'
+  '\t\t1028 0001  PowerEdge NIC\n'
+  '# a comment inside a block\n'
+  '\t\t8086 0002  Server Adapter\n'
+  '\t5678  Graphics\n'
+  '10de  NVIDIA Corporation\n'
+  '\t1eb8  TU104GL [Tesla T4]\n'
+  '\n'
+  '# Device classes\n'
+  'C 00  Unclassified device\n'
+  '\t00  Non-VGA unclassified device\n'
+)
+
+
+@pytest.fixture
+def path(tmp_path):
+  path = tmp_path / 'pci.ids'
+  path.write_text(PCI_IDS)
+  return str(path)
+
+@pytest.fixture
+def database(path):
+  database = IdsDatabase(path)
+  yield database
+  database.close()
+
+
+def test_vendor(database):
+  assert database.vendor('8086') == 'Intel Corporation'
+  # Hex strings in any case, with 0x, or ints
+  assert database.vendor('0x10DE') == 'NVIDIA Corporation'
+  assert database.vendor(0x10de) == 'NVIDIA Corporation'
+  assert database.vendor('ffff') is None
+
+def test_device(database):
+  assert database.device('8086', '1234') == 'Ethernet Controller'
+  assert database.device('8086', '0x5678') == 'Graphics'
+  assert database.device(0x10de, 0x1eb8) == 'TU104GL [Tesla T4]'
+  # Devices are looked up within their vendor only
+  assert database.device('10de', '1234') is None
+  assert database.device('ffff', '1234') is None
+  # The last vendor block ends where the class section starts
+  assert database.device('10de', '00') is None
+
+def test_subsystem(database):
+  assert database.subsystem('8086', '1234', '1028', '0001') == 'PowerEdge NIC'
+  assert database.subsystem('8086', '1234', 0x8086, 0x2) == 'Server Adapter'
+  assert database.subsystem('8086', '1234', '1028', '0002') is None
+  # Subsystem lines belong to the device above them
+  assert database.subsystem('8086', '5678', '1028', '0001') is None
+  assert database.subsystem('8086', '9999', '1028', '0001') is None
+  assert database.subsystem('ffff', '1234', '1028', '0001') is None
+
+def test_database_picks_first_existing_path(path, tmp_path, monkeypatch):
+  monkeypatch.setattr(ids, '_databases', {})
+  found = ids.database([str(tmp_path / 'missing.ids'), path])
+  assert found.path == path
+  assert found.vendor('8086') == 'Intel Corporation'
+  # Opened once and shared
+  assert ids.database([path]) is found
+
+def test_missing_or_unreadable_file(tmp_path, monkeypatch):
+  monkeypatch.setattr(ids, '_databases', {})
+  assert ids.database([str(tmp_path / 'missing.ids')]) is None
+  # An empty file can't be mapped, it is skipped with a warning
+  empty = tmp_path / 'empty.ids'
+  empty.write_text('')
+  assert ids.database([str(empty)]) is None
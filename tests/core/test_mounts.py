@@ -0,0 +1,88 @@
+# tests/core/test_mounts.py
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from sysmind.core import mounts
+from sysmind.core.audit import Audit
+from sysmind.core.mounts import MountTable, parse_mountinfo
+
+MOUNTINFO = [
+  '22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw,errors=remount-ro\n',
+  '30 22 0:25 / /tmp rw,nosuid,nodev,noexec shared:5 master:2 - tmpfs tmpfs rw,size=1024k\n',
+  '31 22 0:26 / /media/my\\040disk rw,nosuid - vfat /dev/sdb1 rw\n',
+  '32 22 0:27 /sub /srv rw - ext4 /dev/sdc\\0401 rw\n',
+  'garbage line\n',
+]
+
+
+@pytest.fixture
+def table():
+  return MountTable(parse_mountinfo(MOUNTINFO))
+
+
+def test_parse_mountinfo():
+  root, tmp, media, srv = parse_mountinfo(MOUNTINFO)
+  assert root.device == '/dev/sda1'
+  assert root.options == ('rw', 'relatime', 'errors=remount-ro')
+  assert root.opts == 'rw,relatime,errors=remount-ro'
+  # Optional fields (shared:, master:) don't shift the rest
+  assert (tmp.fstype, tmp.mount_id, tmp.parent_id) == ('tmpfs', 30, 22)
+  assert tmp.options == ('rw', 'nosuid', 'nodev', 'noexec', 'size=1024k')
+  # Octal escapes in mountpoints and devices
+  assert media.mountpoint == '/media/my disk'
+  assert srv.device == '/dev/sdc 1'
+  assert srv.root == '/sub'
+
+def test_missing_and_with_option(table):
+  assert [mount.mountpoint for mount in table.with_option('nodev')] == ['/tmp']
+  assert table.missing(['nodev', 'noexec'], '/tmp') == {}
+  assert table.missing('nosuid', fstypes='ext4') == {'/': ['nosuid'], '/srv': ['nosuid']}
+  assert table.missing('nosuid', '/media/*') == {}
+  assert table.find('/tmp/a/b').mountpoint == '/tmp'
+  assert table.find('/home').mountpoint == '/'
+
+def test_stacked_mount_hides_lower_options(table):
+  table._add(mounts.Mount('tmpfs', '/tmp', 'tmpfs', 'rw', ('rw',), 40, 30, '/'))
+  assert table['/tmp'].options == ('rw',)
+  assert table.with_option('nodev') == []
+  assert table.missing(['nodev', 'noexec'], '/tmp') == {'/tmp': ['nodev', 'noexec']}
+  assert len(table) == 5
+  assert len(table.visible()) == 4
+
+def test_audit_on_stacked_mount_fails():
+  lines = [*MOUNTINFO, '40 30 0:30 / /tmp rw - tmpfs tmpfs rw\n']
+  report = Audit([{'mount': '/tmp', 'options': ['nodev', 'noexec']}]).run(
+    data={'mounts': list(parse_mountinfo(lines))}
+  )
+  assert report.results[0].passed is False
+  assert report.results[0].actual == {'/tmp': ['nodev', 'noexec']}
+
+def test_usage_times_out_hung_mounts(monkeypatch, tmp_path):
+  monkeypatch.setattr(mounts, '_hung', {})
+  release = threading.Event()
+  def disk_usage(mountpoint):
+    if mountpoint == '/hung':
+      release.wait(5)
+    return mounts.Usage(100, 40, 60, 40.0)
+  monkeypatch.setattr(mounts, 'disk_usage', disk_usage)
+
+  start = time.monotonic()
+  results = mounts.usage(['/hung', '/a', '/b'], timeout=0.2, max_workers=1)
+  assert time.monotonic() - start < 2
+  assert results['/hung'] is None
+  assert results['/a'].used == 40
+  assert results['/b'].used == 40
+
+  # Skipped while the first call is still blocked
+  assert mounts.usage(['/hung'], timeout=0.2) == {'/hung': None}
+  assert '/hung' in mounts._hung
+  release.set()
+  for _ in range(100):
+    if '/hung' not in mounts._hung:
+      break
+    time.sleep(0.01)
+  assert mounts.usage(['/hung'], timeout=0.2)['/hung'].used == 40
@@ -0,0 +1,109 @@
+# tests/core/test_os.py
+from __future__ import annotations
+
+import socket
+import subprocess
+import sys
+import time
+
+from collections import namedtuple
+
+import psutil
+import pytest
+
+from sysmind.core import sysfs
+from sysmind.core.os import OperatingSystem, Interface, SECTIONS, get_interfaces
+
+# The fields of psutil's snicaddr get_interfaces() reads
+Address = namedtuple('Address', ['family', 'address'])
+
+
+@pytest.fixture
+def calls(monkeypatch):
+  # Replaces every collector with one that records its calls
+  calls = []
+  for section in SECTIONS:
+    def collector(self, section=section):
+      calls.append(section)
+      return f'{section}-value'
+    monkeypatch.setattr(OperatingSystem, f'_collect_{section}', collector)
+  monkeypatch.setattr('sysmind.core.os.COMMANDS', {})
+  return calls
+
+
+def test_init_collects_nothing(calls):
+  system = OperatingSystem(cache=False)
+  assert calls == []
+  assert system.collected == []
+
+def test_property_collects_its_section_once(calls):
+  system = OperatingSystem(cache=False)
+  assert system.memory == 'memory-value'
+  assert system.memory == 'memory-value'
+  assert calls == ['memory']
+  assert system.collected == ['memory']
+
+def test_prefetch(calls):
+  system = OperatingSystem(sections=['memory', 'swap'], cache=False)
+  assert sorted(calls) == ['memory', 'swap']
+  system.swap
+  assert sorted(calls) == ['memory', 'swap']
+
+def test_invalidate(calls):
+  system = OperatingSystem(cache=False)
+  system.memory
+  system.invalidate('memory')
+  assert system.collected == []
+  system.memory
+  assert calls == ['memory', 'memory']
+
+def test_collect_skips_memoized_sections(calls):
+  system = OperatingSystem(cache=False)
+  system.memory
+  collection = system.collect(['memory', 'swap'])
+  assert list(collection.results) == ['swap']
+  assert calls == ['memory', 'swap']
+
+def test_unknown_section():
+  with pytest.raises(ValueError):
+    OperatingSystem(cache=False).prefetch(['nope'])
+
+def test_ip_and_mac_share_one_interfaces_collect(monkeypatch):
+  calls = []
+  def get_interfaces():
+    calls.append('interfaces')
+    time.sleep(0.1)
+    return {'eth0': Interface('eth0', '00:11:22:33:44:55', ('10.0.0.2',), (), 1500, 'up', None)}
+  monkeypatch.setattr('sysmind.core.os.get_interfaces', get_interfaces)
+  system = OperatingSystem(cache=False)
+  system._system = 'linux'
+  collection = system.collect(['ip', 'mac', 'interfaces'])
+  assert collection.complete
+  assert calls == ['interfaces']
+  assert system.ip == '10.0.0.2'
+  assert system.mac == '00:11:22:33:44:55'
+
+def test_get_interfaces_merges_names_once(monkeypatch):
+  address = Address(socket.AF_INET, '10.0.0.2')
+  monkeypatch.setattr(psutil, 'net_if_addrs', lambda: {'eth0': [address], 'veth1': [], 'lo': []})
+  monkeypatch.setattr(sysfs, 'available', lambda: True)
+  monkeypatch.setattr(sysfs, 'net_interfaces', lambda: ['lo', 'eth0'])
+  monkeypatch.setattr(sysfs, 'net_interface', lambda name: {'address': None, 'mtu': 1500, 'state': 'up', 'speed': None})
+  interfaces = get_interfaces()
+  assert list(interfaces) == ['lo', 'eth0', 'veth1']
+  assert interfaces['eth0'].ipv4 == ('10.0.0.2',)
+
+def test_imports_without_unix_only_modules():
+  # As on Windows: no pwd module and no os.sysconf
+  script = '\n'.join([
+    'import builtins, os, psutil',
+    'real = builtins.__import__',
+    'def guarded(name, *args, **kwargs):',
+    '  if name == "pwd":',
+    '    raise ImportError(name)',
+    '  return real(name, *args, **kwargs)',
+    'builtins.__import__ = guarded',
+    'del os.sysconf',
+    'import sysmind.core.os',
+  ])
+  subprocess.run([sys.executable, '-c', script], check=True)
@@ -0,0 +1,96 @@
+# tests/core/test_procfs.py
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from benchmarks.conftest import SOCKET_HEADER, make_proc
+from sysmind.core import procfs
+
+PROCESSES = 3
+SOCKETS = 40
+
+
+@pytest.fixture
+def root(tmp_path):
+  # Socket i is tcp, tcp6, udp, udp6 in turn, on port 1024 + i and owned by
+  # pid 1 + i % 3. Every tenth listens (bound for udp), the rest are
+  # established.
+  return make_proc(str(tmp_path), PROCESSES, SOCKETS)
+
+def _port(index):
+  return 1024 + index
+
+
+def test_available(root, tmp_path):
+  assert procfs.available(root)
+  assert not procfs.available(str(tmp_path / 'missing'))
+
+def test_iter_sockets(root):
+  sockets = list(procfs.iter_sockets(root=root))
+  assert len(sockets) == SOCKETS
+  assert {sock.kind for sock in sockets} == set(procfs.SOCKET_KINDS)
+
+  by_port = {sock.local_port: sock for sock in sockets}
+  listener = by_port[_port(0)]
+  assert (listener.kind, listener.local_ip, listener.status) == ('tcp', '127.0.0.1', 'LISTEN')
+  assert (listener.remote_ip, listener.remote_port) == (None, None)
+  assert (listener.uid, listener.inode, listener.pid) == (1000, 100000, None)
+
+  connection = by_port[_port(1)]
+  assert (connection.kind, connection.status) == ('tcp6', 'ESTABLISHED')
+  assert (connection.local_ip, connection.remote_ip, connection.remote_port) == ('::1', '::1', 40001)
+  # psutil reports every UDP socket as NONE
+  assert by_port[_port(2)].status == 'NONE'
+
+def test_ipv6_addresses(tmp_path):
+  root = str(tmp_path)
+  os.makedirs(os.path.join(root, 'net'))
+  with open(os.path.join(root, 'net', 'tcp6'), 'w') as f:
+    f.write(SOCKET_HEADER)
+    # 2001:db8::1 port 443, to ::ffff:10.0.0.2 port 50000
+    f.write(
+      '   0: B80D0120000000000000000001000000:01BB 0000000000000000FFFF00000200000A:C350 01'
+      ' 00000000:00000000 00:00000000 00000000     0        0 555 1 0000000000000000 20 4 30 10 -1\n'
+    )
+  sock, = procfs.iter_sockets(kinds=['tcp6'], root=root)
+  assert (sock.local_ip, sock.local_port) == ('2001:db8::1', 443)
+  assert (sock.remote_ip, sock.remote_port) == ('::ffff:10.0.0.2', 50000)
+  # Missing kinds are skipped
+  assert list(procfs.iter_sockets(kinds=['tcp', 'udp'], root=root)) == []
+
+def test_state_and_port_filters(root):
+  listening = list(procfs.iter_sockets(states={'LISTEN'}, root=root))
+  assert sorted(sock.local_port for sock in listening) == [_port(0), _port(20)]
+  assert {sock.kind for sock in listening} == {'tcp'}
+
+  ports = range(_port(10), _port(15))
+  assert sorted(sock.local_port for sock in procfs.iter_sockets(ports=ports, root=root)) == list(ports)
+  both = procfs.iter_sockets(states={'NONE'}, ports=ports, root=root)
+  assert sorted(sock.local_port for sock in both) == [_port(10), _port(11), _port(14)]
+  assert list(procfs.iter_sockets(kinds=['tcp'], states={'CLOSE_WAIT'}, root=root)) == []
+
+def test_pid_attribution(root):
+  owners = procfs.socket_owners(root)
+  assert len(owners) == SOCKETS
+  assert owners[100000 + 7] == 1 + 7 % PROCESSES
+
+  for sock in procfs.iter_sockets(pids=True, root=root):
+    assert sock.pid == 1 + (sock.local_port - 1024) % PROCESSES
+
+def test_unowned_sockets_have_no_pid(root):
+  # The fd walk only finds sockets some process holds
+  fd = os.path.join(root, '1', 'fd', '4')
+  assert os.readlink(fd) == 'socket:[100000]'
+  os.unlink(fd)
+  sock = next(procfs.iter_sockets(kinds=['tcp'], ports=[_port(0)], pids=True, root=root))
+  assert sock.pid is None
+
+def test_count_sockets(root):
+  counts = procfs.count_sockets(root=root)
+  assert sum(counts.values()) == SOCKETS
+  # Even indexes are TCP, every tenth of those listens
+  assert counts == {'LISTEN': 2, 'ESTABLISHED': 18, 'NONE': 20}
+  assert procfs.count_sockets(kinds=['tcp6'], root=root) == {'ESTABLISHED': 10}
+  assert procfs.count_sockets(states={'LISTEN'}, ports=[_port(20)], root=root) == {'LISTEN': 1}
@@ -0,0 +1,194 @@
+# tests/core/test_proctable.py
+from __future__ import annotations
+
+import os
+import shutil
+
+import pytest
+
+from sysmind.core import proctable
+from sysmind.core.proctable import ProcessTable
+
+TCP_HEADER = (
+  '  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt'
+  '   uid  timeout inode\n'
+)
+
+
+def _process(root, pid, ppid, name, start=100, state='S', cmdline=None, sockets=(), service='a'):
+  path = os.path.join(root, str(pid))
+  if os.path.isdir(path):
+    shutil.rmtree(path)
+  os.makedirs(os.path.join(path, 'fd'))
+  comm = name[:proctable.COMM_LENGTH]
+  with open(os.path.join(path, 'stat'), 'w') as f:
+    f.write(
+      f'{pid} ({comm}) {state} {ppid} {pid} {pid} 0 -1 0 0 0 0 0 {pid} 0 0 0 20 0 1 0'
+      f' {start} 0 {10 + pid}\n'
+    )
+  with open(os.path.join(path, 'cmdline'), 'wb') as f:
+    f.write(f'/usr/bin/{name}\0--flag\0'.encode() if cmdline is None else cmdline)
+  with open(os.path.join(path, 'cgroup'), 'w') as f:
+    f.write(f'0::/system.slice/{service}.service\n')
+  _fds(root, pid, sockets)
+  return path
+
+def _fds(root, pid, sockets):
+  fd_dir = os.path.join(root, str(pid), 'fd')
+  for fd in os.listdir(fd_dir):
+    os.unlink(os.path.join(fd_dir, fd))
+  targets = ['/dev/null', *(f'socket:[{inode}]' for inode in sockets)]
+  for fd, target in enumerate(targets):
+    os.symlink(target, os.path.join(fd_dir, str(fd)))
+
+def _tcp(root, sockets):
+  # sockets: (inode, port, listening)
+  os.makedirs(os.path.join(root, 'net'), exist_ok=True)
+  with open(os.path.join(root, 'net', 'tcp'), 'w') as f:
+    f.write(TCP_HEADER)
+    for index, (inode, port, listening) in enumerate(sockets):
+      remote, state = ('00000000:0000', '0A') if listening else ('0100007F:9C40', '01')
+      f.write(
+        f'{index:4}: 0100007F:{port:04X} {remote} {state} 00000000:00000000 00:00000000'
+        f' 00000000     0        0 {inode} 1 0000000000000000 100 0 0 10 0\n'
+      )
+
+
+@pytest.fixture
+def root(tmp_path):
+  # init -> sshd -> (session, worker); sshd listens on 22, session has an
+  # established connection
+  root = str(tmp_path)
+  _tcp(root, [(1000, 22, True), (1001, 22, False)])
+  _process(root, 1, 0, 'init', service='init')
+  _process(root, 2, 1, 'sshd', sockets=[1000], service='ssh')
+  _process(root, 3, 2, 'session', sockets=[1001], service='ssh')
+  _process(root, 4, 2, 'worker', service='ssh')
+  return root
+
+def _pids(processes):
+  return sorted(process.pid for process in processes)
+
+
+def test_scan(root):
+  table = ProcessTable.scan(root)
+  assert len(table) == 4
+  sshd = table[2]
+  assert (sshd.name, sshd.ppid, sshd.state, sshd.start_time) == ('sshd', 1, 'S', 100)
+  assert sshd.cmdline == '/usr/bin/sshd --flag'
+  assert sshd.cgroup == '/system.slice/ssh.service'
+  assert sshd.uid == os.getuid()
+  assert _pids(table.by_service('ssh')) == [2, 3, 4]
+  assert _pids(table.by_user(os.getuid())) == [1, 2, 3, 4]
+
+def test_children_subtree_and_ancestors(root):
+  table = ProcessTable.scan(root)
+  assert _pids(table.children(2)) == [3, 4]
+  assert _pids(table.subtree(2)) == [2, 3, 4]
+  assert _pids(table.subtree(1)) == [1, 2, 3, 4]
+  assert table.subtree(99) == []
+  assert table.parent(3).pid == 2
+  assert [process.pid for process in table.ancestors(3)] == [2, 1]
+
+def test_ancestors_stop_at_cycles(root):
+  _process(root, 5, 6, 'a')
+  _process(root, 6, 5, 'b')
+  table = ProcessTable.scan(root)
+  assert [process.pid for process in table.ancestors(5)] == [6]
+
+def test_ports(root):
+  table = ProcessTable.scan(root)
+  # Only the listening socket counts, not the connection on the same port
+  assert table[2].ports == (22,)
+  assert table[3].ports == ()
+  assert {port: _pids(processes) for port, processes in table.listening().items()} == {22: [2]}
+
+  # A listener opened by a known process is found without a rescan
+  _tcp(root, [(1000, 22, True), (1001, 22, False), (1002, 8080, True)])
+  _fds(root, 4, [1002])
+  added, removed, changed = table.refresh()
+  assert (added, removed, changed) == ([], [], [4])
+  assert _pids(table.by_port(8080)) == [4]
+
+  # And dropped when it closes
+  _tcp(root, [(1000, 22, True)])
+  _fds(root, 4, [])
+  assert table.refresh() == ([], [], [4])
+  assert table.by_port(8080) == []
+
+def test_ports_opt_out(root, monkeypatch):
+  def walk(path):
+    raise AssertionError(f'{path}/fd read')
+  monkeypatch.setattr(proctable, '_sockets', walk)
+  table = ProcessTable.scan(root, ports=False)
+  assert table[2].ports == ()
+  assert table.listening() == {}
+  assert table.refresh() == ([], [], [])
+
+def test_refresh_add_remove_change(root):
+  table = ProcessTable.scan(root)
+  assert table.refresh() == ([], [], [])
+
+  shutil.rmtree(os.path.join(root, '4'))
+  _process(root, 5, 2, 'worker2', service='ssh')
+  _process(root, 3, 2, 'session', state='R', sockets=[1001], service='ssh')
+  added, removed, changed = table.refresh()
+  assert (added, removed, changed) == ([5], [4], [3])
+  assert table[3].state == 'R'
+  assert 4 not in table
+  assert _pids(table.children(2)) == [3, 5]
+  assert table.by_name('worker') == []
+
+def test_refresh_reindexes_reparented(root):
+  table = ProcessTable.scan(root)
+  # sshd exits without reaping, init adopts the session
+  _process(root, 3, 1, 'session', sockets=[1001], service='ssh')
+  assert table.refresh() == ([], [], [3])
+  assert table[3].ppid == 1
+  assert _pids(table.children(2)) == [4]
+  assert _pids(table.children(1)) == [2, 3]
+
+@pytest.mark.skipif(os.getuid() != 0, reason='chown needs root')
+def test_refresh_reindexes_new_owner(root):
+  table = ProcessTable.scan(root)
+  os.chown(os.path.join(root, '4'), 12345, -1)
+  assert table.refresh() == ([], [], [4])
+  assert table[4].uid == 12345
+  assert _pids(table.by_user(12345)) == [4]
+  assert _pids(table.by_user(os.getuid())) == [1, 2, 3]
+
+def test_pid_reuse(root):
+  table = ProcessTable.scan(root)
+  # Same pid, later start time and a different program
+  _process(root, 4, 1, 'cron', start=500, service='cron')
+  added, removed, changed = table.refresh()
+  assert (added, removed, changed) == ([4], [4], [])
+  assert (table[4].name, table[4].ppid, table[4].start_time) == ('cron', 1, 500)
+  assert table.by_name('worker') == []
+  assert _pids(table.children(2)) == [3]
+  assert _pids(table.by_service('cron')) == [4]
+
+def test_long_names(root):
+  # comm is cut to 15 bytes, the full name comes from argv[0] or exe
+  _process(root, 5, 1, 'systemd-journald', cmdline=b'/usr/lib/systemd/systemd-journald\0')
+  exe = _process(root, 6, 1, 'very-long-daemon-name', cmdline=b'')
+  os.symlink('/usr/sbin/very-long-daemon-name (deleted)', os.path.join(exe, 'exe'))
+  _process(root, 7, 1, 'renamed-process', cmdline=b'worker: idle\0')
+  table = ProcessTable.scan(root)
+  assert table[5].name == 'systemd-journald'
+  assert table[6].name == 'very-long-daemon-name'
+  assert table[7].name == 'renamed-process'
+  assert _pids(table.by_name('systemd-journald')) == [5]
+  # The truncated comm isn't mistaken for an exec on refresh
+  assert table.refresh() == ([], [], [])
+
+def test_from_records():
+  table = ProcessTable.from_records([
+    {'pid': 1, 'ppid': 0, 'name': 'init', 'cmdline': ['/sbin/init'], 'user': 'root'},
+    {'pid': 2, 'ppid': 1, 'name': 'sshd', 'user': 'root', 'ports': [22]},
+  ])
+  assert table[1].cmdline == '/sbin/init'
+  assert _pids(table.by_port(22)) == [2]
+  assert _pids(table.children(1)) == [2]
+  with pytest.raises(ValueError):
+    table.refresh()
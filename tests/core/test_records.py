@@ -0,0 +1,41 @@
+# tests/core/test_records.py
+from __future__ import annotations
+
+import json
+import pickle
+
+from sysmind import cli
+from sysmind.core.mounts import Mount, Usage
+from sysmind.core.records import record, to_dicts
+from sysmind.core.systemd import Service
+
+
+def test_record_reads_like_a_dict():
+  usage = Usage(100, 40, 60, 40.0)
+  assert usage['used'] == 40
+  assert usage[1] == 40
+  assert usage.get('nope', 0) == 0
+  assert 'free' in usage
+  assert dict(usage.items()) == {'total': 100, 'used': 40, 'free': 60, 'percent': 40.0}
+
+def test_record_pickles_from_its_module():
+  assert Service.__module__ == 'sysmind.core.systemd'
+  service = Service('sshd.service', 'OpenSSH', 'loaded', 'active', 'running', 'enabled', 'running')
+  assert pickle.loads(pickle.dumps(service)) == service
+
+def test_record_without_module():
+  Point = record('Point', ['x', 'y'])
+  assert Point(1, 2)['y'] == 2
+
+def test_to_dicts_nested():
+  mount = Mount('/dev/sda1', '/', 'ext4', 'rw', ('rw',), 1, 0, '/')
+  data = {'mounts': [mount], 'usage': (Usage(1, 0, 1, 0.0), 'x')}
+  plain = to_dicts(data)
+  assert plain['mounts'][0]['mountpoint'] == '/'
+  assert plain['mounts'][0]['options'] == ['rw']
+  assert plain['usage'] == [{'total': 1, 'used': 0, 'free': 1, 'percent': 0.0}, 'x']
+
+def test_json_output_writes_records_as_objects(capsys):
+  cli._output({'services': [Service('sshd.service', None, 'loaded', 'active', 'running', 'enabled', 'running')]}, 'json')
+  services = json.loads(capsys.readouterr().out)['services']
+  assert services[0]['status'] == 'running'
@@ -0,0 +1,108 @@
+# tests/core/test_sampler.py
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from sysmind.core import sampler as sampler_module
+from sysmind.core.sampler import RingBuffer, Sampler
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+  # Every query runs once with NumPy and once with the plain Python fallback
+  if request.param == 'numpy':
+    pytest.importorskip('numpy')
+  else:
+    monkeypatch.setattr(sampler_module, '_numpy', lambda: None)
+  return request.param
+
+def _sampler(monkeypatch, samples, metric='net_bytes_sent', capacity=16):
+  # A Sampler fed (timestamp, value) pairs instead of psutil readings
+  sampler = Sampler(capacity=capacity, metrics=[metric])
+  clock = [0.0]
+  monkeypatch.setattr(sampler_module.time, 'time', lambda: clock[0])
+  for timestamp, value in samples:
+    clock[0] = timestamp
+    monkeypatch.setattr(sampler, '_read', lambda value=value: {metric: value})
+    sampler.sample()
+  return sampler
+
+
+def test_ring_buffer_wraparound():
+  buffer = RingBuffer(3)
+  assert len(buffer) == 0
+  assert buffer.latest() is None
+  assert list(buffer.values()) == []
+
+  buffer.append(1)
+  buffer.append(2)
+  assert list(buffer.values()) == [1, 2]
+
+  for value in (3, 4, 5):
+    buffer.append(value)
+  assert len(buffer) == buffer.capacity == 3
+  assert list(buffer.values()) == [3, 4, 5]
+  assert list(buffer.values(last=2)) == [4, 5]
+  assert list(buffer.values(last=10)) == [3, 4, 5]
+  assert buffer.latest() == 5
+
+  # The oldest values now sit at the end of the array
+  buffer.append(6)
+  assert list(buffer.values()) == [4, 5, 6]
+
+def test_ring_buffer_missing_values_are_nan():
+  buffer = RingBuffer(2)
+  buffer.append(None)
+  assert math.isnan(buffer.latest())
+
+def test_series_and_window(monkeypatch):
+  sampler = _sampler(monkeypatch, [(t, t * 10) for t in range(1, 6)], capacity=4)
+  # Only the newest 'capacity' samples are kept
+  assert sampler.series('net_bytes_sent') == [(2, 20), (3, 30), (4, 40), (5, 50)]
+  assert sampler.series('net_bytes_sent', window=1) == [(4, 40), (5, 50)]
+  assert sampler.latest('net_bytes_sent') == 50
+  with pytest.raises(KeyError):
+    sampler.series('nope')
+
+def test_rate(monkeypatch, backend):
+  sampler = _sampler(monkeypatch, [(0, 0), (1, 100), (3, 500), (4, 500)])
+  assert sampler.rate('net_bytes_sent') == [100, 200, 0]
+  assert sampler.rate('net_bytes_sent', window=1) == [0]
+
+def test_percentile(monkeypatch, backend):
+  samples = [(t, value) for t, value in enumerate([5, 1, None, 3, 2, 4])]
+  sampler = _sampler(monkeypatch, samples)
+  # NaN samples are ignored, interpolation matches numpy's default
+  assert sampler.percentile('net_bytes_sent', 50) == 3
+  assert sampler.percentile('net_bytes_sent', 25) == 2
+  assert sampler.percentile('net_bytes_sent', 90) == pytest.approx(4.6)
+  assert sampler.percentile('net_bytes_sent', 100, window=1) == 4
+
+def test_percentile_without_values(monkeypatch, backend):
+  sampler = _sampler(monkeypatch, [(0, None), (1, None)])
+  assert sampler.percentile('net_bytes_sent', 50) is None
+
+@pytest.mark.parametrize('func, expected', [
+  ('mean', [2, 3, 4]),
+  ('min', [1, 2, 3]),
+  ('max', [3, 4, 5]),
+  ('sum', [6, 9, 12]),
+])
+def test_rolling(monkeypatch, backend, func, expected):
+  sampler = _sampler(monkeypatch, [(t, t + 1) for t in range(5)])
+  assert sampler.rolling('net_bytes_sent', 3, func) == expected
+  assert sampler.rolling('net_bytes_sent', 6, func) == []
+
+def test_rolling_unknown_aggregation(monkeypatch):
+  sampler = _sampler(monkeypatch, [(0, 1)])
+  with pytest.raises(ValueError):
+    sampler.rolling('net_bytes_sent', 1, 'median')
+
+def test_sample_reads_psutil():
+  sampler = Sampler(capacity=4, metrics=['memory_used', 'cpu_percent'])
+  sampler.sample()
+  assert sampler.metrics == ['memory_used', 'cpu_percent']
+  assert sampler.latest('memory_used') > 0
+  assert len(sampler.series('cpu_percent')) == 1
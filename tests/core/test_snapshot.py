@@ -0,0 +1,79 @@
+# tests/core/test_snapshot.py
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from sysmind import cli
+from sysmind.core.os import OperatingSystem
+from sysmind.core.snapshot import Snapshot
+
+SLOW_COLLECTOR = '''
+import sys, time
+from sysmind import cli
+from sysmind.core.os import OperatingSystem
+OperatingSystem._collect_processes = lambda self: time.sleep(3)
+sys.exit(cli.main(['collect', '--sections', 'processes,memory', '--timeout', '0.5']))
+'''
+
+
+@pytest.fixture
+def slow(monkeypatch):
+  # processes blocks until the test ends, memory answers at once
+  release = threading.Event()
+  calls = []
+  def processes(self):
+    calls.append('processes')
+    release.wait(5)
+    return []
+  monkeypatch.setattr(OperatingSystem, '_collect_processes', processes)
+  monkeypatch.setattr(OperatingSystem, '_collect_memory', lambda self: 1024)
+  yield calls
+  release.set()
+
+
+def test_capture_leaves_out_timed_out_sections(slow):
+  start = time.monotonic()
+  snapshot = Snapshot.capture(sections=['processes', 'memory'], system=OperatingSystem(cache=False), stats=False, timeout=0.3)
+  assert time.monotonic() - start < 2
+  assert snapshot.sections == ['memory']
+  assert snapshot.missing == {'processes': 'timed out'}
+  assert slow == ['processes']
+
+def test_capture_records_failed_sections(monkeypatch):
+  def broken(self):
+    raise RuntimeError('boom')
+  monkeypatch.setattr(OperatingSystem, '_collect_swap', broken)
+  snapshot = Snapshot.capture(sections=['swap'], system=OperatingSystem(cache=False), stats=False)
+  assert 'swap' not in snapshot
+  assert snapshot.missing == {'swap': 'failed: boom'}
+
+def test_cli_collect_timeout(slow, capsys):
+  start = time.monotonic()
+  status = cli.main(['collect', '--sections', 'processes,memory', '--timeout', '0.3'])
+  assert time.monotonic() - start < 2
+  assert status == 1
+  out, err = capsys.readouterr()
+  assert json.loads(out) == {'memory': 1024}
+  assert 'processes timed out' in err
+  assert slow == ['processes']
+
+def test_cli_exits_without_waiting_for_timed_out_collectors():
+  start = time.monotonic()
+  process = subprocess.run([sys.executable, '-c', SLOW_COLLECTOR], capture_output=True, text=True)
+  assert time.monotonic() - start < 2.5
+  assert process.returncode == 1
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet', 'packed'])
+def test_cli_columnar_formats_need_output(fmt, monkeypatch, capsys):
+  # Rejected before anything is collected
+  monkeypatch.setattr(Snapshot, 'capture', lambda **kwargs: pytest.fail('collected'))
+  assert cli.main(['collect', '--sections', 'memory', '--format', fmt]) == 2
+  out, err = capsys.readouterr()
+  assert out == ''
+  assert f'--format {fmt} needs --output' in err
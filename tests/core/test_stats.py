@@ -0,0 +1,61 @@
+# tests/core/test_stats.py
+from __future__ import annotations
+
+import os
+import stat
+import threading
+
+from sysmind.core import stats
+from sysmind.core.collector import collect
+
+
+def test_spans_only_reach_their_stats():
+  barrier = threading.Barrier(2)
+  recorded = {}
+
+  def capture(name):
+    with stats.Stats() as spans:
+      barrier.wait()
+      collect({f'{name}-collector': lambda: [1, 2]})
+      barrier.wait()
+    recorded[name] = sorted(span.name for span in spans)
+
+  threads = [threading.Thread(target=capture, args=(name,)) for name in ('a', 'b')]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert recorded == {'a': ['a-collector'], 'b': ['b-collector']}
+  assert not stats.active()
+
+def test_process_wide_hook_sees_every_span():
+  seen = []
+  stats.add_hook(seen.append)
+  try:
+    thread = threading.Thread(target=stats.call, args=('elsewhere', list))
+    thread.start()
+    thread.join()
+  finally:
+    stats.remove_hook(seen.append)
+  assert [span.name for span in seen] == ['elsewhere']
+  assert not stats.active()
+
+def test_errors_are_attributed_to_the_span():
+  from sysmind.logging import logger
+
+  def failing():
+    logger.error('collector broke')
+    return None
+
+  with stats.Stats() as spans:
+    stats.call('broken', failing)
+  assert spans.errors == {'broken': ['collector broke']}
+
+def test_write_prometheus_is_world_readable(tmp_path):
+  with stats.Stats() as spans:
+    stats.call('memory', lambda: 1)
+  path = tmp_path / 'sysmind.prom'
+  spans.write_prometheus(str(path))
+  assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+  assert 'sysmind_collector_items{collector="memory"} 1' in path.read_text()
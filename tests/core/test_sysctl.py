@@ -0,0 +1,168 @@
+# tests/core/test_sysctl.py
+from __future__ import annotations
+
+import asyncio
+import glob
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from sysmind.core.sysctl import Sysctl, SysctlError
+from sysmind.core.sysctl import procfs
+
+
+def _write(path, text):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'w') as f:
+    f.write(text)
+
+def _read(path):
+  with open(path) as f:
+    return f.read()
+
+
+@pytest.fixture
+def tree(tmp_path):
+  proc_sys = str(tmp_path / 'proc' / 'sys')
+  _write(os.path.join(proc_sys, 'net', 'ipv4', 'ip_forward'), '0\n')
+  _write(os.path.join(proc_sys, 'vm', 'swappiness'), '60\n')
+  _write(os.path.join(proc_sys, 'net', 'ipv4', 'conf', 'eth0.100', 'forwarding'), '0\n')
+  config = str(tmp_path / 'sysctl.conf')
+  _write(config, '# managed\nvm.swappiness = 60\n')
+  config_dir = str(tmp_path / 'sysctl.d')
+  os.makedirs(config_dir)
+  return proc_sys, config, config_dir
+
+@pytest.fixture
+def sysctl(tree):
+  proc_sys, config, config_dir = tree
+  return Sysctl(sync=True, proc_sys=proc_sys, config=config, config_dir=config_dir)
+
+
+def test_transaction_commits_once(sysctl, tree):
+  proc_sys, config, _ = tree
+  with sysctl.transaction():
+    sysctl['net.ipv4.ip_forward'] = 1
+    sysctl['vm.swappiness'] = 10
+  assert procfs.read('net.ipv4.ip_forward', proc_sys) == '1'
+  assert procfs.read('vm.swappiness', proc_sys) == '10'
+  assert _read(config) == '# managed\nvm.swappiness = 10\nnet.ipv4.ip_forward = 1\n'
+  assert len(glob.glob(f'{config}.*.bkp')) == 1
+
+def test_transaction_rolls_back_on_exception(sysctl, tree):
+  proc_sys, config, _ = tree
+  with pytest.raises(RuntimeError):
+    with sysctl.transaction():
+      sysctl['vm.swappiness'] = 10
+      raise RuntimeError('abort')
+  assert sysctl['vm.swappiness'] == '60'
+  assert procfs.read('vm.swappiness', proc_sys) == '60'
+  assert _read(config) == '# managed\nvm.swappiness = 60\n'
+
+def test_failed_apply_restores_keys_and_config(sysctl, tree):
+  proc_sys, config, _ = tree
+  # A directory where a key should be: reading it fails mid-apply
+  os.makedirs(os.path.join(proc_sys, 'kernel', 'broken'))
+  with pytest.raises(SysctlError):
+    with sysctl.transaction():
+      sysctl['vm.swappiness'] = 10
+      sysctl['kernel.broken'] = 1
+  assert procfs.read('vm.swappiness', proc_sys) == '60'
+  assert sysctl['vm.swappiness'] == '60'
+  assert 'kernel.broken' not in sysctl.table
+  assert _read(config) == '# managed\nvm.swappiness = 60\n'
+
+def test_backups_are_never_overwritten(sysctl, tree):
+  _, config, _ = tree
+  # sync=True commits every assignment on its own, all within a second
+  sysctl['vm.swappiness'] = 10
+  sysctl['vm.swappiness'] = 20
+  sysctl['vm.swappiness'] = 30
+  backups = sorted(glob.glob(f'{config}.*.bkp'))
+  assert len(backups) == 3
+  contents = sorted(_read(backup) for backup in backups)
+  assert contents == sorted([
+    '# managed\nvm.swappiness = 60\n',
+    '# managed\nvm.swappiness = 10\n',
+    '# managed\nvm.swappiness = 20\n',
+  ])
+
+def test_deferred_sync(tree):
+  proc_sys, config, config_dir = tree
+  sysctl = Sysctl(sync=False, proc_sys=proc_sys, config=config, config_dir=config_dir)
+  sysctl['vm.swappiness'] = 10
+  assert _read(config) == '# managed\nvm.swappiness = 60\n'
+  sysctl.sync()
+  assert _read(config) == '# managed\nvm.swappiness = 10\n'
+
+@pytest.mark.parametrize('key', ['../../etc/passwd', 'net.', 'net..ipv4', '/etc/passwd', 'net/../../etc'])
+def test_keys_stay_inside_proc_sys(key):
+  with pytest.raises(ValueError):
+    procfs.path(key, '/proc/sys')
+  assert procfs.exists(key) is False
+
+def test_dotted_interface_keys_round_trip(sysctl, tree):
+  proc_sys, _, _ = tree
+  file_path = os.path.join(proc_sys, 'net', 'ipv4', 'conf', 'eth0.100', 'forwarding')
+  key = procfs.name(file_path, proc_sys)
+  assert key == 'net.ipv4.conf.eth0/100.forwarding'
+  assert procfs.path(key, proc_sys) == file_path
+  assert procfs.path('net/ipv4/conf/eth0.100/forwarding', proc_sys) == file_path
+  assert procfs.normalize('net/ipv4/conf/eth0.100/forwarding') == key
+  assert sysctl[key] == '0'
+  assert key in sysctl.read('net.ipv4.conf')
+
+def test_import_leaves_asyncio_unloaded():
+  # 'sysmind sysctl get' is a cheap command, asyncio is only for aread(),
+  # subprocess and stats only without procfs
+  deferred = ('asyncio', 'subprocess', 'tempfile', 'shutil', 'sysmind.core.stats')
+  check = f'import sys, sysmind.core.sysctl; print([m for m in {deferred!r} if m in sys.modules])'
+  result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, check=True)
+  assert result.stdout.strip() == '[]'
+
+def _fake_sysctl(tmp_path, script):
+  path = tmp_path / 'sysctl'
+  path.write_text(f'#!/bin/sh\n{script}\n')
+  path.chmod(0o755)
+  return str(path)
+
+def _without_procfs(tmp_path, script):
+  sysctl = Sysctl(load=False, log_errors=False, proc_sys=str(tmp_path / 'missing'))
+  sysctl.__dict__['_sysctl'] = _fake_sysctl(tmp_path, script)
+  return sysctl
+
+def test_aload_reads_prefix(tree):
+  proc_sys, config, config_dir = tree
+  sysctl = asyncio.run(Sysctl.aload('net.ipv4', proc_sys=proc_sys, config=config, config_dir=config_dir))
+  assert sysctl.table.prefix('net.ipv4')['net.ipv4.ip_forward'] == '0'
+  assert 'vm.swappiness' not in sysctl.table
+  # Other keys still load on access
+  assert sysctl['vm.swappiness'] == '60'
+
+def test_aget(sysctl):
+  assert asyncio.run(sysctl.aget('vm.swappiness')) == '60'
+  assert asyncio.run(sysctl.aget('net.ipv4.conf.eth0/100.forwarding')) == '0'
+  with pytest.raises(KeyError):
+    asyncio.run(sysctl.aget('vm.nope'))
+
+def test_async_reads_without_procfs(tmp_path):
+  sysctl = _without_procfs(tmp_path, "echo 'kernel.ostype = Linux'; echo 'net.ipv4.ip_forward = 1'")
+  assert asyncio.run(sysctl.aget('kernel.ostype')) == 'Linux'
+  assert asyncio.run(sysctl.aread('net.ipv4')) == {'net.ipv4.ip_forward': '1'}
+  with pytest.raises(KeyError):
+    asyncio.run(sysctl.aget('vm.swappiness'))
+
+def test_async_reads_time_out(tmp_path):
+  sysctl = _without_procfs(tmp_path, 'exec sleep 5')
+  started = time.monotonic()
+  with pytest.raises(asyncio.TimeoutError):
+    asyncio.run(sysctl.aget('kernel.ostype', timeout=0.2))
+  assert time.monotonic() - started < 2
+  assert len(sysctl.table) == 0
+
+def test_failed_sysctl_leaves_table_empty(tmp_path):
+  sysctl = _without_procfs(tmp_path, 'exit 1')
+  assert asyncio.run(sysctl.aread()) == {}
@@ -0,0 +1,92 @@
+# tests/core/test_sysfs.py
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from benchmarks.conftest import make_sysfs
+from sysmind.core import sysfs
+
+
+@pytest.fixture
+def root(tmp_path):
+  return make_sysfs(str(tmp_path), pci=3, usb=2)
+
+def _write(path, text):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'w') as f:
+    f.write(text)
+
+
+def test_available(root, tmp_path):
+  assert sysfs.available(root)
+  assert not sysfs.available(str(tmp_path / 'missing'))
+
+def test_pci_devices(root):
+  devices = list(sysfs.pci_devices(root))
+  assert [slot for slot, _ in devices] == ['0000:00:00.0', '0000:00:01.0', '0000:00:02.0']
+  slot, attributes = devices[2]
+  # The 0x prefix is dropped
+  assert attributes == {
+    'vendor': '8002',
+    'device': '0002',
+    'class': '030000',
+    'subsystem_vendor': '0000',
+    'subsystem_device': '0000',
+  }
+
+def test_pci_missing_attributes(root):
+  os.unlink(os.path.join(root, 'bus', 'pci', 'devices', '0000:00:01.0', 'subsystem_device'))
+  attributes = dict(sysfs.pci_devices(root))['0000:00:01.0']
+  assert attributes['subsystem_device'] is None
+  assert attributes['vendor'] == '8001'
+
+def test_usb_devices(root):
+  devices = list(sysfs.usb_devices(root))
+  # Interface directories ('1-1:1.0') are skipped
+  assert [name for name, _ in devices] == ['1-1', '1-2']
+  name, attributes = devices[1]
+  assert attributes == {
+    'idVendor': '1001',
+    'idProduct': '0001',
+    'manufacturer': 'Vendor 1',
+    'product': 'Device 1',
+    'serial': 'SN00000001',
+    'busnum': '1',
+    'devnum': '3',
+  }
+
+def test_usb_entries_without_vendor_are_skipped(root):
+  # Root hubs and half-removed devices can lack idVendor
+  os.makedirs(os.path.join(root, 'bus', 'usb', 'devices', 'usb9'))
+  os.unlink(os.path.join(root, 'bus', 'usb', 'devices', '1-1', 'serial'))
+  devices = dict(sysfs.usb_devices(root))
+  assert sorted(devices) == ['1-1', '1-2']
+  assert devices['1-1']['serial'] is None
+
+def test_missing_buses(tmp_path):
+  assert list(sysfs.pci_devices(str(tmp_path))) == []
+  assert list(sysfs.usb_devices(str(tmp_path))) == []
+
+def test_net_interface(root):
+  path = os.path.join(root, 'class', 'net', 'eth0')
+  _write(os.path.join(path, 'address'), '52:54:00:12:34:56\n')
+  _write(os.path.join(path, 'mtu'), '1500\n')
+  _write(os.path.join(path, 'operstate'), 'up\n')
+  _write(os.path.join(path, 'speed'), '1000\n')
+  _write(os.path.join(root, 'class', 'net', 'lo', 'speed'), '-1\n')
+  assert sysfs.net_interfaces(root) == ['eth0', 'lo']
+  assert sysfs.net_interface('eth0', root) == {
+    'address': '52:54:00:12:34:56', 'mtu': 1500, 'state': 'up', 'speed': 1000,
+  }
+  # Virtual links report -1, missing files are None
+  assert sysfs.net_interface('lo', root) == {'address': None, 'mtu': None, 'state': None, 'speed': None}
+
+def test_read_helpers(tmp_path):
+  _write(str(tmp_path / 'hex'), '0x1f\n')
+  _write(str(tmp_path / 'text'), 'abc\n')
+  assert sysfs.read_int(str(tmp_path / 'hex'), base=16) == 31
+  assert sysfs.read_int(str(tmp_path / 'text'), default=-1) == -1
+  assert sysfs.read_attribute(str(tmp_path / 'missing'), 'x') == 'x'
+  assert sysfs.read_attributes(str(tmp_path), ['text', 'missing']) == {'text': 'abc', 'missing': None}
@@ -0,0 +1,125 @@
+# tests/core/test_systemd.py
+from __future__ import annotations
+
+import os
+import subprocess
+
+import pytest
+
+from sysmind.core import stats, systemd
+from sysmind.core.audit import Audit
+from sysmind.core.systemd import Service, list_units_files
+
+SHOW = 'Id=sshd.service\nActiveState=active\nSubState=running\n\nId=cron.service\nActiveState=inactive\nSubState=dead\n'
+
+
+def _write(path, text):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'w') as f:
+    f.write(text)
+
+
+@pytest.fixture
+def units(tmp_path):
+  unit_path = str(tmp_path / 'etc')
+  _write(os.path.join(unit_path, 'sshd.service'), '[Unit]\nDescription=OpenSSH\n[Install]\nWantedBy=multi-user.target\n')
+  _write(os.path.join(unit_path, 'cron.service'), '[Unit]\nDescription=Cron\n')
+  os.makedirs(os.path.join(unit_path, 'multi-user.target.wants'))
+  os.symlink(os.path.join(unit_path, 'sshd.service'), os.path.join(unit_path, 'multi-user.target.wants', 'sshd.service'))
+  return tmp_path, (unit_path,)
+
+def _show(monkeypatch, calls, stdout=SHOW):
+  def run(args, **kwargs):
+    calls.append(args)
+    return subprocess.CompletedProcess(args, 0, stdout, '')
+  monkeypatch.setattr(systemd.subprocess, 'run', run)
+
+
+def test_unit_files_without_systemd_report_unknown_state(units, monkeypatch):
+  tmp_path, paths = units
+  calls = []
+  _show(monkeypatch, calls)
+  found = {unit.name: unit for unit in list_units_files(paths=paths, runtime=str(tmp_path / 'missing'))}
+  assert calls == []
+  assert found['sshd.service'].enabled == 'enabled'
+  assert found['sshd.service'].active is None
+  assert found['sshd.service'].sub is None
+  assert list_units_files(states=['running'], paths=paths, runtime=str(tmp_path / 'missing')) == []
+
+def test_unit_files_ask_systemctl_for_state(units, monkeypatch):
+  tmp_path, paths = units
+  calls = []
+  _show(monkeypatch, calls)
+  found = {unit.name: unit for unit in list_units_files(paths=paths, runtime=str(tmp_path), show=True)}
+  assert len(calls) == 1
+  assert (found['sshd.service'].active, found['sshd.service'].sub) == ('active', 'running')
+  assert (found['cron.service'].active, found['cron.service'].sub) == ('inactive', 'dead')
+  assert [unit.name for unit in list_units_files(states=['running'], paths=paths, runtime=str(tmp_path), show=True)] == ['sshd.service']
+
+def test_unit_files_only_fork_when_asked(units, monkeypatch):
+  tmp_path, paths = units
+  calls = []
+  _show(monkeypatch, calls)
+  found = {unit.name: unit for unit in list_units_files(paths=paths, run_units=str(tmp_path), runtime=str(tmp_path))}
+  assert calls == []
+  assert (found['sshd.service'].active, found['sshd.service'].sub) == ('inactive', None)
+
+  with stats.Stats() as recorded:
+    with stats.span('services'):
+      list_units_files(paths=paths, runtime=str(tmp_path), show=True)
+  assert recorded.spans[0].forks == 1
+
+def test_list_units_asks_systemctl_without_dbus(units, monkeypatch):
+  tmp_path, paths = units
+  calls = []
+  _show(monkeypatch, calls)
+  def no_bus(*args):
+    raise OSError('no system bus')
+  monkeypatch.setattr(systemd, 'list_units_dbus', no_bus)
+  real = systemd.list_units_files
+  def files(states, patterns, show=False):
+    return real(states, patterns, paths=paths, runtime=str(tmp_path), show=show)
+  monkeypatch.setattr(systemd, 'list_units_files', files)
+  found = {unit.name: unit for unit in systemd.list_units(patterns=['*.service'])}
+  assert len(calls) == 1
+  assert found['sshd.service'].sub == 'running'
+
+def test_unit_files_fall_back_to_markers(units, monkeypatch):
+  tmp_path, paths = units
+  def run(args, **kwargs):
+    raise FileNotFoundError('systemctl')
+  monkeypatch.setattr(systemd.subprocess, 'run', run)
+  run_units = tmp_path / 'units'
+  run_units.mkdir()
+  (run_units / 'invocation:sshd.service').touch()
+  found = {unit.name: unit for unit in list_units_files(paths=paths, run_units=str(run_units), runtime=str(tmp_path), show=True)}
+  assert found['sshd.service'].active == 'active'
+  assert found['cron.service'].active == 'inactive'
+
+def test_audit_flags_unknown_service_state():
+  services = [Service('sshd.service', None, 'loaded', None, None, 'enabled', None)]
+  report = Audit([{'service': 'sshd'}, {'service': 'sshd', 'enabled': 'enabled'}, {'service': 'telnet'}]).run(data={'services': services})
+  assert [result.passed for result in report] == [None, True, False]
+  assert report.to_dict()['unknown'] == 1
+  assert not report.ok
+  assert len(report.failed) == 1
+
+def test_watch_files_reports_added_changed_and_removed(monkeypatch):
+  Unit = systemd.Unit
+  polls = [
+    [Unit('a.service', None, 'loaded', 'active', 'running', 'enabled'), Unit('b.service', None, 'loaded', 'active', 'running', 'enabled')],
+    [Unit('a.service', None, 'loaded', 'failed', 'failed', 'enabled'), Unit('c.service', None, 'loaded', 'inactive', 'dead', 'static')],
+  ]
+  shown = []
+  def units(states, patterns, show=False):
+    # Later polls see the last state again
+    shown.append(show)
+    return polls[min(len(shown), len(polls)) - 1]
+  monkeypatch.setattr(systemd, 'list_units_files', units)
+  changes = list(systemd._watch_files(['*.service'], timeout=0.05, interval=0.02))
+  assert changes == [
+    systemd.UnitChange('a.service', 'failed', 'failed', 'active', 'running'),
+    systemd.UnitChange('c.service', 'inactive', 'dead', None, None),
+    systemd.UnitChange('b.service', None, None, 'active', 'running'),
+  ]
+  assert all(shown)
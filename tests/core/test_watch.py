@@ -0,0 +1,188 @@
+# tests/core/test_watch.py
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import struct
+
+from sysmind.core import watch
+from sysmind.core.watch import (
+  FileEvent,
+  InterfaceEvent,
+  MountEvent,
+  Watcher,
+  parse_rtnetlink,
+  parse_uevent,
+)
+
+UEVENT = (
+  b'add@/devices/pci0000:00/0000:00:14.0/usb1/1-1\0ACTION=add\0'
+  b'DEVPATH=/devices/pci0000:00/0000:00:14.0/usb1/1-1\0SUBSYSTEM=usb\0'
+  b'DEVTYPE=usb_device\0PRODUCT=1d6b/2/606\0SEQNUM=4711\0'
+)
+
+MOUNTINFO = (
+  '22 1 8:1 / / rw,relatime - ext4 /dev/sda1 rw\n'
+  '30 22 0:25 / /tmp rw,nosuid - tmpfs tmpfs rw\n'
+  '31 22 0:26 / /mnt rw - ext4 /dev/sdb1 rw\n'
+)
+
+
+def _attribute(kind, value):
+  length = 4 + len(value)
+  return struct.pack('=HH', length, kind) + value + b'\0' * (-length % 4)
+
+def _message(kind, body):
+  return struct.pack('=IHHII', 16 + len(body), kind, 0, 0, 0) + body
+
+def _link(kind, index, name, flags):
+  body = struct.pack('=BxHiII', socket.AF_UNSPEC, 1, index, flags, 0)
+  if name is not None:
+    body += _attribute(watch.IFLA_IFNAME, name.encode() + b'\0')
+  return _message(kind, body)
+
+def _address(kind, index, family, address, label=None):
+  body = struct.pack('=BBBBI', family, 24, 0, 0, index)
+  body += _attribute(watch.IFA_LOCAL, socket.inet_pton(family, address))
+  if label is not None:
+    body += _attribute(watch.IFA_LABEL, label.encode() + b'\0')
+  return _message(kind, body)
+
+def _events(watcher, timeout):
+  # Everything the watcher delivers until it has been quiet for 'timeout'
+  async def drain():
+    events = []
+    while True:
+      event = await watcher.get(timeout)
+      if event is None:
+        return events
+      events.append(event)
+  return drain()
+
+
+def test_parse_uevent():
+  properties = parse_uevent(UEVENT)
+  assert properties['ACTION'] == 'add'
+  assert properties['SUBSYSTEM'] == 'usb'
+  assert properties['DEVTYPE'] == 'usb_device'
+  assert properties['DEVPATH'] == '/devices/pci0000:00/0000:00:14.0/usb1/1-1'
+  assert properties['SEQNUM'] == '4711'
+
+def test_parse_uevent_skips_udev_messages():
+  assert parse_uevent(b'libudev\0\xfe\xed\xca\xfe\0\0\0') is None
+  assert parse_uevent(b'') is None
+
+def test_parse_rtnetlink():
+  data = b''.join([
+    _link(watch.RTM_NEWLINK, 2, 'eth0', watch.IFF_UP),
+    # Address messages without a label take the name the link message gave
+    _address(watch.RTM_NEWADDR, 2, socket.AF_INET, '10.0.0.5'),
+    _address(watch.RTM_NEWADDR, 2, socket.AF_INET6, 'fe80::1', label='eth0'),
+    _address(watch.RTM_DELADDR, 2, socket.AF_INET, '10.0.0.5'),
+    _link(watch.RTM_DELLINK, 2, None, 0),
+  ])
+  names = {}
+  assert list(parse_rtnetlink(data, names)) == [
+    InterfaceEvent('interfaces', 'eth0', 'changed', 2, True, None),
+    InterfaceEvent('interfaces', 'eth0', 'address_added', 2, None, '10.0.0.5'),
+    InterfaceEvent('interfaces', 'eth0', 'address_added', 2, None, 'fe80::1'),
+    InterfaceEvent('interfaces', 'eth0', 'address_removed', 2, None, '10.0.0.5'),
+    InterfaceEvent('interfaces', 'eth0', 'removed', 2, False, None),
+  ]
+  assert names == {2: 'eth0'}
+
+def test_parse_rtnetlink_ignores_other_and_truncated_messages():
+  data = _message(3, b'') + _link(watch.RTM_NEWLINK, 3, 'wlan0', 0)
+  assert [event.name for event in parse_rtnetlink(data)] == ['wlan0']
+  # A header claiming less than itself ends the datagram
+  assert list(parse_rtnetlink(struct.pack('=IHHII', 4, watch.RTM_NEWLINK, 0, 0, 0))) == []
+
+def test_debounce_keeps_latest_per_key():
+  invalidated = []
+
+  class Target(object):
+    def invalidate(self, sections):
+      invalidated.extend(sections)
+
+  async def run():
+    watcher = Watcher(sources=(), debounce=0.05, targets=[Target()])
+    watcher.start()
+    for action in ('created', 'modified', 'deleted'):
+      event = FileEvent('hosts', '/etc/hosts', action)
+      watcher._schedule(('file', '/etc/hosts'), lambda event=event: [event])
+      await asyncio.sleep(0.01)
+    watcher._schedule(('file', '/etc/resolv.conf'), lambda: [FileEvent('resolver', '/etc/resolv.conf', 'modified')])
+    try:
+      return await _events(watcher, 0.3)
+    finally:
+      watcher.stop()
+
+  assert asyncio.run(run()) == [
+    FileEvent('hosts', '/etc/hosts', 'deleted'),
+    FileEvent('resolver', '/etc/resolv.conf', 'modified'),
+  ]
+  assert invalidated == ['hosts', 'resolver']
+
+def test_failed_producer_is_dropped():
+  async def run():
+    watcher = Watcher(sources=(), debounce=0.01)
+    watcher.start()
+    def broken():
+      raise OSError('gone')
+    watcher._schedule(('mounts',), broken)
+    watcher._schedule(('file', 'a'), lambda: [FileEvent('hosts', 'a', 'modified')])
+    try:
+      return await _events(watcher, 0.1)
+    finally:
+      watcher.stop()
+
+  assert asyncio.run(run()) == [FileEvent('hosts', 'a', 'modified')]
+
+def test_file_bursts_coalesce(tmp_path):
+  hosts = tmp_path / 'hosts'
+  hosts.write_text('127.0.0.1 localhost\n')
+  conf_dir = tmp_path / 'sysctl.d'
+  conf_dir.mkdir()
+
+  async def run():
+    watcher = Watcher(
+      sources=['files'],
+      debounce=0.05,
+      files={str(hosts): 'hosts'},
+      directories={str(conf_dir): 'sysctl'},
+    )
+    async with watcher:
+      assert watcher.sources == ['files']
+      for index in range(5):
+        hosts.write_text(f'10.0.0.{index} host\n')
+      (conf_dir / '10-net.conf').write_text('net.ipv4.ip_forward = 1\n')
+      first = await _events(watcher, 0.3)
+      os.unlink(conf_dir / '10-net.conf')
+      second = await _events(watcher, 0.3)
+    return first, second
+
+  first, second = asyncio.run(run())
+  assert sorted(first) == sorted([
+    FileEvent('hosts', str(hosts), 'modified'),
+    FileEvent('sysctl', str(conf_dir / '10-net.conf'), 'modified'),
+  ])
+  assert second == [FileEvent('sysctl', str(conf_dir / '10-net.conf'), 'deleted')]
+
+def test_mount_diff(tmp_path):
+  mountinfo = tmp_path / 'mountinfo'
+  mountinfo.write_text(MOUNTINFO)
+  watcher = Watcher(sources=(), mountinfo=str(mountinfo))
+  watcher._mounts = watch._mountinfo(str(mountinfo))
+
+  mountinfo.write_text(
+    '22 1 8:1 / / rw,relatime - ext4 /dev/sda1 rw\n'
+    '30 22 0:25 / /tmp rw,nosuid,nodev - tmpfs tmpfs rw\n'
+    '32 22 0:27 / /media/usb rw - vfat /dev/sdc1 rw\n'
+  )
+  assert sorted(watcher._diff_mounts()) == sorted([
+    MountEvent('mounts', '/tmp', 'changed', 'tmpfs', 'tmpfs', 'rw,nosuid,nodev'),
+    MountEvent('mounts', '/media/usb', 'mounted', '/dev/sdc1', 'vfat', 'rw'),
+    MountEvent('mounts', '/mnt', 'unmounted', '/dev/sdb1', 'ext4', 'rw'),
+  ])
+  assert watcher._diff_mounts() == []